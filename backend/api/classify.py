@@ -2,37 +2,46 @@
 Route API pour la classification automatique de documents
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer, load_only
 from database import get_db
 import models
 import schemas
 from auth_utils import get_current_active_user
-from services.ml_service import MLService
+from services.stats_rollup import StatsDelta
+from services.document_processing import ml_service, find_classified_duplicate, save_classification
+from services.vector_store import vector_store
 
 router = APIRouter()
-ml_service = MLService()
 
 @router.post("/classify", response_model=schemas.ClassifyResponse)
 async def classify_document(
     request: schemas.ClassifyRequest,
     current_user: models.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Classifie automatiquement un document
+    Avec reuse_duplicate, la catégorie d'un quasi-doublon déjà classé est reprise
+    sans passer par le modèle
     
     Args:
         request: Requête contenant l'ID du document
         db: Session de base de données
-        
+    
     Returns:
         Catégorie prédite, score de confiance et toutes les prédictions
     """
     # Récupérer le document
-    document = db.query(models.Document).filter(
-        models.Document.id == request.document_id
-    ).first()
+    result = await db.execute(
+        select(models.Document).where(
+            models.Document.id == request.document_id
+        ).options(undefer(models.Document.extracted_text))
+    )
+    document = result.scalars().first()
     
     if not document:
         raise HTTPException(status_code=404, detail="Document non trouvé")
@@ -45,22 +54,38 @@ async def classify_document(
         )
     
     try:
-        # Prédire la catégorie
-        category, confidence, all_predictions = ml_service.predict(document.extracted_text)
+        duplicate = None
+        if request.reuse_duplicate:
+            duplicate = await find_classified_duplicate(db, document)
+        
+        # Vecteur TF-IDF pour l'index des documents similaires, même si la catégorie
+        # d'un doublon est reprise
+        vectors = ml_service.vectorize([document.extracted_text])
+        
+        if duplicate is not None:
+            category, confidence = duplicate.category, duplicate.confidence
+            all_predictions = {category: confidence}
+        else:
+            # Prédire la catégorie
+            category, confidence, all_predictions = ml_service.predict_vectors(vectors)[0]
+        
+        # Mettre à jour le document et les statistiques agrégées
+        await save_classification(db, document, category, confidence)
         
-        # Mettre à jour le document
-        document.category = category
-        document.confidence = confidence
+        await db.commit()
         
-        db.commit()
+        await run_in_threadpool(
+            vector_store.add, document.user_id, [document.id], vectors, ml_service.model_version
+        )
         
         return schemas.ClassifyResponse(
             document_id=document.id,
             category=category,
             confidence=confidence,
-            all_predictions=all_predictions
+            all_predictions=all_predictions,
+            duplicate_of=duplicate.id if duplicate is not None else None
         )
-        
+    
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -70,7 +95,7 @@ async def classify_document(
 @router.post("/classify/batch")
 async def classify_batch_documents(
     document_ids: list[int],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Classifie plusieurs documents en une seule requête
@@ -78,47 +103,81 @@ async def classify_batch_documents(
     Args:
         document_ids: Liste des IDs de documents
         db: Session de base de données
-        
+    
     Returns:
         Liste des résultats de classification
     """
+    # Charger tous les documents en une seule requête
+    result = await db.execute(
+        select(models.Document).where(
+            models.Document.id.in_(document_ids)
+        ).options(undefer(models.Document.extracted_text))
+    )
+    documents = {document.id: document for document in result.scalars().all()}
+    
+    classifiable = [
+        doc_id for doc_id in document_ids
+        if doc_id in documents and documents[doc_id].extracted_text
+        and documents[doc_id].extracted_text.strip()
+    ]
+    
+    # Classifier tout le lot en une passe (vecteurs conservés pour l'index des documents similaires)
+    vectors = None
+    try:
+        if classifiable:
+            vectors = ml_service.vectorize([documents[doc_id].extracted_text for doc_id in classifiable])
+            predictions = dict(zip(classifiable, ml_service.predict_vectors(vectors)))
+        else:
+            predictions = {}
+        prediction_error = None
+    except Exception as e:
+        predictions = {}
+        prediction_error = str(e)
+    
     results = []
+    delta = StatsDelta()
     
     for doc_id in document_ids:
-        document = db.query(models.Document).filter(
-            models.Document.id == doc_id
-        ).first()
-        
-        if document and document.extracted_text:
-            try:
-                category, confidence, all_predictions = ml_service.predict(
-                    document.extracted_text
-                )
-                
-                # Mettre à jour le document
-                document.category = category
-                document.confidence = confidence
-                
-                results.append({
-                    "document_id": doc_id,
-                    "category": category,
-                    "confidence": confidence,
-                    "success": True
-                })
-            except Exception as e:
-                results.append({
-                    "document_id": doc_id,
-                    "error": str(e),
-                    "success": False
-                })
-        else:
+        if doc_id not in classifiable:
             results.append({
                 "document_id": doc_id,
                 "error": "Document non trouvé ou texte non extrait",
                 "success": False
             })
+        elif prediction_error:
+            results.append({
+                "document_id": doc_id,
+                "error": prediction_error,
+                "success": False
+            })
+        else:
+            category, confidence, all_predictions = predictions[doc_id]
+            
+            # Mettre à jour le document
+            delta.add_document(documents[doc_id], -1)
+            documents[doc_id].category = category
+            documents[doc_id].confidence = confidence
+            delta.add_document(documents[doc_id], +1)
+            
+            results.append({
+                "document_id": doc_id,
+                "category": category,
+                "confidence": confidence,
+                "success": True
+            })
     
-    db.commit()
+    await delta.apply(db)
+    await db.commit()
+    
+    if predictions:
+        rows_by_user = {}
+        for row, doc_id in enumerate(classifiable):
+            rows_by_user.setdefault(documents[doc_id].user_id, []).append(row)
+        for user_id, rows in rows_by_user.items():
+            await run_in_threadpool(
+                vector_store.add, user_id, [classifiable[row] for row in rows],
+                vectors[rows], ml_service.model_version
+            )
     
     return {
         "total": len(document_ids),
@@ -148,7 +207,7 @@ async def get_feature_importance(category: str, top_n: int = 10):
     Args:
         category: Nom de la catégorie
         top_n: Nombre de mots à retourner
-        
+    
     Returns:
         Dictionnaire des mots importants
     """
@@ -169,3 +228,88 @@ async def get_feature_importance(category: str, top_n: int = 10):
             status_code=500,
             detail=f"Erreur lors de l'extraction des features: {str(e)}"
         )
+
+@router.get("/documents/{document_id}/similar", response_model=schemas.SimilarResponse)
+async def get_similar_documents(
+    document_id: int,
+    limit: int = Query(10, ge=1, le=50),
+    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Documents de l'utilisateur les plus proches d'un document ("plus comme celui-ci"),
+    par similarité cosinus des vecteurs TF-IDF du modèle de classification
+    
+    Args:
+        document_id: ID du document
+        limit: Nombre de documents à retourner
+        db: Session de base de données
+    
+    Returns:
+        Documents similaires triés par similarité décroissante
+    """
+    exists = await db.scalar(
+        select(models.Document.id).where(
+            models.Document.id == document_id,
+            models.Document.user_id == current_user.id
+        )
+    )
+    if exists is None:
+        raise HTTPException(status_code=404, detail="Document non trouvé ou accès refusé")
+    
+    model_version = ml_service.model_version
+    vector = await run_in_threadpool(vector_store.get_vector, current_user.id, document_id, model_version)
+    
+    if vector is None:
+        # Document pas encore indexé (classé avant l'index ou avec un autre modèle)
+        extracted_text = await db.scalar(
+            select(models.Document.extracted_text).where(models.Document.id == document_id)
+        )
+        if not extracted_text or not extracted_text.strip():
+            raise HTTPException(
+                status_code=400,
+                detail="Le texte du document n'a pas été extrait. Veuillez d'abord effectuer l'OCR."
+            )
+        if ml_service.model is None:
+            raise HTTPException(status_code=503, detail="Modèle ML non chargé")
+        
+        vectors = await run_in_threadpool(ml_service.vectorize, [extracted_text])
+        await run_in_threadpool(vector_store.add, current_user.id, [document_id], vectors, model_version)
+        vector = await run_in_threadpool(vector_store.get_vector, current_user.id, document_id, model_version)
+    
+    hits = await run_in_threadpool(
+        vector_store.query, current_user.id, vector, model_version, limit, document_id
+    ) if vector is not None else []
+    
+    # Les documents supprimés entre-temps sont ignorés
+    result = await db.execute(
+        select(models.Document).where(
+            models.Document.id.in_([hit_id for hit_id, _ in hits]),
+            models.Document.user_id == current_user.id
+        ).options(load_only(
+            models.Document.filename,
+            models.Document.file_type,
+            models.Document.category,
+            models.Document.confidence,
+            models.Document.created_at,
+            raiseload=True
+        ))
+    )
+    documents = {document.id: document for document in result.scalars().all()}
+    
+    return schemas.SimilarResponse(
+        document_id=document_id,
+        similar=[
+            schemas.SimilarDocument(
+                id=hit_id,
+                filename=documents[hit_id].filename,
+                file_type=documents[hit_id].file_type,
+                category=documents[hit_id].category,
+                confidence=documents[hit_id].confidence,
+                created_at=documents[hit_id].created_at,
+                score=score
+            )
+            for hit_id, score in hits
+            if hit_id in documents
+        ]
+    )
@@ -0,0 +1,84 @@
+"""
+Route API de détection des quasi-doublons
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from database import get_db
+import models
+import schemas
+from auth_utils import get_current_active_user
+from services.duplicate_detection import find_duplicates, DUPLICATE_THRESHOLD
+
+router = APIRouter()
+
+
+@router.get("/documents/{document_id}/duplicates", response_model=schemas.DuplicatesResponse)
+async def get_duplicates(
+    document_id: int,
+    threshold: float = Query(DUPLICATE_THRESHOLD, ge=0.0, le=1.0),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Recherche les quasi-doublons d'un document (même contenu téléversé plusieurs fois:
+    photo, scan, PDF) parmi les documents de l'utilisateur
+    
+    Args:
+        document_id: ID du document
+        threshold: Similarité minimale (Jaccard estimée sur les shingles du texte)
+        limit: Nombre maximum de doublons
+        db: Session de base de données
+    
+    Returns:
+        Doublons triés par similarité décroissante
+    """
+    exists = await db.scalar(
+        select(models.Document.id).where(
+            models.Document.id == document_id,
+            models.Document.user_id == current_user.id
+        )
+    )
+    if exists is None:
+        raise HTTPException(status_code=404, detail="Document non trouvé ou accès refusé")
+    
+    duplicates = await find_duplicates(db, document_id, current_user.id, threshold, limit)
+    if duplicates is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Le texte du document n'a pas été extrait. Veuillez d'abord effectuer l'OCR."
+        )
+    
+    result = await db.execute(
+        select(models.Document).where(
+            models.Document.id.in_([duplicate_id for duplicate_id, _ in duplicates])
+        ).options(load_only(
+            models.Document.filename,
+            models.Document.file_type,
+            models.Document.category,
+            models.Document.confidence,
+            models.Document.created_at,
+            raiseload=True
+        ))
+    )
+    documents = {document.id: document for document in result.scalars().all()}
+    
+    return schemas.DuplicatesResponse(
+        document_id=document_id,
+        duplicates=[
+            schemas.DuplicateDocument(
+                id=duplicate_id,
+                filename=documents[duplicate_id].filename,
+                file_type=documents[duplicate_id].file_type,
+                category=documents[duplicate_id].category,
+                confidence=documents[duplicate_id].confidence,
+                created_at=documents[duplicate_id].created_at,
+                similarity=round(score, 4)
+            )
+            for duplicate_id, score in duplicates
+            if duplicate_id in documents
+        ]
+    )
@@ -1,23 +1,139 @@
 """
 Routes API pour les visiteurs (analyse sans authentification)
+Admission contrôlée par services/guest_admission.py: débit par adresse IP, OCR
+visiteurs simultanés et en attente limités, nombre de pages des PDF limité
+Le formulaire est lu par un analyseur multipart dont le fichier reste en mémoire
+(écrit sur le disque au-delà de GUEST_SPOOL_MAX_MB, au lieu de 1 MB pour les autres
+routes) et l'OCR le lit depuis le tampon, sans fichier temporaire
 """
 
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, Depends, Request, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
-import tempfile
+from starlette.datastructures import UploadFile
+from starlette.formparsers import MultiPartParser, MultiPartException
+import math
 import os
+from dotenv import load_dotenv
+import models
+import schemas
+from auth_utils import get_current_active_user
 from services.ml_service import MLService
-from services.ocr_service import OCRService
+from services.ocr_service import OCRService, InvalidDocument
+from services.ocr_scheduler import ocr_scheduler, GUEST, SchedulerSaturated
+from services.guest_admission import (
+    guest_admission, GUEST_MAX_QUEUED, GUEST_RETRY_AFTER_SECONDS, GUEST_MAX_PDF_PAGES,
+    RATE_LIMITED, SATURATED, UNSUPPORTED_TYPE, TOO_LARGE, TOO_MANY_PAGES, INVALID_DOCUMENT, NO_TEXT, FAILED
+)
+
+load_dotenv()
 
 router = APIRouter()
 
+# Taille maximale d'un document visiteur (et de la requête, en-têtes multipart compris)
+GUEST_MAX_FILE_SIZE = 10 * 1024 * 1024
+GUEST_MAX_BODY_SIZE = GUEST_MAX_FILE_SIZE + 64 * 1024
+
+# Taille au-delà de laquelle le document est écrit sur le disque (par défaut jamais:
+# la limite de 10 MB); à réduire pour borner la mémoire des analyses en attente
+GUEST_SPOOL_MAX_BYTES = int(float(os.getenv("GUEST_SPOOL_MAX_MB", "10")) * 1024 * 1024)
+
 # Initialiser les services
 ml_service = MLService()
 ocr_service = OCRService()
 
 
-@router.post("/analyze-guest")
-async def analyze_guest_document(file: UploadFile = File(...)):
+class GuestMultiPartParser(MultiPartParser):
+    """Formulaire visiteur: fichier en mémoire jusqu'à GUEST_SPOOL_MAX_BYTES"""
+    max_file_size = GUEST_SPOOL_MAX_BYTES
+
+
+# Corps de requête documenté pour /docs (le formulaire est lu par GuestMultiPartParser)
+GUEST_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"]
+                }
+            }
+        }
+    }
+}
+
+
+def _too_large() -> HTTPException:
+    guest_admission.record_rejected(TOO_LARGE)
+    return HTTPException(
+        status_code=400,
+        detail="Le fichier est trop volumineux. Taille maximale: 10 MB"
+    )
+
+
+async def _read_guest_file(request: Request) -> UploadFile:
+    """
+    Lit le champ "file" du formulaire visiteur, en refusant la requête dès qu'elle
+    dépasse GUEST_MAX_BODY_SIZE
+    
+    Raises:
+        HTTPException: 400 si le formulaire est invalide ou le fichier trop volumineux
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > GUEST_MAX_BODY_SIZE:
+        raise _too_large()
+    
+    async def limited_stream():
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > GUEST_MAX_BODY_SIZE:
+                raise _too_large()
+            yield chunk
+    
+    if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+        raise HTTPException(status_code=400, detail="Formulaire multipart/form-data attendu")
+    try:
+        form = await GuestMultiPartParser(
+            request.headers, limited_stream(), max_files=1, max_fields=10
+        ).parse()
+    except MultiPartException as e:
+        raise HTTPException(status_code=400, detail=f"Formulaire invalide: {e.message}")
+    
+    file = form.get("file")
+    if not isinstance(file, UploadFile):
+        await form.close()
+        raise HTTPException(status_code=400, detail="Champ \"file\" manquant")
+    return file
+
+
+def _saturated() -> HTTPException:
+    guest_admission.record_rejected(SATURATED)
+    return HTTPException(
+        status_code=503,
+        detail="Le service d'analyse est saturé. Veuillez réessayer dans quelques instants.",
+        headers={"Retry-After": str(GUEST_RETRY_AFTER_SECONDS)}
+    )
+
+
+def _analyze(document_file, is_pdf: bool):
+    """OCR puis classification d'un document visiteur en mémoire (bloquant)"""
+    if is_pdf:
+        extracted_text, metadata = ocr_service.extract_text_from_pdf_file(
+            document_file, max_pages=GUEST_MAX_PDF_PAGES
+        )
+    else:
+        extracted_text, metadata = ocr_service.extract_text_from_image_file(document_file)
+    
+    if not extracted_text or len(extracted_text.strip()) < 10:
+        return extracted_text, metadata, None
+    return extracted_text, metadata, ml_service.predict(extracted_text)
+
+
+@router.post("/analyze-guest", openapi_extra=GUEST_REQUEST_BODY)
+async def analyze_guest_document(request: Request):
     """
     Analyse un document pour un visiteur sans l'enregistrer dans la base de données
     
@@ -25,51 +141,73 @@ async def analyze_guest_document(file: UploadFile = File(...)):
     - Classifie le document avec le modèle ML
     - Retourne la catégorie et le niveau de confiance
     - Ne sauvegarde RIEN dans la base de données
+    - 429 au-delà du débit autorisé par adresse IP, 503 si l'analyse est saturée
+      (avec Retry-After)
     """
-    # Vérifier le type de fichier
-    allowed_types = ['application/pdf', 'image/jpeg', 'image/jpg', 'image/png']
-    if file.content_type not in allowed_types:
+    client = request.client.host if request.client else "inconnu"
+    
+    # Débit par adresse IP
+    retry_after = guest_admission.admit(client)
+    if retry_after > 0:
+        guest_admission.record_rejected(RATE_LIMITED)
         raise HTTPException(
-            status_code=400,
-            detail="Type de fichier non supporté. Formats acceptés: PDF, JPG, PNG"
+            status_code=429,
+            detail="Trop d'analyses depuis cette adresse. Veuillez patienter avant de réessayer.",
+            headers={"Retry-After": str(math.ceil(retry_after))}
         )
     
-    # Vérifier la taille du fichier (max 10 MB)
-    file_size = 0
-    temp_file_path = None
+    # Refuser tout de suite si la file des visiteurs est pleine (sans lire le fichier)
+    if ocr_scheduler.saturated(GUEST, GUEST_MAX_QUEUED):
+        raise _saturated()
+    
+    # Document en mémoire (sur le disque au-delà de GUEST_SPOOL_MAX_BYTES)
+    file = await _read_guest_file(request)
+    document_file = file.file
     
     try:
-        # Créer un fichier temporaire
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as temp_file:
-            temp_file_path = temp_file.name
-            
-            # Lire et écrire le fichier par chunks
-            while chunk := await file.read(1024 * 1024):  # 1 MB chunks
-                file_size += len(chunk)
-                
-                if file_size > 10 * 1024 * 1024:  # 10 MB max
-                    raise HTTPException(
-                        status_code=400,
-                        detail="Le fichier est trop volumineux. Taille maximale: 10 MB"
-                    )
-                
-                temp_file.write(chunk)
+        # Vérifier le type de fichier
+        allowed_types = ['application/pdf', 'image/jpeg', 'image/jpg', 'image/png']
+        if file.content_type not in allowed_types:
+            guest_admission.record_rejected(UNSUPPORTED_TYPE)
+            raise HTTPException(
+                status_code=400,
+                detail="Type de fichier non supporté. Formats acceptés: PDF, JPG, PNG"
+            )
         
-        # Extraire le texte selon le type de fichier
-        if file.content_type == 'application/pdf':
-            extracted_text, metadata = ocr_service.extract_text_from_pdf(temp_file_path)
-        else:
-            extracted_text, metadata = ocr_service.extract_text_from_image(temp_file_path)
+        is_pdf = file.content_type == 'application/pdf'
+        
+        # Vérifier la taille du fichier (max 10 MB)
+        if file.size > GUEST_MAX_FILE_SIZE:
+            raise _too_large()
+        
+        # Limiter le nombre de pages avant la conversion en images
+        if is_pdf:
+            page_count = await run_in_threadpool(ocr_service.count_pdf_pages_from_file, document_file)
+            if page_count > GUEST_MAX_PDF_PAGES:
+                guest_admission.record_rejected(TOO_MANY_PAGES)
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Le PDF contient trop de pages ({page_count}). Maximum: {GUEST_MAX_PDF_PAGES} pages"
+                )
+        
+        # Extraire le texte et classifier (dans un thread, à son tour parmi les visiteurs)
+        try:
+            extracted_text, metadata, prediction = await ocr_scheduler.run(
+                GUEST, client, _analyze, document_file, is_pdf, max_queued=GUEST_MAX_QUEUED
+            )
+        except SchedulerSaturated:
+            raise _saturated()
         
         # Vérifier qu'on a extrait du texte
-        if not extracted_text or len(extracted_text.strip()) < 10:
+        if prediction is None:
+            guest_admission.record_rejected(NO_TEXT)
             raise HTTPException(
                 status_code=400,
                 detail="Impossible d'extraire du texte du document. Assurez-vous que le document contient du texte lisible."
             )
         
-        # Classifier le document
-        category, confidence, all_predictions = ml_service.predict(extracted_text)
+        category, confidence, all_predictions = prediction
+        guest_admission.record_served()
         
         # Retourner les résultats (sans sauvegarder)
         return JSONResponse(content={
@@ -82,16 +220,39 @@ async def analyze_guest_document(file: UploadFile = File(...)):
     
     except HTTPException:
         raise
+    except InvalidDocument as e:
+        guest_admission.record_rejected(INVALID_DOCUMENT)
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
+        guest_admission.record_rejected(FAILED)
         raise HTTPException(
             status_code=500,
             detail=f"Erreur lors de l'analyse du document: {str(e)}"
         )
     
     finally:
-        # Nettoyer le fichier temporaire
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.unlink(temp_file_path)
-            except:
-                pass
+        # Libérer le tampon (et le fichier temporaire s'il a été écrit sur le disque)
+        await file.close()
+
+
+@router.get("/analyze-guest/stats", response_model=schemas.GuestAdmissionStats)
+async def get_guest_admission_stats(
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Analyses visiteurs servies et refusées (par motif) de ce processus, et file des
+    OCR visiteurs
+    
+    Returns:
+        Compteurs et limites de l'admission des visiteurs
+    """
+    guest_class = next(
+        stats for stats in ocr_scheduler.stats()["classes"] if stats["priority"] == GUEST
+    )
+    return schemas.GuestAdmissionStats(
+        **guest_admission.stats(),
+        queued=guest_class["queued"],
+        in_flight=guest_class["in_flight"],
+        max_in_flight=guest_class["max_in_flight"],
+        wait_p95_ms=guest_class["wait_p95_ms"]
+    )
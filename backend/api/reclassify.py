@@ -0,0 +1,111 @@
+"""
+Route API pour la reclassification de tous les documents après un ré-entraînement
+Réservée aux administrateurs (ADMIN_EMAILS): la tâche modifie les documents de tous
+les utilisateurs
+"""
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db
+import models
+import schemas
+from auth_utils import get_current_admin_user
+from services.reclassification_service import reclassification_service, job_progress
+
+router = APIRouter()
+
+
+def _job_response(job: models.ReclassificationJob) -> schemas.ReclassificationJobResponse:
+    """Construit la réponse d'état d'une tâche (avec débit et temps restant)"""
+    return schemas.ReclassificationJobResponse(
+        id=job.id,
+        status=job.status,
+        model_version=job.model_version,
+        chunk_size=job.chunk_size,
+        last_document_id=job.last_document_id,
+        total_documents=job.total_documents,
+        processed_documents=job.processed_documents,
+        updated_documents=job.updated_documents,
+        error=job.error,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+        **job_progress(job)
+    )
+
+@router.post("/reclassify", response_model=schemas.ReclassificationJobResponse, status_code=202)
+async def start_reclassification(
+    request: schemas.ReclassifyRequest,
+    current_user: models.User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Lance (ou reprend) la reclassification de tous les documents avec le modèle publié
+    
+    Args:
+        request: Taille des lots et option de redémarrage
+        db: Session de base de données
+        
+    Returns:
+        État de la tâche lancée
+    """
+    try:
+        job_id = await reclassification_service.start(
+            chunk_size=request.chunk_size,
+            restart=request.restart
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors du lancement de la reclassification: {str(e)}"
+        )
+    
+    job = await db.get(models.ReclassificationJob, job_id)
+    return _job_response(job)
+
+@router.get("/reclassify/jobs", response_model=list[schemas.ReclassificationJobResponse])
+async def list_reclassification_jobs(
+    limit: int = 10,
+    current_user: models.User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Liste les dernières tâches de reclassification
+    
+    Args:
+        limit: Nombre maximum de tâches à retourner
+        db: Session de base de données
+        
+    Returns:
+        Liste des tâches, la plus récente en premier
+    """
+    result = await db.execute(
+        select(models.ReclassificationJob).order_by(
+            models.ReclassificationJob.id.desc()
+        ).limit(limit)
+    )
+    jobs = result.scalars().all()
+    return [_job_response(job) for job in jobs]
+
+@router.get("/reclassify/jobs/{job_id}", response_model=schemas.ReclassificationJobResponse)
+async def get_reclassification_job(
+    job_id: int,
+    current_user: models.User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Retourne l'avancement d'une tâche: progression, débit et temps restant estimé
+    
+    Args:
+        job_id: ID de la tâche
+        db: Session de base de données
+        
+    Returns:
+        État de la tâche
+    """
+    job = await db.get(models.ReclassificationJob, job_id)
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Tâche de reclassification non trouvée")
+    
+    return _job_response(job)
@@ -0,0 +1,146 @@
+"""
+Routes API de recherche dans les documents (texte extrait, noms de fichiers)
+"""
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from typing import Optional
+from database import get_db
+import models
+import schemas
+from auth_utils import get_current_active_user
+from pagination import encode_cursor, decode_cursor
+from services.search_service import search_documents, highlight_snippets
+from services.fuzzy_search import fuzzy_search
+
+router = APIRouter()
+
+
+@router.get("/documents/search", response_model=schemas.SearchPage)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Recherche dans le texte extrait des documents de l'utilisateur connecté
+    Résultats triés par pertinence, avec un extrait où les termes trouvés sont
+    entourés de <mark></mark>
+    
+    Args:
+        q: Texte recherché
+        cursor: Curseur next_cursor de la page précédente (première page si absent)
+        limit: Nombre maximum de résultats
+        db: Session de base de données
+    
+    Returns:
+        Page de résultats et curseur de la page suivante
+    """
+    after = decode_cursor(cursor, ("rank", "id")) if cursor else None
+    
+    # Une ligne de plus pour savoir s'il reste des résultats
+    hits = await search_documents(db, current_user.id, q, limit + 1, after)
+    has_more = len(hits) > limit
+    hits = hits[:limit]
+    
+    if not hits:
+        return schemas.SearchPage(items=[], next_cursor=None, has_more=False)
+    
+    document_ids = [document_id for document_id, _ in hits]
+    
+    # Colonnes affichées dans les résultats (sans le texte extrait)
+    result = await db.execute(
+        select(models.Document).where(
+            models.Document.id.in_(document_ids),
+            models.Document.user_id == current_user.id
+        ).options(load_only(
+            models.Document.filename,
+            models.Document.file_type,
+            models.Document.category,
+            models.Document.confidence,
+            models.Document.created_at,
+            raiseload=True
+        ))
+    )
+    documents = {document.id: document for document in result.scalars().all()}
+    snippets = await highlight_snippets(db, current_user.id, q, document_ids)
+    
+    items = [
+        schemas.SearchResult(
+            id=document_id,
+            filename=documents[document_id].filename,
+            file_type=documents[document_id].file_type,
+            category=documents[document_id].category,
+            confidence=documents[document_id].confidence,
+            created_at=documents[document_id].created_at,
+            rank=rank,
+            snippet=snippets.get(document_id)
+        )
+        for document_id, rank in hits
+        if document_id in documents
+    ]
+    
+    last_id, last_rank = hits[-1]
+    next_cursor = encode_cursor({"rank": last_rank, "id": last_id}) if has_more else None
+    
+    return schemas.SearchPage(items=items, next_cursor=next_cursor, has_more=has_more)
+
+
+@router.get("/documents/search/names", response_model=schemas.FuzzySearchResponse)
+async def search_names(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Recherche approximative sur le nom de fichier et la catégorie des documents de
+    l'utilisateur connecté (noms partiels, fautes de frappe)
+    
+    Args:
+        q: Texte recherché
+        limit: Nombre maximum de résultats
+        db: Session de base de données
+    
+    Returns:
+        Meilleures correspondances par score décroissant
+    """
+    matches = await fuzzy_search(db, current_user.id, q, limit)
+    if not matches:
+        return schemas.FuzzySearchResponse(query=q, items=[])
+    
+    result = await db.execute(
+        select(models.Document).where(
+            models.Document.id.in_([document_id for document_id, _ in matches]),
+            models.Document.user_id == current_user.id
+        ).options(load_only(
+            models.Document.filename,
+            models.Document.file_type,
+            models.Document.category,
+            models.Document.confidence,
+            models.Document.created_at,
+            raiseload=True
+        ))
+    )
+    documents = {document.id: document for document in result.scalars().all()}
+    
+    return schemas.FuzzySearchResponse(
+        query=q,
+        items=[
+            schemas.FuzzyMatch(
+                id=document_id,
+                filename=documents[document_id].filename,
+                file_type=documents[document_id].file_type,
+                category=documents[document_id].category,
+                confidence=documents[document_id].confidence,
+                created_at=documents[document_id].created_at,
+                score=score
+            )
+            for document_id, score in matches
+            if document_id in documents
+        ]
+    )
@@ -4,13 +4,15 @@ Route API pour les statistiques et l'export de données
 
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, undefer
+from sqlalchemy import select
 from database import get_db
 import models
 import schemas
 from auth_utils import get_current_active_user
-from datetime import datetime, timedelta
+from services.stats_rollup import read_statistics, read_category_stats, read_timeline
+from datetime import datetime
 import pandas as pd
 import io
 
@@ -19,10 +21,11 @@ router = APIRouter()
 @router.get("/stats", response_model=schemas.StatsResponse)
 async def get_statistics(
     current_user: models.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Retourne les statistiques de l'utilisateur connecté
+    Lues depuis les tables agrégées (user_stats, user_daily_counts)
     
     Args:
         db: Session de base de données
@@ -31,66 +34,7 @@ async def get_statistics(
         Statistiques complètes
     """
     try:
-        # Nombre total de documents de l'utilisateur
-        total_documents = db.query(models.Document).filter(
-            models.Document.user_id == current_user.id
-        ).count()
-        
-        # Documents par catégorie
-        category_counts = db.query(
-            models.Document.category,
-            func.count(models.Document.id)
-        ).filter(
-            models.Document.category.isnot(None),
-            models.Document.user_id == current_user.id
-        ).group_by(models.Document.category).all()
-        
-        documents_by_category = {
-            category: count for category, count in category_counts
-        }
-        
-        # Confiance moyenne
-        avg_confidence = db.query(
-            func.avg(models.Document.confidence)
-        ).filter(
-            models.Document.confidence.isnot(None),
-            models.Document.user_id == current_user.id
-        ).scalar() or 0.0
-        
-        # Total de mots extraits
-        total_words = db.query(
-            func.sum(models.DocumentMetadata.word_count)
-        ).join(models.Document).filter(
-            models.Document.user_id == current_user.id
-        ).scalar() or 0
-        
-        # Documents par type de fichier
-        type_counts = db.query(
-            models.Document.file_type,
-            func.count(models.Document.id)
-        ).filter(
-            models.Document.user_id == current_user.id
-        ).group_by(models.Document.file_type).all()
-        
-        documents_by_type = {
-            file_type: count for file_type, count in type_counts
-        }
-        
-        # Documents récents (7 derniers jours)
-        seven_days_ago = datetime.now() - timedelta(days=7)
-        recent_documents = db.query(models.Document).filter(
-            models.Document.created_at >= seven_days_ago,
-            models.Document.user_id == current_user.id
-        ).count()
-        
-        return schemas.StatsResponse(
-            total_documents=total_documents,
-            documents_by_category=documents_by_category,
-            average_confidence=round(avg_confidence, 4),
-            total_words_extracted=total_words,
-            documents_by_type=documents_by_type,
-            recent_documents=recent_documents
-        )
+        return await read_statistics(db, current_user.id)
         
     except Exception as e:
         raise HTTPException(
@@ -100,7 +44,7 @@ async def get_statistics(
 
 @router.get("/stats/categories")
 async def get_category_stats(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
     """
@@ -114,44 +58,7 @@ async def get_category_stats(
         Liste de statistiques par catégorie
     """
     try:
-        # Nombre total de documents classés
-        total_classified = db.query(models.Document).filter(
-            models.Document.category.isnot(None),
-            models.Document.user_id == current_user.id
-        ).count()
-        
-        if total_classified == 0:
-            return {"message": "Aucun document classé", "categories": []}
-        
-        # Stats par catégorie
-        categories_data = []
-        
-        category_stats = db.query(
-            models.Document.category,
-            func.count(models.Document.id).label('count'),
-            func.avg(models.Document.confidence).label('avg_confidence')
-        ).filter(
-            models.Document.category.isnot(None),
-            models.Document.user_id == current_user.id
-        ).group_by(models.Document.category).all()
-        
-        for category, count, avg_conf in category_stats:
-            percentage = (count / total_classified) * 100
-            
-            categories_data.append({
-                "category": category,
-                "count": count,
-                "percentage": round(percentage, 2),
-                "avg_confidence": round(avg_conf or 0.0, 4)
-            })
-        
-        # Trier par nombre de documents
-        categories_data.sort(key=lambda x: x['count'], reverse=True)
-        
-        return {
-            "total_classified": total_classified,
-            "categories": categories_data
-        }
+        return await read_category_stats(db, current_user.id)
         
     except Exception as e:
         raise HTTPException(
@@ -162,7 +69,7 @@ async def get_category_stats(
 @router.get("/stats/timeline")
 async def get_timeline_stats(
     days: int = 30,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
     """
@@ -177,26 +84,8 @@ async def get_timeline_stats(
         Timeline des documents créés
     """
     try:
-        start_date = datetime.now() - timedelta(days=days)
-        
-        # Documents par jour
-        daily_counts = db.query(
-            func.date(models.Document.created_at).label('date'),
-            func.count(models.Document.id).label('count')
-        ).filter(
-            models.Document.created_at >= start_date,
-            models.Document.user_id == current_user.id
-        ).group_by(func.date(models.Document.created_at)).all()
-        
-        timeline_data = [
-            {
-                "date": str(date),
-                "count": count
-            }
-            for date, count in daily_counts
-        ]
-        
-        timeline_data.sort(key=lambda x: x['date'])
+        # Documents par jour (table user_daily_counts)
+        timeline_data = await read_timeline(db, current_user.id, days)
         
         return {
             "period_days": days,
@@ -211,7 +100,7 @@ async def get_timeline_stats(
 
 @router.get("/export/csv")
 async def export_to_csv(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
     """
@@ -226,9 +115,12 @@ async def export_to_csv(
     """
     try:
         # Récupérer tous les documents avec leurs métadonnées
-        documents = db.query(models.Document).filter(
-            models.Document.user_id == current_user.id
-        ).all()
+        result = await db.execute(
+            select(models.Document).where(
+                models.Document.user_id == current_user.id
+            ).options(selectinload(models.Document.doc_metadata))
+        )
+        documents = result.scalars().all()
         
         if not documents:
             raise HTTPException(status_code=404, detail="Aucun document à exporter")
@@ -279,7 +171,7 @@ async def export_to_csv(
 
 @router.get("/export/json")
 async def export_to_json(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
     """
@@ -293,9 +185,15 @@ async def export_to_json(
         Fichier JSON téléchargeable
     """
     try:
-        documents = db.query(models.Document).filter(
-            models.Document.user_id == current_user.id
-        ).all()
+        result = await db.execute(
+            select(models.Document).where(
+                models.Document.user_id == current_user.id
+            ).options(
+                selectinload(models.Document.doc_metadata),
+                undefer(models.Document.extracted_text)
+            )
+        )
+        documents = result.scalars().all()
         
         if not documents:
             raise HTTPException(status_code=404, detail="Aucun document à exporter")
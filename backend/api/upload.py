@@ -2,17 +2,30 @@
 Route API pour le téléversement de documents
 """
 
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query, Request, Header
 from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, insert, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, load_only, undefer, with_expression
 from database import get_db
 import models
 import schemas
 import os
-import shutil
+import anyio
 from datetime import datetime
+from typing import Optional, List
 from dotenv import load_dotenv
 from auth_utils import get_current_active_user
+from pagination import encode_cursor, decode_cursor, cursor_datetime
+from services.stats_rollup import StatsDelta, utc_day, utc_today
+from services.vector_store import vector_store
+from services.document_facets import facet_counts
+from services.file_storage import StagedFile, stage_upload, discard_staged, hash_file, UploadTooLarge, MAX_UPLOAD_SIZES
+from services.blob_store import STAGING_PATH, store_blob, store_blobs, release_blob, purge_trashed, restore_trashed
+from services import upload_sessions
+from services.document_processing import processing_pool
+from services.job_queue import enqueue_documents
 
 load_dotenv()
 
@@ -20,144 +33,703 @@ router = APIRouter()
 
 STORAGE_PATH = os.getenv("STORAGE_PATH", "./storage/documents")
 
-@router.post("/upload", response_model=schemas.UploadResponse)
-async def upload_document(
-    file: UploadFile = File(...),
-    current_user: models.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
-):
+# Nombre maximum de fichiers par téléversement groupé
+MAX_BATCH_FILES = int(os.getenv("MAX_UPLOAD_BATCH_FILES", "500"))
+
+# Fichiers d'un lot écrits en parallèle dans le dossier de transit
+BATCH_UPLOAD_CONCURRENCY = 8
+
+# Longueur de l'aperçu du texte renvoyé dans les listes
+TEXT_PREVIEW_LENGTH = 150
+
+# Champs disponibles pour ?fields= (colonnes de documents et champs calculés)
+SUMMARY_FIELDS = list(schemas.DocumentSummary.model_fields)
+
+
+def parse_fields(fields: Optional[str]) -> list[str]:
     """
-    Téléverse un document (PDF, PNG, JPG)
+    Valide la liste de champs demandés (?fields=id,filename,category)
     
-    Args:
-        file: Fichier à téléverser
-        db: Session de base de données
-        
     Returns:
-        Informations sur le document téléversé
+        Champs à renvoyer (l'id est toujours inclus)
     """
-    # Vérifier le type de fichier
-    allowed_extensions = ['.pdf', '.png', '.jpg', '.jpeg']
-    file_extension = os.path.splitext(file.filename)[1].lower()
+    if not fields:
+        return SUMMARY_FIELDS
     
-    if file_extension not in allowed_extensions:
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in SUMMARY_FIELDS]
+    if unknown:
         raise HTTPException(
             status_code=400,
-            detail=f"Type de fichier non supporté. Extensions autorisées: {', '.join(allowed_extensions)}"
+            detail=f"Champs inconnus: {', '.join(unknown)}. Champs disponibles: {', '.join(SUMMARY_FIELDS)}"
         )
     
+    if "id" not in requested:
+        requested.insert(0, "id")
+    return requested
+
+
+def summary_options(fields: list[str]) -> list:
+    """
+    Options de chargement limitées aux champs demandés
+    Le texte complet n'est jamais lu: l'aperçu est tronqué par la base
+    """
+    columns = [
+        getattr(models.Document, field) for field in fields
+        if field not in ("text_preview", "doc_metadata")
+    ]
+    options = [load_only(*columns, raiseload=True)]
+    
+    if "text_preview" in fields:
+        options.append(with_expression(
+            models.Document.text_preview,
+            func.substr(models.Document.extracted_text, 1, TEXT_PREVIEW_LENGTH)
+        ))
+    if "doc_metadata" in fields:
+        # Une seule requête pour les métadonnées de toute la page
+        options.append(selectinload(models.Document.doc_metadata))
+    
+    return options
+
+
+# Extensions acceptées au téléversement
+ALLOWED_EXTENSIONS = ['.pdf', '.png', '.jpg', '.jpeg']
+
+
+def upload_file_type(filename: str) -> tuple:
+    """
+    Vérifie l'extension d'un fichier téléversé
+    
+    Returns:
+        Tuple (extension en minuscules, type de fichier PDF ou IMAGE)
+    """
+    file_extension = os.path.splitext(filename)[1].lower()
+    
+    if file_extension not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Type de fichier non supporté. Extensions autorisées: {', '.join(ALLOWED_EXTENSIONS)}"
+        )
+    
+    return file_extension, "PDF" if file_extension == '.pdf' else "IMAGE"
+
+
+def upload_too_large(file_type: str) -> HTTPException:
+    """Erreur 413 avec la taille maximale du type de fichier"""
+    return HTTPException(
+        status_code=413,
+        detail=f"Le fichier est trop volumineux. Taille maximale ({file_type}): "
+               f"{MAX_UPLOAD_SIZES[file_type] // (1024 * 1024)} Mo"
+    )
+
+
+async def save_document(db: AsyncSession, user_id: int, filename: str, file_type: str,
+                        file_extension: str, staged: StagedFile,
+                        auto_process: bool = False) -> schemas.UploadResponse:
+    """
+    Place un fichier reçu dans le stockage par contenu et crée son document (le fichier
+    temporaire est supprimé en cas d'erreur). Avec auto_process, le document est mis
+    en file de traitement (OCR puis classification en arrière-plan)
+    
+    Returns:
+        Informations sur le document téléversé
+    """
     try:
-        # Créer un nom de fichier unique avec timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        safe_filename = f"{timestamp}_{file.filename}"
-        file_path = os.path.join(STORAGE_PATH, safe_filename)
-        
-        # Créer le dossier de stockage s'il n'existe pas
-        os.makedirs(STORAGE_PATH, exist_ok=True)
-        
-        # Sauvegarder le fichier
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Déterminer le type de fichier
-        file_type = "PDF" if file_extension == '.pdf' else "IMAGE"
+        # Contenu stocké une seule fois: le fichier n'est écrit que s'il est nouveau
+        file_path = await store_blob(db, staged, file_extension)
         
         # Créer l'entrée dans la base de données
         db_document = models.Document(
-            filename=file.filename,
+            filename=filename,
             filepath=file_path,
             file_type=file_type,
-            user_id=current_user.id
+            sha256=staged.sha256,
+            size_bytes=staged.size_bytes,
+            blob_sha256=staged.sha256,
+            processing_status="queued" if auto_process else None,
+            user_id=user_id
         )
         
         db.add(db_document)
-        db.commit()
-        db.refresh(db_document)
+        
+        # Statistiques agrégées mises à jour dans la même transaction
+        delta = StatsDelta()
+        delta.add_document(db_document, +1, day=utc_today())
+        await delta.apply(db)
+        
+        if auto_process:
+            # Tâche de traitement créée dans la même transaction que le document
+            await db.flush()
+            await enqueue_documents(db, user_id, [db_document.id])
+        
+        await db.commit()
+        await db.refresh(db_document)
+        
+        if auto_process:
+            processing_pool.notify()
         
         return schemas.UploadResponse(
             message="Document téléversé avec succès",
             document_id=db_document.id,
-            filename=file.filename,
+            filename=filename,
             filepath=file_path,
-            file_type=file_type
+            file_type=file_type,
+            sha256=staged.sha256,
+            size_bytes=staged.size_bytes,
+            processing_status=db_document.processing_status
         )
-        
+    
     except Exception as e:
+        # Un fichier de blob déjà placé sans ligne blobs est supprimé par: python -m services.blob_store --gc
+        await db.rollback()
+        await discard_staged(staged.path)
         raise HTTPException(
             status_code=500,
             detail=f"Erreur lors du téléversement: {str(e)}"
         )
 
+
+@router.post("/upload", response_model=schemas.UploadResponse)
+async def upload_document(
+    file: UploadFile = File(...),
+    auto_process: bool = Query(False, description="OCR puis classification en arrière-plan (GET /documents/{id}/status)"),
+    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Téléverse un document (PDF, PNG, JPG)
+    Le fichier est écrit par blocs sans bloquer le serveur, avec calcul de son
+    empreinte SHA-256 et de sa taille (limitée par type: MAX_UPLOAD_SIZE_PDF_MB,
+    MAX_UPLOAD_SIZE_IMAGE_MB)
+    
+    Args:
+        file: Fichier à téléverser
+        auto_process: Mettre le document en file de traitement (OCR puis classification)
+        db: Session de base de données
+    
+    Returns:
+        Informations sur le document téléversé
+    """
+    # Vérifier le type de fichier
+    file_extension, file_type = upload_file_type(file.filename)
+    
+    try:
+        # Écrire le fichier dans le dossier de transit (empreinte et taille calculées au passage)
+        staged = await stage_upload(file, STAGING_PATH, MAX_UPLOAD_SIZES[file_type])
+    except UploadTooLarge:
+        raise upload_too_large(file_type)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors du téléversement: {str(e)}"
+        )
+    
+    return await save_document(db, current_user.id, file.filename, file_type, file_extension, staged,
+                               auto_process)
+
+@router.post("/upload/batch", response_model=schemas.BatchUploadResponse)
+async def upload_documents(
+    files: List[UploadFile] = File(...),
+    auto_process: bool = Query(False, description="OCR puis classification en arrière-plan (GET /documents/{id}/status)"),
+    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Téléverse plusieurs documents en une requête (dossier entier)
+    Les fichiers sont écrits en parallèle, puis toutes les références aux contenus et
+    tous les documents sont créés par quelques requêtes groupées, dans une seule
+    transaction. Un fichier refusé (extension, taille) n'empêche pas les autres
+    
+    Args:
+        files: Fichiers à téléverser (MAX_UPLOAD_BATCH_FILES au plus)
+        auto_process: Mettre les documents en file de traitement (OCR puis classification)
+        db: Session de base de données
+    
+    Returns:
+        Résultat de chaque fichier, dans l'ordre de l'envoi
+    """
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Trop de fichiers: {MAX_BATCH_FILES} au maximum par envoi"
+        )
+    
+    items = [schemas.BatchUploadItem(filename=file.filename or "", status="error") for file in files]
+    accepted = {}
+    limiter = anyio.CapacityLimiter(BATCH_UPLOAD_CONCURRENCY)
+    
+    async def stage(position: int, file: UploadFile):
+        try:
+            file_extension, file_type = upload_file_type(file.filename or "")
+            async with limiter:
+                staged = await stage_upload(file, STAGING_PATH, MAX_UPLOAD_SIZES[file_type])
+            accepted[position] = (staged, file_extension, file_type)
+        except UploadTooLarge:
+            items[position].error = upload_too_large(file_type).detail
+        except HTTPException as e:
+            items[position].error = e.detail
+        except Exception as e:
+            items[position].error = f"Erreur lors du téléversement: {str(e)}"
+    
+    async with anyio.create_task_group() as group:
+        for position, file in enumerate(files):
+            group.start_soon(stage, position, file)
+    
+    positions = sorted(accepted)
+    if positions:
+        try:
+            # Une requête pour les références aux contenus, une pour les documents
+            paths = await store_blobs(db, [accepted[p][:2] for p in positions])
+            rows = [
+                {
+                    "filename": items[p].filename,
+                    "filepath": path,
+                    "file_type": accepted[p][2],
+                    "sha256": accepted[p][0].sha256,
+                    "size_bytes": accepted[p][0].size_bytes,
+                    "blob_sha256": accepted[p][0].sha256,
+                    "processing_status": "queued" if auto_process else None,
+                    "user_id": current_user.id
+                }
+                for p, path in zip(positions, paths)
+            ]
+            # RETURNING sans ordre garanti (sort_by_parameter_order insère ligne par ligne
+            # sur SQLite): les ids sont rendus par (nom, contenu), les lignes identiques
+            # étant interchangeables
+            inserted = {}
+            for document_id, filename, sha256 in (await db.execute(
+                insert(models.Document).returning(
+                    models.Document.id, models.Document.filename, models.Document.sha256
+                ),
+                rows
+            )).all():
+                inserted.setdefault((filename, sha256), []).append(document_id)
+            document_ids = [inserted[(row["filename"], row["sha256"])].pop() for row in rows]
+            
+            # Statistiques agrégées mises à jour dans la même transaction
+            delta = StatsDelta()
+            for row in rows:
+                delta.add(current_user.id, +1, file_type=row["file_type"], day=utc_today())
+            await delta.apply(db)
+            
+            if auto_process:
+                await enqueue_documents(db, current_user.id, document_ids)
+            
+            await db.commit()
+        
+        except Exception as e:
+            # Un fichier de blob déjà placé sans ligne blobs est supprimé par: python -m services.blob_store --gc
+            await db.rollback()
+            for p in positions:
+                await discard_staged(accepted[p][0].path)
+            raise HTTPException(
+                status_code=500,
+                detail=f"Erreur lors du téléversement: {str(e)}"
+            )
+        
+        if auto_process:
+            processing_pool.notify()
+        
+        for p, row, document_id in zip(positions, rows, document_ids):
+            items[p] = schemas.BatchUploadItem(
+                filename=row["filename"],
+                status="uploaded",
+                document_id=document_id,
+                filepath=row["filepath"],
+                file_type=row["file_type"],
+                sha256=row["sha256"],
+                size_bytes=row["size_bytes"],
+                processing_status=row["processing_status"]
+            )
+    
+    return schemas.BatchUploadResponse(
+        uploaded=len(positions),
+        failed=len(files) - len(positions),
+        items=items
+    )
+
+
+async def upload_session_response(db: AsyncSession, session: models.UploadSession) -> schemas.UploadSessionResponse:
+    """État d'un téléversement reprenable (morceaux reçus et manquants)"""
+    received = await upload_sessions.received_chunks(db, session.id)
+    return schemas.UploadSessionResponse(
+        upload_id=session.id,
+        filename=session.filename,
+        file_type=session.file_type,
+        status=session.status,
+        total_size=session.total_size,
+        chunk_size=session.chunk_size,
+        expires_at=session.expires_at,
+        **upload_sessions.upload_progress(session, received)
+    )
+
+
+async def get_upload_session(db: AsyncSession, upload_id: str, user_id: int) -> models.UploadSession:
+    """Session de l'utilisateur, 404 si inconnue ou expirée"""
+    session = await upload_sessions.get_session(db, upload_id, user_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Téléversement non trouvé ou expiré")
+    return session
+
+
+@router.post("/upload/sessions", response_model=schemas.UploadSessionResponse)
+async def create_upload_session(
+    request: schemas.UploadSessionCreate,
+    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Crée un téléversement reprenable (gros fichiers, connexions instables)
+    Envoyer ensuite chaque morceau (PUT .../chunks/{numéro}, chunk_size octets, corps
+    brut), consulter les morceaux manquants après une coupure (GET) puis finaliser
+    (POST .../complete)
+    
+    Args:
+        request: Nom, taille totale et empreinte SHA-256 facultative du fichier
+        db: Session de base de données
+    
+    Returns:
+        État du téléversement (taille et nombre des morceaux)
+    """
+    file_extension, file_type = upload_file_type(request.filename)
+    if request.total_size > MAX_UPLOAD_SIZES[file_type]:
+        raise upload_too_large(file_type)
+    
+    session = await upload_sessions.create_session(
+        db, current_user.id, request.filename, file_type, request.total_size, request.sha256
+    )
+    return await upload_session_response(db, session)
+
+
+@router.get("/upload/sessions/{upload_id}", response_model=schemas.UploadSessionResponse)
+async def get_upload_session_status(
+    upload_id: str,
+    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    État d'un téléversement reprenable: octets reçus et morceaux à renvoyer
+    """
+    session = await get_upload_session(db, upload_id, current_user.id)
+    return await upload_session_response(db, session)
+
+
+@router.put("/upload/sessions/{upload_id}/chunks/{chunk_index}", response_model=schemas.UploadSessionResponse)
+async def upload_chunk(
+    upload_id: str,
+    chunk_index: int,
+    request: Request,
+    x_chunk_sha256: Optional[str] = Header(None),
+    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Envoie un morceau d'un téléversement reprenable (corps brut de la requête)
+    Un morceau peut être renvoyé: il remplace la version précédente
+    
+    Args:
+        upload_id: ID du téléversement
+        chunk_index: Numéro du morceau (à partir de 0)
+        x_chunk_sha256: Empreinte SHA-256 du morceau, vérifiée avant de l'enregistrer (en-tête facultatif)
+    
+    Returns:
+        État du téléversement
+    """
+    session = await get_upload_session(db, upload_id, current_user.id)
+    if session.status != "open":
+        raise HTTPException(status_code=409, detail="Téléversement en cours de finalisation")
+    if not 0 <= chunk_index < upload_sessions.chunk_count(session):
+        raise HTTPException(status_code=400, detail="Numéro de morceau invalide")
+    
+    offset = chunk_index * session.chunk_size
+    length = upload_sessions.chunk_length(session, chunk_index)
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length != str(length):
+        raise HTTPException(status_code=400, detail=f"Le morceau {chunk_index} doit faire {length} octets")
+    
+    # Aucune transaction ouverte pendant la réception du morceau; pas de finalisation
+    # avant la fin de son écriture
+    path, user_id = session.path, current_user.id
+    write = await upload_sessions.begin_chunk(db, upload_id, chunk_index)
+    if write is None:
+        raise HTTPException(status_code=409, detail="Téléversement en cours de finalisation")
+    
+    size = None
+    try:
+        await upload_sessions.write_chunk(
+            request.stream(), path, offset, length, x_chunk_sha256, write.lease_until
+        )
+        size = length
+    except upload_sessions.ChunkRejected as e:
+        # Le morceau refusé a pu écraser une version reçue: il est à renvoyer
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Téléversement non trouvé ou expiré")
+    finally:
+        # Écriture terminée, même si le client s'est déconnecté
+        with anyio.CancelScope(shield=True):
+            recorded = await upload_sessions.record_chunk(db, write, size)
+    
+    if not recorded:
+        raise HTTPException(status_code=404, detail="Téléversement non trouvé ou expiré")
+    
+    session = await get_upload_session(db, upload_id, user_id)
+    return await upload_session_response(db, session)
+
+
+@router.post("/upload/sessions/{upload_id}/complete", response_model=schemas.UploadResponse)
+async def complete_upload_session(
+    upload_id: str,
+    auto_process: bool = Query(False, description="OCR puis classification en arrière-plan (GET /documents/{id}/status)"),
+    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Finalise un téléversement reprenable: vérifie que tous les morceaux sont reçus et
+    l'empreinte SHA-256 annoncée, puis crée le document comme POST /upload
+    (auto_process: traitement en arrière-plan)
+    
+    Returns:
+        Informations sur le document téléversé
+    """
+    session = await get_upload_session(db, upload_id, current_user.id)
+    if session.status != "open":
+        raise HTTPException(status_code=409, detail="Téléversement en cours de finalisation")
+    
+    missing = upload_sessions.upload_progress(
+        session, await upload_sessions.received_chunks(db, upload_id)
+    )["missing_chunks"]
+    if missing:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Morceaux manquants: {', '.join(str(index) for index in missing[:20])}"
+                   f"{'...' if len(missing) > 20 else ''}"
+        )
+    
+    filename, file_type, path, expected_sha256 = session.filename, session.file_type, session.path, session.sha256
+    if not await upload_sessions.claim_session(db, upload_id):
+        raise HTTPException(
+            status_code=409,
+            detail="Téléversement en cours de finalisation ou morceau en cours d'envoi: réessayer après son envoi"
+        )
+    
+    try:
+        sha256, size_bytes = await run_in_threadpool(hash_file, path)
+    except Exception as e:
+        await upload_sessions.delete_sessions(db, [upload_id])
+        raise HTTPException(status_code=500, detail=f"Erreur lors du téléversement: {str(e)}")
+    
+    if expected_sha256 and sha256 != expected_sha256:
+        await upload_sessions.delete_sessions(db, [upload_id])
+        raise HTTPException(
+            status_code=422,
+            detail="L'empreinte SHA-256 du fichier reçu ne correspond pas: téléversement à recommencer"
+        )
+    
+    # Session supprimée dans la transaction du document; son fichier devient le blob
+    await upload_sessions.forget_sessions(db, [upload_id])
+    try:
+        return await save_document(
+            db, current_user.id, filename, file_type, os.path.splitext(filename)[1].lower(),
+            StagedFile(path, sha256, size_bytes), auto_process
+        )
+    except HTTPException:
+        await upload_sessions.delete_sessions(db, [upload_id])
+        raise
+
+
+@router.delete("/upload/sessions/{upload_id}")
+async def cancel_upload_session(
+    upload_id: str,
+    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Abandonne un téléversement reprenable (morceaux reçus supprimés)
+    """
+    await get_upload_session(db, upload_id, current_user.id)
+    await upload_sessions.delete_sessions(db, [upload_id])
+    return {"message": "Téléversement annulé", "upload_id": upload_id}
+
+
 @router.delete("/documents/{document_id}")
 async def delete_document(
     document_id: int,
     current_user: models.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Supprime un document
+    Le fichier n'est supprimé qu'avec la dernière référence à son contenu
     
     Args:
         document_id: ID du document à supprimer
         db: Session de base de données
-        
+    
     Returns:
         Message de confirmation
     """
     # Récupérer le document
-    document = db.query(models.Document).filter(
-        models.Document.id == document_id,
-        models.Document.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(models.Document).where(
+            models.Document.id == document_id,
+            models.Document.user_id == current_user.id
+        )
+    )
+    document = result.scalars().first()
     
     if not document:
         raise HTTPException(status_code=404, detail="Document non trouvé ou accès refusé")
     
+    trashed = None
     try:
-        # Supprimer le fichier physique
-        if os.path.exists(document.filepath):
-            os.remove(document.filepath)
-        
-        # Supprimer de la base de données
-        db.delete(document)
-        db.commit()
+        # Retirer la contribution du document aux statistiques agrégées
+        word_count = await db.scalar(
+            select(func.sum(models.DocumentMetadata.word_count)).where(
+                models.DocumentMetadata.document_id == document.id
+            )
+        )
+        delta = StatsDelta()
+        delta.add_document(document, -1, word_count=word_count, day=utc_day(document.created_at))
+        await delta.apply(db)
         
-        return {"message": "Document supprimé avec succès", "document_id": document_id}
+        # Supprimer de la base de données, puis la référence au contenu
+        blob_sha256, legacy_path = document.blob_sha256, document.filepath
+        await db.delete(document)
+        await db.flush()
+        if blob_sha256:
+            trashed = await release_blob(db, blob_sha256)
         
+        await db.commit()
+    
     except Exception as e:
+        await db.rollback()
+        await restore_trashed(trashed)
         raise HTTPException(
             status_code=500,
             detail=f"Erreur lors de la suppression: {str(e)}"
         )
+    
+    # Supprimer le fichier physique (dernière référence, ou document non migré)
+    await purge_trashed(trashed)
+    if not blob_sha256 and os.path.exists(legacy_path):
+        os.remove(legacy_path)
+    
+    # Retirer le document de l'index des documents similaires
+    await run_in_threadpool(vector_store.remove, current_user.id, [document_id])
+    
+    return {"message": "Document supprimé avec succès", "document_id": document_id}
 
-@router.get("/documents", response_model=list[schemas.DocumentResponse])
+@router.get("/documents", response_model=schemas.DocumentPage, response_model_exclude_unset=True)
 async def get_all_documents(
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=100),
+    category: Optional[str] = None,
+    file_type: Optional[str] = None,
+    language: Optional[str] = None,
+    min_confidence: Optional[float] = Query(None, ge=0.0, le=1.0),
+    max_confidence: Optional[float] = Query(None, ge=0.0, le=1.0),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    fields: Optional[str] = None,
     current_user: models.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    Récupère tous les documents de l'utilisateur connecté
+    Récupère les documents de l'utilisateur connecté, du plus récent au plus ancien
+    Pagination par curseur sur (created_at, id): chaque page coûte le même prix,
+    quelle que soit sa profondeur, et reste stable pendant les téléversements
+    Le texte extrait complet est disponible via GET /documents/{id}
+    La première page contient aussi les comptes par catégorie, type et langue
+    des documents filtrés (facettes)
     
     Args:
-        skip: Nombre de documents à ignorer (pagination)
+        cursor: Curseur next_cursor de la page précédente (première page si absent)
         limit: Nombre maximum de documents à retourner
+        category: Filtrer par catégorie
+        file_type: Filtrer par type de fichier (PDF, IMAGE)
+        language: Filtrer par langue détectée (fra, eng...)
+        min_confidence: Confiance minimale de la classification
+        max_confidence: Confiance maximale de la classification
+        date_from: Documents créés à partir de cette date
+        date_to: Documents créés avant cette date
+        fields: Champs à renvoyer, séparés par des virgules (tous par défaut)
         db: Session de base de données
-        
+    
     Returns:
-        Liste de documents
+        Page de documents, curseur de la page suivante et facettes (première page)
     """
-    documents = db.query(models.Document).filter(
-        models.Document.user_id == current_user.id
-    ).offset(skip).limit(limit).all()
-    return documents
+    selected_fields = parse_fields(fields)
+    
+    # Filtres hors facettes (confiance, dates)
+    conditions = []
+    if min_confidence is not None:
+        conditions.append(models.Document.confidence >= min_confidence)
+    if max_confidence is not None:
+        conditions.append(models.Document.confidence <= max_confidence)
+    if date_from:
+        conditions.append(models.Document.created_at >= date_from)
+    if date_to:
+        conditions.append(models.Document.created_at < date_to)
+    
+    selected = {"category": category or None, "file_type": file_type or None, "language": language or None}
+    
+    # created_at est toujours chargé: il sert à construire le curseur
+    query = select(models.Document).where(
+        models.Document.user_id == current_user.id,
+        *conditions,
+        *[getattr(models.Document, facet) == value for facet, value in selected.items() if value]
+    ).options(
+        *summary_options(selected_fields),
+        load_only(models.Document.created_at)
+    )
+    
+    if cursor:
+        position = decode_cursor(cursor, ("created_at", "id"))
+        query = query.where(
+            tuple_(models.Document.created_at, models.Document.id) < tuple_(
+                cursor_datetime(position["created_at"], db.bind.dialect.name),
+                position["id"]
+            )
+        )
+    
+    # Lire un document de plus pour savoir s'il existe une page suivante
+    result = await db.execute(
+        query.order_by(
+            models.Document.created_at.desc(),
+            models.Document.id.desc()
+        ).limit(limit + 1)
+    )
+    documents = result.scalars().all()
+    
+    has_more = len(documents) > limit
+    documents = documents[:limit]
+    
+    next_cursor = None
+    if has_more:
+        last = documents[-1]
+        next_cursor = encode_cursor({"created_at": last.created_at, "id": last.id})
+    
+    page = {
+        "items": [
+            {field: getattr(document, field) for field in selected_fields}
+            for document in documents
+        ],
+        "next_cursor": next_cursor,
+        "has_more": has_more
+    }
+    
+    # Les facettes ne changent pas d'une page à l'autre: calculées pour la première seulement
+    if not cursor:
+        page["facets"] = await facet_counts(db, current_user.id, selected, conditions)
+    
+    return page
 
 @router.get("/documents/{document_id}", response_model=schemas.DocumentResponse)
 async def get_document(
     document_id: int,
     current_user: models.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Récupère un document spécifique
@@ -165,24 +737,70 @@ async def get_document(
     Args:
         document_id: ID du document
         db: Session de base de données
-        
+    
     Returns:
         Document avec ses métadonnées
     """
-    document = db.query(models.Document).filter(
-        models.Document.id == document_id,
-        models.Document.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(models.Document).where(
+            models.Document.id == document_id,
+            models.Document.user_id == current_user.id
+        ).options(
+            selectinload(models.Document.doc_metadata),
+            undefer(models.Document.extracted_text)
+        )
+    )
+    document = result.scalars().first()
     
     if not document:
         raise HTTPException(status_code=404, detail="Document non trouvé")
     
     return document
+
+
+@router.get("/documents/{document_id}/status", response_model=schemas.ProcessingStatusResponse)
+async def get_processing_status(
+    document_id: int,
+    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Avancement du traitement en arrière-plan d'un document (auto_process)
+    
+    Returns:
+        Statut (queued, ocr, classifying, done, failed; None sans traitement automatique),
+        erreur éventuelle et catégorie une fois classé
+    """
+    result = await db.execute(
+        select(models.Document).where(
+            models.Document.id == document_id,
+            models.Document.user_id == current_user.id
+        ).options(load_only(
+            models.Document.processing_status,
+            models.Document.processing_error,
+            models.Document.category,
+            models.Document.confidence,
+            raiseload=True
+        ))
+    )
+    document = result.scalars().first()
+    
+    if not document:
+        raise HTTPException(status_code=404, detail="Document non trouvé ou accès refusé")
+    
+    return schemas.ProcessingStatusResponse(
+        document_id=document.id,
+        processing_status=document.processing_status,
+        processing_error=document.processing_error,
+        category=document.category,
+        confidence=document.confidence
+    )
+
 @router.get("/documents/{document_id}/image")
 async def get_document_image(
     document_id: int,
     current_user: models.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Récupère l'image d'un document
@@ -191,14 +809,17 @@ async def get_document_image(
         document_id: ID du document
         db: Session de base de données
         current_user: Utilisateur connecté
-        
+    
     Returns:
         Fichier image
     """
-    document = db.query(models.Document).filter(
-        models.Document.id == document_id,
-        models.Document.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(models.Document).where(
+            models.Document.id == document_id,
+            models.Document.user_id == current_user.id
+        )
+    )
+    document = result.scalars().first()
     
     if not document:
         raise HTTPException(status_code=404, detail="Document non trouvé")
@@ -0,0 +1,178 @@
+"""
+Test de charge des routes de lecture de l'API (liste des documents et statistiques)
+Envoie des requêtes concurrentes et mesure le débit (req/s) et les latences p50/p95/p99
+
+Usage (API démarrée):
+    python benchmarks/load_test.py --username demo --password demo123 --output before.json
+    python benchmarks/load_test.py --username demo --password demo123 --output after.json
+    python benchmarks/load_test.py --compare before.json after.json
+"""
+
+import argparse
+import json
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+# Routes mesurées par défaut
+DEFAULT_ENDPOINTS = ["/api/documents", "/api/stats"]
+
+
+def login(base_url, username, password):
+    """
+    Récupère un token JWT via /api/login
+    
+    Returns:
+        Token d'accès
+    """
+    data = urllib.parse.urlencode({"username": username, "password": password}).encode()
+    request = urllib.request.Request(f"{base_url}/api/login", data=data, method="POST")
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read())["access_token"]
+
+
+def timed_request(url, headers, timeout):
+    """
+    Envoie une requête GET et mesure sa durée
+    
+    Returns:
+        Tuple (latence en ms, succès)
+    """
+    request = urllib.request.Request(url, headers=headers)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            ok = 200 <= response.status < 300
+    except (urllib.error.URLError, TimeoutError):
+        ok = False
+    return (time.perf_counter() - start) * 1000, ok
+
+
+def run_endpoint(base_url, endpoint, headers, requests_count, concurrency, timeout):
+    """
+    Mesure une route sous charge concurrente
+    
+    Args:
+        base_url: URL de l'API
+        endpoint: Route à mesurer
+        headers: En-têtes HTTP (authentification)
+        requests_count: Nombre total de requêtes
+        concurrency: Nombre de clients simultanés
+        timeout: Délai maximum par requête (s)
+    
+    Returns:
+        Dictionnaire des métriques
+    """
+    url = base_url + endpoint
+    
+    # Préchauffage (connexions du pool, caches)
+    for _ in range(min(concurrency, 10)):
+        timed_request(url, headers, timeout)
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(
+            lambda _: timed_request(url, headers, timeout),
+            range(requests_count)
+        ))
+    elapsed = time.perf_counter() - start
+    
+    latencies = np.array([latency for latency, ok in results if ok])
+    errors = sum(1 for _, ok in results if not ok)
+    
+    metrics = {
+        "endpoint": endpoint,
+        "requests": requests_count,
+        "concurrency": concurrency,
+        "errors": errors,
+        "requests_per_s": round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0
+    }
+    for percentile in (50, 95, 99):
+        metrics[f"p{percentile}_ms"] = (
+            round(float(np.percentile(latencies, percentile)), 2) if len(latencies) else None
+        )
+    return metrics
+
+
+def print_results(results):
+    """Affiche les métriques de chaque route"""
+    print(f"\n{'Route':<25}{'req/s':>10}{'p50 (ms)':>12}{'p95 (ms)':>12}{'p99 (ms)':>12}{'erreurs':>10}")
+    print("-"*81)
+    for metrics in results:
+        print(f"{metrics['endpoint']:<25}{metrics['requests_per_s']:>10}"
+              f"{str(metrics['p50_ms']):>12}{str(metrics['p95_ms']):>12}"
+              f"{str(metrics['p99_ms']):>12}{metrics['errors']:>10}")
+
+
+def compare_results(before_path, after_path):
+    """
+    Compare deux exécutions enregistrées avec --output
+    """
+    with open(before_path, encoding="utf-8") as f:
+        before = {m["endpoint"]: m for m in json.load(f)["results"]}
+    with open(after_path, encoding="utf-8") as f:
+        after = {m["endpoint"]: m for m in json.load(f)["results"]}
+    
+    print(f"\n📊 Comparaison {before_path} → {after_path}")
+    print(f"\n{'Route':<25}{'Métrique':<12}{'avant':>12}{'après':>12}{'écart':>10}")
+    print("-"*71)
+    for endpoint in before:
+        if endpoint not in after:
+            continue
+        for key in ("requests_per_s", "p50_ms", "p95_ms", "p99_ms"):
+            old, new = before[endpoint][key], after[endpoint][key]
+            change = f"{(new - old) / old * 100:+.1f}%" if old and new is not None else "-"
+            print(f"{endpoint:<25}{key:<12}{str(old):>12}{str(new):>12}{change:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge des routes de lecture de l'API")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--token", default=None, help="Token JWT (sinon --username/--password)")
+    parser.add_argument("--username", default=None)
+    parser.add_argument("--password", default=None)
+    parser.add_argument("--endpoints", nargs="+", default=DEFAULT_ENDPOINTS)
+    parser.add_argument("--requests", type=int, default=500, help="Requêtes par route")
+    parser.add_argument("--concurrency", type=int, default=50, help="Clients simultanés")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--output", default=None, help="Enregistrer les résultats en JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("AVANT", "APRES"),
+                        help="Comparer deux fichiers de résultats")
+    args = parser.parse_args()
+    
+    if args.compare:
+        compare_results(*args.compare)
+        return
+    
+    token = args.token
+    if token is None:
+        if not args.username or not args.password:
+            parser.error("--token ou --username/--password requis")
+        token = login(args.base_url, args.username, args.password)
+    headers = {"Authorization": f"Bearer {token}"}
+    
+    print(f"🚀 Test de charge: {args.requests} requêtes par route, {args.concurrency} clients simultanés")
+    results = [
+        run_endpoint(args.base_url, endpoint, headers, args.requests, args.concurrency, args.timeout)
+        for endpoint in args.endpoints
+    ]
+    print_results(results)
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "base_url": args.base_url,
+                "measured_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "results": results
+            }, f, indent=2)
+        print(f"\n💾 Résultats enregistrés dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,19 +10,18 @@ import os
 from dotenv import load_dotenv
 
 # Importer les routes API
-from api import upload, ocr, classify, stats, auth, guest
+from api import upload, ocr, classify, stats, auth, guest, reclassify, search, duplicates
 
 # Importer les modèles et la base de données
-from database import engine, Base
+from database import AUTO_MIGRATE, run_migrations
 import models
+from services.reclassification_service import reclassification_service
+from services.upload_sessions import upload_session_collector
+from services.document_processing import processing_pool
 
 # Charger les variables d'environnement
 load_dotenv()
 
-# Créer les tables dans la base de données
-# Si les tables existent déjà, elles ne seront pas recréées
-Base.metadata.create_all(bind=engine)
-
 # Créer le dossier de stockage s'il n'existe pas
 STORAGE_PATH = os.getenv("STORAGE_PATH", "./storage/documents")
 os.makedirs(STORAGE_PATH, exist_ok=True)
@@ -51,10 +50,56 @@ app.mount("/storage", StaticFiles(directory="storage"), name="storage")
 # Enregistrer les routes de l'API
 app.include_router(auth.router, prefix="/api", tags=["Authentication"])
 app.include_router(guest.router, prefix="/api", tags=["Guest"])
+# Avant upload: /documents/search ne doit pas être capturé par /documents/{document_id}
+app.include_router(search.router, prefix="/api", tags=["Recherche"])
 app.include_router(upload.router, prefix="/api", tags=["Upload"])
+app.include_router(duplicates.router, prefix="/api", tags=["Doublons"])
 app.include_router(ocr.router, prefix="/api", tags=["OCR"])
 app.include_router(classify.router, prefix="/api", tags=["Classification"])
 app.include_router(stats.router, prefix="/api", tags=["Statistiques"])
+app.include_router(reclassify.router, prefix="/api", tags=["Reclassification"])
+
+@app.on_event("startup")
+async def apply_migrations():
+    """
+    Crée ou met à jour le schéma (migrations Alembic) avant de servir les requêtes
+    """
+    if AUTO_MIGRATE:
+        run_migrations()
+
+@app.on_event("startup")
+async def resume_background_jobs():
+    """
+    Reprend une reclassification interrompue par un arrêt du serveur
+    """
+    job_id = await reclassification_service.resume_interrupted()
+    if job_id:
+        print(f"🔄 Reclassification #{job_id} reprise")
+
+@app.on_event("startup")
+async def start_upload_session_collector():
+    """
+    Supprime périodiquement les téléversements reprenables abandonnés
+    """
+    upload_session_collector.start()
+
+@app.on_event("startup")
+async def start_processing_pool():
+    """
+    Démarre les workers de traitement des documents téléversés avec auto_process
+    (aucun avec PROCESSING_WORKERS=0: traitement par python worker.py)
+    """
+    await processing_pool.start()
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    """
+    Arrête proprement la reclassification après le lot en cours
+    (elle reste "running" et sera reprise au prochain démarrage)
+    """
+    await reclassification_service.stop()
+    await upload_session_collector.stop()
+    await processing_pool.stop()
 
 @app.get("/")
 async def root():
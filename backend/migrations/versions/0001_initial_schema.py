@@ -0,0 +1,67 @@
+"""Schéma initial: utilisateurs, documents et métadonnées
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(255), nullable=False),
+        sa.Column("username", sa.String(100), nullable=False),
+        sa.Column("hashed_password", sa.String(255), nullable=False),
+        sa.Column("full_name", sa.String(255)),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now())
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+    
+    op.create_table(
+        "documents",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("filename", sa.String(255), nullable=False),
+        sa.Column("filepath", sa.String(500), nullable=False),
+        sa.Column("file_type", sa.String(50)),
+        sa.Column("extracted_text", sa.Text()),
+        sa.Column("category", sa.String(100)),
+        sa.Column("confidence", sa.Float()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True))
+    )
+    op.create_index("ix_documents_id", "documents", ["id"])
+    
+    op.create_table(
+        "document_metadata",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("document_id", sa.Integer(), sa.ForeignKey("documents.id"), nullable=False),
+        sa.Column("word_count", sa.Integer()),
+        sa.Column("char_count", sa.Integer()),
+        sa.Column("line_count", sa.Integer()),
+        sa.Column("language", sa.String(10)),
+        sa.Column("image_width", sa.Integer()),
+        sa.Column("image_height", sa.Integer()),
+        sa.Column("image_size_kb", sa.Float()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now())
+    )
+    op.create_index("ix_document_metadata_id", "document_metadata", ["id"])
+
+
+def downgrade():
+    op.drop_table("document_metadata")
+    op.drop_table("documents")
+    op.drop_table("users")
@@ -0,0 +1,45 @@
+"""Table des tâches de reclassification
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Les bases créées par create_all contiennent peut-être déjà la table
+    if not op.get_context().as_sql and sa.inspect(op.get_bind()).has_table("reclassification_jobs"):
+        return
+    
+    op.create_table(
+        "reclassification_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("model_version", sa.String(100)),
+        sa.Column("chunk_size", sa.Integer(), nullable=False),
+        sa.Column("last_document_id", sa.Integer(), nullable=False),
+        sa.Column("max_document_id", sa.Integer(), nullable=False),
+        sa.Column("total_documents", sa.Integer(), nullable=False),
+        sa.Column("processed_documents", sa.Integer(), nullable=False),
+        sa.Column("updated_documents", sa.Integer(), nullable=False),
+        sa.Column("run_started_at", sa.DateTime(timezone=True)),
+        sa.Column("run_start_processed", sa.Integer(), nullable=False),
+        sa.Column("error", sa.Text()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+        sa.Column("finished_at", sa.DateTime(timezone=True))
+    )
+    op.create_index("ix_reclassification_jobs_id", "reclassification_jobs", ["id"])
+
+
+def downgrade():
+    op.drop_table("reclassification_jobs")
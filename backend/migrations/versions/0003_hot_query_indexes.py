@@ -0,0 +1,51 @@
+"""Index des requêtes fréquentes sur documents et document_metadata
+
+- documents (user_id, created_at): liste récente, timeline, documents des 7 derniers jours
+- documents (user_id, category): répartition par catégorie, filtres
+- document_metadata (document_id) unique: jointure document → métadonnées
+
+Sur PostgreSQL les index sont créés avec CONCURRENTLY (pas de verrou d'écriture)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+# (nom, table, colonnes, unique)
+INDEXES = [
+    ("ix_documents_user_id_created_at", "documents", ["user_id", "created_at"], False),
+    ("ix_documents_user_id_category", "documents", ["user_id", "category"], False),
+    ("uq_document_metadata_document_id", "document_metadata", ["document_id"], True),
+]
+
+
+def upgrade():
+    # Garder uniquement la ligne de métadonnées la plus récente de chaque document
+    op.execute(
+        "DELETE FROM document_metadata WHERE id NOT IN "
+        "(SELECT MAX(id) FROM document_metadata GROUP BY document_id)"
+    )
+    
+    if op.get_bind().dialect.name == "postgresql":
+        # CREATE INDEX CONCURRENTLY est interdit dans une transaction
+        with op.get_context().autocommit_block():
+            for name, table, columns, unique in INDEXES:
+                op.create_index(name, table, columns, unique=unique,
+                                postgresql_concurrently=True, if_not_exists=True)
+    else:
+        for name, table, columns, unique in INDEXES:
+            op.create_index(name, table, columns, unique=unique, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,78 @@
+"""Tables de statistiques agrégées par utilisateur (user_stats, user_daily_counts)
+
+Les tables sont remplies à partir des documents existants; elles sont ensuite
+tenues à jour par l'API (services/stats_rollup.py)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "user_stats",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("dimension", sa.String(20), primary_key=True),
+        sa.Column("bucket", sa.String(100), primary_key=True),
+        sa.Column("document_count", sa.Integer(), nullable=False),
+        sa.Column("confidence_sum", sa.Float(), nullable=False),
+        sa.Column("confidence_count", sa.Integer(), nullable=False),
+        sa.Column("word_count", sa.BigInteger(), nullable=False)
+    )
+    op.create_table(
+        "user_daily_counts",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("document_count", sa.Integer(), nullable=False)
+    )
+    
+    # Remplissage initial (équivalent de python -m services.stats_rollup)
+    op.execute("""
+        INSERT INTO user_stats (user_id, dimension, bucket, document_count,
+                                confidence_sum, confidence_count, word_count)
+        SELECT d.user_id, 'total', '', COUNT(d.id), COALESCE(SUM(d.confidence), 0),
+               COUNT(d.confidence), COALESCE(SUM(m.word_count), 0)
+        FROM documents d LEFT JOIN document_metadata m ON m.document_id = d.id
+        GROUP BY d.user_id
+    """)
+    op.execute("""
+        INSERT INTO user_stats (user_id, dimension, bucket, document_count,
+                                confidence_sum, confidence_count, word_count)
+        SELECT user_id, 'category', category, COUNT(id), COALESCE(SUM(confidence), 0),
+               COUNT(confidence), 0
+        FROM documents WHERE category IS NOT NULL
+        GROUP BY user_id, category
+    """)
+    op.execute("""
+        INSERT INTO user_stats (user_id, dimension, bucket, document_count,
+                                confidence_sum, confidence_count, word_count)
+        SELECT user_id, 'file_type', COALESCE(file_type, ''), COUNT(id), 0, 0, 0
+        FROM documents
+        GROUP BY user_id, COALESCE(file_type, '')
+    """)
+    
+    if op.get_bind().dialect.name == "postgresql":
+        day = "DATE(timezone('UTC', created_at))"
+    else:
+        day = "DATE(created_at)"
+    op.execute(f"""
+        INSERT INTO user_daily_counts (user_id, day, document_count)
+        SELECT user_id, {day}, COUNT(id)
+        FROM documents WHERE created_at IS NOT NULL
+        GROUP BY user_id, {day}
+    """)
+
+
+def downgrade():
+    op.drop_table("user_daily_counts")
+    op.drop_table("user_stats")
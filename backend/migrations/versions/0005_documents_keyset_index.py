@@ -0,0 +1,36 @@
+"""Index de pagination par curseur sur documents (user_id, created_at, id)
+
+Remplace l'index (user_id, created_at), dont il couvre toutes les requêtes:
+les pages sont lues directement dans l'ordre (created_at DESC, id DESC)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index("ix_documents_user_id_created_at_id", "documents",
+                            ["user_id", "created_at", "id"],
+                            postgresql_concurrently=True, if_not_exists=True)
+            op.drop_index("ix_documents_user_id_created_at", table_name="documents",
+                          postgresql_concurrently=True, if_exists=True)
+    else:
+        op.create_index("ix_documents_user_id_created_at_id", "documents",
+                        ["user_id", "created_at", "id"], if_not_exists=True)
+        op.drop_index("ix_documents_user_id_created_at", table_name="documents", if_exists=True)
+
+
+def downgrade():
+    op.create_index("ix_documents_user_id_created_at", "documents", ["user_id", "created_at"])
+    op.drop_index("ix_documents_user_id_created_at_id", table_name="documents")
@@ -0,0 +1,80 @@
+"""Index plein texte sur le texte extrait des documents
+
+PostgreSQL: colonne générée search_vector (tsvector, configuration french) et index GIN.
+La colonne est recalculée par la base à chaque écriture de extracted_text (OCR),
+sans code applicatif. L'ajout de la colonne réécrit la table documents
+SQLite: table FTS5 documents_fts à contenu externe (documents), synchronisée par
+des triggers. La colonne user_id est indexée pour restreindre la recherche aux
+documents de l'utilisateur directement dans l'index.
+Attention: une migration qui recrée la table documents (batch_alter_table sous
+SQLite) supprime les triggers, qu'il faut alors recréer
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+SQLITE_TRIGGERS = {
+    "documents_fts_ai": """
+        CREATE TRIGGER documents_fts_ai AFTER INSERT ON documents BEGIN
+            INSERT INTO documents_fts(rowid, extracted_text, user_id)
+            VALUES (new.id, new.extracted_text, new.user_id);
+        END
+    """,
+    "documents_fts_ad": """
+        CREATE TRIGGER documents_fts_ad AFTER DELETE ON documents BEGIN
+            INSERT INTO documents_fts(documents_fts, rowid, extracted_text, user_id)
+            VALUES ('delete', old.id, old.extracted_text, old.user_id);
+        END
+    """,
+    "documents_fts_au": """
+        CREATE TRIGGER documents_fts_au AFTER UPDATE OF extracted_text, user_id ON documents BEGIN
+            INSERT INTO documents_fts(documents_fts, rowid, extracted_text, user_id)
+            VALUES ('delete', old.id, old.extracted_text, old.user_id);
+            INSERT INTO documents_fts(rowid, extracted_text, user_id)
+            VALUES (new.id, new.extracted_text, new.user_id);
+        END
+    """,
+}
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(
+            "ALTER TABLE documents ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('french', coalesce(extracted_text, ''))) STORED"
+        )
+        with op.get_context().autocommit_block():
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_search_vector "
+                "ON documents USING GIN (search_vector)"
+            )
+    else:
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5("
+            "extracted_text, user_id, content='documents', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2')"
+        )
+        for trigger in SQLITE_TRIGGERS.values():
+            op.execute(trigger)
+        # Indexe les documents existants
+        op.execute("INSERT INTO documents_fts(documents_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_documents_search_vector")
+        op.execute("ALTER TABLE documents DROP COLUMN IF EXISTS search_vector")
+    else:
+        for name in SQLITE_TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {name}")
+        op.execute("DROP TABLE IF EXISTS documents_fts")
@@ -0,0 +1,46 @@
+"""Signatures MinHash et index LSH pour la détection des quasi-doublons
+
+Les signatures des documents déjà traités sont calculées en Python:
+    python -m services.duplicate_detection
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "document_signatures",
+        sa.Column("document_id", sa.Integer(),
+                  sa.ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("signature", sa.LargeBinary(), nullable=False),
+        sa.Column("shingle_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now())
+    )
+    op.create_table(
+        "document_lsh_buckets",
+        sa.Column("document_id", sa.Integer(),
+                  sa.ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("band", sa.SmallInteger(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("bucket", sa.BigInteger(), nullable=False)
+    )
+    op.create_index("ix_document_lsh_buckets_user_id_bucket", "document_lsh_buckets",
+                    ["user_id", "bucket"])
+
+
+def downgrade():
+    op.drop_index("ix_document_lsh_buckets_user_id_bucket", table_name="document_lsh_buckets")
+    op.drop_table("document_lsh_buckets")
+    op.drop_table("document_signatures")
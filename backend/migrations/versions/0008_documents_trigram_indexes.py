@@ -0,0 +1,90 @@
+"""Index de trigrammes pour la recherche approximative sur les noms de fichiers
+
+PostgreSQL: extension pg_trgm (droit CREATE sur la base requis) et index GIN
+gin_trgm_ops sur documents.filename et documents.category, utilisés par les
+opérateurs % et <% et par ILIKE '%...%'
+SQLite: l'index de trigrammes est construit en mémoire (services/fuzzy_search.py).
+La table document_name_changes, alimentée par des triggers, journalise les documents
+ajoutés, supprimés ou renommés/reclassés pour que l'index en mémoire ne relise que
+ces documents. Le journal ne conserve que les NAME_CHANGES_RETENTION dernières entrées.
+Attention: une migration qui recrée la table documents (batch_alter_table sous
+SQLite) supprime les triggers, qu'il faut alors recréer
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+NAME_CHANGES_RETENTION = 100000
+
+SQLITE_TRIGGERS = {
+    "documents_names_ai": """
+        CREATE TRIGGER documents_names_ai AFTER INSERT ON documents BEGIN
+            INSERT INTO document_name_changes(user_id, document_id) VALUES (new.user_id, new.id);
+        END
+    """,
+    "documents_names_ad": """
+        CREATE TRIGGER documents_names_ad AFTER DELETE ON documents BEGIN
+            INSERT INTO document_name_changes(user_id, document_id) VALUES (old.user_id, old.id);
+        END
+    """,
+    "documents_names_au": """
+        CREATE TRIGGER documents_names_au AFTER UPDATE OF filename, category, user_id ON documents BEGIN
+            INSERT INTO document_name_changes(user_id, document_id) VALUES (new.user_id, new.id);
+            INSERT INTO document_name_changes(user_id, document_id)
+            SELECT old.user_id, old.id WHERE old.user_id != new.user_id;
+        END
+    """,
+    "document_name_changes_prune": f"""
+        CREATE TRIGGER document_name_changes_prune AFTER INSERT ON document_name_changes BEGIN
+            DELETE FROM document_name_changes WHERE seq <= new.seq - {NAME_CHANGES_RETENTION};
+        END
+    """,
+}
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        with op.get_context().autocommit_block():
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_filename_trgm "
+                "ON documents USING GIN (filename gin_trgm_ops)"
+            )
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_category_trgm "
+                "ON documents USING GIN (category gin_trgm_ops)"
+            )
+    else:
+        op.create_table(
+            "document_name_changes",
+            sa.Column("seq", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("user_id", sa.Integer(), nullable=False),
+            sa.Column("document_id", sa.Integer(), nullable=False),
+            sqlite_autoincrement=True
+        )
+        op.create_index("ix_document_name_changes_user_id_seq", "document_name_changes",
+                        ["user_id", "seq"])
+        for trigger in SQLITE_TRIGGERS.values():
+            op.execute(trigger)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_documents_category_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_documents_filename_trgm")
+    else:
+        for name in SQLITE_TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {name}")
+        op.drop_index("ix_document_name_changes_user_id_seq", table_name="document_name_changes")
+        op.drop_table("document_name_changes")
@@ -0,0 +1,48 @@
+"""Colonne documents.language et index des facettes
+
+- documents.language: copie de document_metadata.language (écrite par l'OCR), pour
+  filtrer et compter par langue sans jointure
+- documents (user_id, category, file_type, language, confidence, created_at): les
+  comptes par facette sont lus dans l'index seul (GROUP BY dans l'ordre de l'index).
+  Remplace l'index (user_id, category), dont il couvre toutes les requêtes
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+FACET_COLUMNS = ["user_id", "category", "file_type", "language", "confidence", "created_at"]
+
+
+def upgrade():
+    op.add_column("documents", sa.Column("language", sa.String(10)))
+    op.execute(
+        "UPDATE documents SET language = (SELECT m.language FROM document_metadata m "
+        "WHERE m.document_id = documents.id)"
+    )
+    
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index("ix_documents_user_id_facets", "documents", FACET_COLUMNS,
+                            postgresql_concurrently=True, if_not_exists=True)
+            op.drop_index("ix_documents_user_id_category", table_name="documents",
+                          postgresql_concurrently=True, if_exists=True)
+    else:
+        op.create_index("ix_documents_user_id_facets", "documents", FACET_COLUMNS, if_not_exists=True)
+        op.drop_index("ix_documents_user_id_category", table_name="documents", if_exists=True)
+
+
+def downgrade():
+    op.create_index("ix_documents_user_id_category", "documents", ["user_id", "category"])
+    op.drop_index("ix_documents_user_id_facets", table_name="documents")
+    op.drop_column("documents", "language")
@@ -0,0 +1,28 @@
+"""Empreinte SHA-256 et taille des fichiers téléversés
+
+Calculées pendant l'écriture du fichier (services/file_storage.py); nulles pour les
+documents téléversés avant cette migration
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("documents", sa.Column("sha256", sa.String(64)))
+    op.add_column("documents", sa.Column("size_bytes", sa.BigInteger()))
+
+
+def downgrade():
+    op.drop_column("documents", "size_bytes")
+    op.drop_column("documents", "sha256")
@@ -0,0 +1,46 @@
+"""Stockage des fichiers adressé par contenu (table blobs)
+
+Chaque contenu distinct est stocké une fois; documents.blob_sha256 pointe vers son
+blob. Les fichiers des documents existants sont déplacés dans le stockage par contenu
+par la commande (depuis le dossier backend):
+    python -m services.blob_store
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "blobs",
+        sa.Column("sha256", sa.String(64), primary_key=True),
+        sa.Column("size_bytes", sa.BigInteger(), nullable=False),
+        sa.Column("path", sa.String(500), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now())
+    )
+    op.add_column("documents", sa.Column("blob_sha256", sa.String(64)))
+    op.create_index("ix_documents_blob_sha256", "documents", ["blob_sha256"])
+    # SQLite n'applique pas les clés étrangères (et ne peut pas en ajouter sans recréer
+    # la table documents et ses triggers): contrainte créée sur PostgreSQL uniquement
+    if op.get_bind().dialect.name == "postgresql":
+        op.create_foreign_key("fk_documents_blob_sha256", "documents", "blobs",
+                              ["blob_sha256"], ["sha256"])
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_constraint("fk_documents_blob_sha256", "documents", type_="foreignkey")
+    op.drop_index("ix_documents_blob_sha256", table_name="documents")
+    op.drop_column("documents", "blob_sha256")
+    op.drop_table("blobs")
@@ -0,0 +1,52 @@
+"""Téléversements reprenables (tables upload_sessions et upload_chunks)
+
+Les sessions expirées sont supprimées périodiquement par l'API
+(UPLOAD_SESSION_TTL_HOURS, UPLOAD_SESSION_GC_INTERVAL_MINUTES)
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0012"
+down_revision = "0011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "upload_sessions",
+        sa.Column("id", sa.String(32), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("filename", sa.String(255), nullable=False),
+        sa.Column("file_type", sa.String(50), nullable=False),
+        sa.Column("total_size", sa.BigInteger(), nullable=False),
+        sa.Column("chunk_size", sa.Integer(), nullable=False),
+        sa.Column("sha256", sa.String(64)),
+        sa.Column("path", sa.String(500), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False, server_default="open"),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False)
+    )
+    op.create_index("ix_upload_sessions_user_id", "upload_sessions", ["user_id"])
+    op.create_index("ix_upload_sessions_expires_at", "upload_sessions", ["expires_at"])
+    
+    op.create_table(
+        "upload_chunks",
+        sa.Column("session_id", sa.String(32),
+                  sa.ForeignKey("upload_sessions.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("chunk_index", sa.Integer(), primary_key=True),
+        sa.Column("size", sa.Integer(), nullable=False)
+    )
+
+
+def downgrade():
+    op.drop_table("upload_chunks")
+    op.drop_index("ix_upload_sessions_expires_at", table_name="upload_sessions")
+    op.drop_index("ix_upload_sessions_user_id", table_name="upload_sessions")
+    op.drop_table("upload_sessions")
@@ -0,0 +1,36 @@
+"""Traitement des documents en arrière-plan (documents.processing_status)
+
+- processing_status: avancement du traitement automatique (queued, ocr, classifying,
+  done, failed), NULL pour les documents traités par /ocr et /classify
+- processing_error: message de la dernière erreur
+- index partiel des documents en cours, remis en file au démarrage de l'API
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0013"
+down_revision = "0012"
+branch_labels = None
+depends_on = None
+
+
+PENDING = sa.text("processing_status IN ('queued', 'ocr', 'classifying')")
+
+
+def upgrade():
+    op.add_column("documents", sa.Column("processing_status", sa.String(20)))
+    op.add_column("documents", sa.Column("processing_error", sa.Text()))
+    op.create_index("ix_documents_processing_pending", "documents", ["processing_status"],
+                    postgresql_where=PENDING, sqlite_where=PENDING)
+
+
+def downgrade():
+    op.drop_index("ix_documents_processing_pending", table_name="documents")
+    op.drop_column("documents", "processing_error")
+    op.drop_column("documents", "processing_status")
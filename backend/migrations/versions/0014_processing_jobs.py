@@ -0,0 +1,63 @@
+"""File de traitement durable (table processing_jobs)
+
+Les tâches de traitement (OCR puis classification) sont réservées par bail par les
+workers de l'API et par les workers indépendants (python worker.py), sur un ou
+plusieurs serveurs. Les documents encore en cours de traitement reçoivent une tâche;
+l'index partiel de la migration 0013 (reprise au démarrage) n'est plus utilisé
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0014"
+down_revision = "0013"
+branch_labels = None
+depends_on = None
+
+
+PENDING = sa.text("status = 'pending'")
+RUNNING = sa.text("status = 'running'")
+DOCUMENTS_PENDING = sa.text("processing_status IN ('queued', 'ocr', 'classifying')")
+
+
+def upgrade():
+    op.create_table(
+        "processing_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("document_id", sa.Integer(),
+                  sa.ForeignKey("documents.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False, server_default="pending"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("available_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("locked_by", sa.String(100)),
+        sa.Column("lease_expires_at", sa.DateTime(timezone=True)),
+        sa.Column("last_error", sa.Text()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("finished_at", sa.DateTime(timezone=True))
+    )
+    op.create_index("ix_processing_jobs_id", "processing_jobs", ["id"])
+    op.create_index("ix_processing_jobs_document_id", "processing_jobs", ["document_id"])
+    op.create_index("ix_processing_jobs_pending", "processing_jobs", ["available_at"],
+                    postgresql_where=PENDING, sqlite_where=PENDING)
+    op.create_index("ix_processing_jobs_running", "processing_jobs", ["lease_expires_at"],
+                    postgresql_where=RUNNING, sqlite_where=RUNNING)
+    
+    op.execute(
+        "INSERT INTO processing_jobs (document_id, status, attempts, available_at) "
+        "SELECT id, 'pending', 0, CURRENT_TIMESTAMP FROM documents "
+        "WHERE processing_status IN ('queued', 'ocr', 'classifying')"
+    )
+    op.execute("UPDATE documents SET processing_status = 'queued' "
+               "WHERE processing_status IN ('ocr', 'classifying')")
+    op.drop_index("ix_documents_processing_pending", table_name="documents")
+
+
+def downgrade():
+    op.create_index("ix_documents_processing_pending", "documents", ["processing_status"],
+                    postgresql_where=DOCUMENTS_PENDING, sqlite_where=DOCUMENTS_PENDING)
+    op.drop_table("processing_jobs")
@@ -0,0 +1,51 @@
+"""Réservation équitable des tâches de traitement entre utilisateurs
+
+processing_jobs.user_id (propriétaire du document) et user_rank (rang du document
+dans la file de son utilisateur): les tâches sont réservées par rang, puis par date
+
+Revision ID: 0015
+Revises: 0014
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0015"
+down_revision = "0014"
+branch_labels = None
+depends_on = None
+
+
+PENDING = sa.text("status = 'pending'")
+
+
+def upgrade():
+    op.add_column("processing_jobs", sa.Column("user_id", sa.Integer()))
+    op.add_column("processing_jobs",
+                  sa.Column("user_rank", sa.Integer(), nullable=False, server_default="0"))
+    # SQLite n'applique pas les clés étrangères: contrainte créée sur PostgreSQL uniquement
+    if op.get_bind().dialect.name == "postgresql":
+        op.create_foreign_key("fk_processing_jobs_user_id", "processing_jobs", "users",
+                              ["user_id"], ["id"])
+    op.execute(
+        "UPDATE processing_jobs SET user_id = "
+        "(SELECT documents.user_id FROM documents WHERE documents.id = processing_jobs.document_id)"
+    )
+    
+    op.drop_index("ix_processing_jobs_pending", table_name="processing_jobs")
+    op.create_index("ix_processing_jobs_pending", "processing_jobs", ["user_rank", "available_at"],
+                    postgresql_where=PENDING, sqlite_where=PENDING)
+    op.create_index("ix_processing_jobs_user_status", "processing_jobs", ["user_id", "status"])
+
+
+def downgrade():
+    op.drop_index("ix_processing_jobs_user_status", table_name="processing_jobs")
+    op.drop_index("ix_processing_jobs_pending", table_name="processing_jobs")
+    op.create_index("ix_processing_jobs_pending", "processing_jobs", ["available_at"],
+                    postgresql_where=PENDING, sqlite_where=PENDING)
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_constraint("fk_processing_jobs_user_id", "processing_jobs", type_="foreignkey")
+    op.drop_column("processing_jobs", "user_rank")
+    op.drop_column("processing_jobs", "user_id")
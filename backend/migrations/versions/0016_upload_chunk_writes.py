@@ -0,0 +1,37 @@
+"""Morceaux en cours d'écriture des téléversements reprenables
+
+upload_chunk_writes: une session n'est pas finalisée tant qu'un morceau est en cours
+d'écriture dans son fichier; le bail (lease_until) expire si le processus qui écrit
+s'arrête
+
+Revision ID: 0016
+Revises: 0015
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0016"
+down_revision = "0015"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "upload_chunk_writes",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("session_id", sa.String(32),
+                  sa.ForeignKey("upload_sessions.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("chunk_index", sa.Integer(), nullable=False),
+        sa.Column("writer", sa.String(100), nullable=False),
+        sa.Column("lease_until", sa.DateTime(timezone=True), nullable=False)
+    )
+    op.create_index("ix_upload_chunk_writes_session_id", "upload_chunk_writes", ["session_id"])
+
+
+def downgrade():
+    op.drop_index("ix_upload_chunk_writes_session_id", table_name="upload_chunk_writes")
+    op.drop_table("upload_chunk_writes")
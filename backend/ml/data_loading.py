@@ -0,0 +1,105 @@
+"""
+Chargement par lots des données d'entraînement
+Lit des fichiers CSV ou Parquet (ou un dossier de fragments) sans tout charger en mémoire
+Les fragments d'un dossier (<catégorie>_<numéro>, cf. generate_data.py) sont lus à tour
+de rôle par catégorie: les premiers lots contiennent toutes les catégories
+"""
+
+import os
+from collections import deque
+from itertools import chain
+import pandas as pd
+
+
+# Extensions de fichiers de données reconnues
+DATA_EXTENSIONS = ('.csv', '.parquet')
+
+# Colonnes attendues dans les fichiers de données
+DATA_COLUMNS = ['category', 'text']
+
+
+def list_data_files(path):
+    """
+    Retourne la liste des fichiers de données à lire
+    
+    Args:
+        path: Fichier CSV/Parquet ou dossier contenant des fragments
+    
+    Returns:
+        Liste triée des chemins de fichiers
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Le fichier {path} n'existe pas!")
+    
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, name)
+            for name in os.listdir(path)
+            if name.endswith(DATA_EXTENSIONS)
+        )
+    
+    return [path]
+
+
+def group_data_files(path):
+    """
+    Regroupe les fichiers de données par préfixe de fragment (la catégorie pour
+    generate_data.py: autre_00000, autre_00001...)
+    
+    Args:
+        path: Fichier CSV/Parquet ou dossier contenant des fragments
+    
+    Returns:
+        Liste de groupes (listes triées de chemins), dans l'ordre des préfixes
+    """
+    groups = {}
+    for file_path in list_data_files(path):
+        prefix = os.path.basename(file_path).rsplit('_', 1)[0]
+        groups.setdefault(prefix, []).append(file_path)
+    return list(groups.values())
+
+
+def _iter_file(file_path, chunk_size):
+    """Parcourt un fichier de données par lots de `chunk_size` lignes"""
+    if file_path.endswith('.parquet'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("pyarrow est requis pour lire les fichiers Parquet (pip install pyarrow)")
+        
+        parquet_file = pq.ParquetFile(file_path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=DATA_COLUMNS):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(
+            file_path,
+            encoding='utf-8',
+            usecols=DATA_COLUMNS,
+            dtype={'category': 'category', 'text': str},
+            chunksize=chunk_size
+        )
+
+
+def iter_training_data(path, chunk_size=100_000):
+    """
+    Parcourt les données d'entraînement par lots, un lot de chaque groupe de fragments
+    à tour de rôle (group_data_files)
+    Seul un lot de `chunk_size` lignes est en mémoire à la fois
+    
+    Args:
+        path: Fichier CSV/Parquet ou dossier de fragments
+        chunk_size: Nombre de lignes par lot
+    
+    Yields:
+        DataFrames avec les colonnes 'category' et 'text'
+    """
+    readers = deque(
+        chain.from_iterable(_iter_file(file_path, chunk_size) for file_path in group)
+        for group in group_data_files(path)
+    )
+    while readers:
+        reader = readers.popleft()
+        chunk = next(reader, None)
+        if chunk is not None:
+            yield chunk
+            readers.append(reader)
@@ -1,10 +1,22 @@
 """
 Script pour générer des données d'entraînement enrichies
 Crée des exemples réalistes avec variations de mots-clés
+
+La génération est vectorisée (numpy), déterministe (graine) et répartie sur
+plusieurs processus: chaque fragment est écrit dans son propre fichier, ce qui
+permet de produire des millions de documents par catégorie.
+
+Usage (depuis le dossier backend):
+    python ml/generate_data.py --per-category 150 --append-to ml/training_data.csv
+    python ml/generate_data.py --per-category 1000000 --format parquet --output ml/synthetic
 """
 
+import os
+import argparse
+import time
+import numpy as np
 import pandas as pd
-import random
+from concurrent.futures import ProcessPoolExecutor
 
 # Templates pour générer des variations
 facture_keywords = [
@@ -97,65 +109,181 @@ autre_keywords = [
     ["Attestation", "Justificatif", "Preuve"],
 ]
 
-def generate_samples(keywords_list, category, num_samples=100):
-    """Génère des échantillons variés pour une catégorie"""
-    samples = []
-    
-    for _ in range(num_samples):
-        # Sélectionner aléatoirement 5-10 groupes de mots-clés
-        num_groups = random.randint(5, 10)
-        selected_groups = random.sample(keywords_list, min(num_groups, len(keywords_list)))
-        
-        # Pour chaque groupe, choisir un mot aléatoire
-        text_parts = []
-        for group in selected_groups:
-            text_parts.append(random.choice(group))
-        
-        # Mélanger l'ordre
-        random.shuffle(text_parts)
-        
-        # Joiner avec des espaces
-        text = " ".join(text_parts)
-        
-        samples.append({'category': category, 'text': text})
+CATEGORY_KEYWORDS = {
+    "Facture": facture_keywords,
+    "CV": cv_keywords,
+    "Contrat": contrat_keywords,
+    "Lettre": lettre_keywords,
+    "Autre": autre_keywords,
+}
+
+
+def build_keyword_tables(keywords_list):
+    """
+    Aplatit les groupes de mots-clés en tableaux numpy
     
-    return samples
+    Returns:
+        Tuple (mots, taille de chaque groupe, position du premier mot de chaque groupe)
+    """
+    words = np.array([word for group in keywords_list for word in group], dtype=object)
+    sizes = np.array([len(group) for group in keywords_list], dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    return words, sizes, offsets
 
-# Générer des données
-print("🚀 Génération des données d'entraînement enrichies...")
 
-all_samples = []
+def generate_samples(keywords_list, num_samples, rng):
+    """
+    Génère des échantillons variés pour une catégorie (vectorisé)
+    Équivalent à: choisir 5-10 groupes au hasard, un mot par groupe, ordre aléatoire
+    
+    Args:
+        keywords_list: Groupes de mots-clés de la catégorie
+        num_samples: Nombre de textes à générer
+        rng: Générateur numpy (np.random.Generator)
+        
+    Returns:
+        Liste de textes
+    """
+    words, sizes, offsets = build_keyword_tables(keywords_list)
+    num_groups_total = len(keywords_list)
+    
+    # Nombre de groupes par texte (5 à 10 inclus)
+    num_groups = np.minimum(rng.integers(5, 11, size=num_samples), num_groups_total)
+    
+    # Une permutation aléatoire des groupes par ligne: les k premiers sont
+    # un tirage sans remise déjà mélangé
+    group_order = np.argsort(rng.random((num_samples, num_groups_total)), axis=1)
+    
+    # Un mot au hasard dans chaque groupe
+    word_offsets = (rng.random((num_samples, num_groups_total)) * sizes[group_order]).astype(np.int64)
+    chosen_words = words[offsets[group_order] + word_offsets]
+    
+    return [" ".join(row[:count]) for row, count in zip(chosen_words, num_groups)]
 
-print("📄 Génération Factures...")
-all_samples.extend(generate_samples(facture_keywords, "Facture", 150))
 
-print("📄 Génération CV...")
-all_samples.extend(generate_samples(cv_keywords, "CV", 150))
+def generate_shard(category, num_samples, seed, shard_index, output_dir, file_format):
+    """
+    Génère un fragment de données et l'écrit dans son propre fichier
+    (exécuté dans un processus du pool)
+    
+    Returns:
+        Tuple (chemin du fichier, nombre d'exemples)
+    """
+    category_index = list(CATEGORY_KEYWORDS).index(category)
+    rng = np.random.default_rng([seed, category_index, shard_index])
+    
+    texts = generate_samples(CATEGORY_KEYWORDS[category], num_samples, rng)
+    df = pd.DataFrame({'category': category, 'text': texts})
+    
+    file_path = os.path.join(output_dir, f"{category.lower()}_{shard_index:05d}.{file_format}")
+    if file_format == 'parquet':
+        df.to_parquet(file_path, index=False)
+    else:
+        df.to_csv(file_path, index=False, encoding='utf-8')
+    
+    return file_path, len(df)
 
-print("📄 Génération Contrats...")
-all_samples.extend(generate_samples(contrat_keywords, "Contrat", 150))
 
-print("📄 Génération Lettres...")
-all_samples.extend(generate_samples(lettre_keywords, "Lettre", 150))
+def plan_shards(per_category, shard_size):
+    """
+    Découpe la génération en tâches (catégorie, taille du fragment, index du fragment)
+    """
+    tasks = []
+    for category in CATEGORY_KEYWORDS:
+        remaining = per_category
+        shard_index = 0
+        while remaining > 0:
+            size = min(shard_size, remaining)
+            tasks.append((category, size, shard_index))
+            remaining -= size
+            shard_index += 1
+    return tasks
 
-print("📄 Génération Autres...")
-all_samples.extend(generate_samples(autre_keywords, "Autre", 150))
 
-# Charger les données existantes
-existing_df = pd.read_csv('training_data.csv')
-print(f"✅ Données existantes: {len(existing_df)} exemples")
+def generate_dataset(per_category, output_dir, seed=42, workers=None, shard_size=200_000, file_format='csv'):
+    """
+    Génère le jeu de données synthétique en parallèle, un fichier par fragment
+    
+    Args:
+        per_category: Nombre d'exemples par catégorie
+        output_dir: Dossier de sortie des fragments
+        seed: Graine (même graine = mêmes données)
+        workers: Nombre de processus (None = tous les cœurs)
+        shard_size: Nombre maximal d'exemples par fragment
+        file_format: 'csv' ou 'parquet'
+        
+    Returns:
+        Liste des fichiers générés
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = plan_shards(per_category, shard_size)
+    
+    generated_files = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(generate_shard, category, size, seed, shard_index, output_dir, file_format)
+            for category, size, shard_index in tasks
+        ]
+        for future in futures:
+            file_path, count = future.result()
+            generated_files.append(file_path)
+            print(f"📄 {file_path}: {count} exemples")
+    
+    return generated_files
 
-# Combiner avec les nouvelles données
-new_df = pd.DataFrame(all_samples)
-combined_df = pd.concat([existing_df, new_df], ignore_index=True)
 
-# Mélanger aléatoirement
-combined_df = combined_df.sample(frac=1, random_state=42).reset_index(drop=True)
+def append_to_file(generated_files, target_path):
+    """
+    Ajoute les fragments générés à la fin d'un CSV existant, sans le réécrire
+    """
+    write_header = not os.path.exists(target_path)
+    for file_path in generated_files:
+        for chunk in pd.read_csv(file_path, encoding='utf-8', chunksize=100_000):
+            chunk.to_csv(target_path, mode='a', header=write_header, index=False, encoding='utf-8')
+            write_header = False
+        os.remove(file_path)
 
-# Sauvegarder
-combined_df.to_csv('training_data.csv', index=False, encoding='utf-8')
 
-print(f"✅ Nouveau fichier créé avec {len(combined_df)} exemples!")
-print(f"📊 Répartition:")
-print(combined_df['category'].value_counts())
-print("\n🎉 Terminé! Vous pouvez maintenant entraîner le modèle avec: python ml/train_model.py")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Génère des données d'entraînement synthétiques")
+    parser.add_argument("--per-category", type=int, default=150,
+                        help="Nombre d'exemples par catégorie")
+    parser.add_argument("--seed", type=int, default=42,
+                        help="Graine aléatoire (reproductibilité)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Nombre de processus (défaut: tous les cœurs)")
+    parser.add_argument("--shard-size", type=int, default=200_000,
+                        help="Nombre maximal d'exemples par fichier fragment")
+    parser.add_argument("--format", choices=['csv', 'parquet'], default='csv',
+                        help="Format des fragments")
+    parser.add_argument("--output", default='ml/synthetic',
+                        help="Dossier de sortie des fragments")
+    parser.add_argument("--append-to", default=None,
+                        help="Ajouter les exemples à ce CSV (ex. ml/training_data.csv) au lieu de garder les fragments")
+    args = parser.parse_args()
+    
+    if args.append_to and args.format != 'csv':
+        parser.error("--append-to nécessite --format csv")
+    
+    print("🚀 Génération des données d'entraînement enrichies...")
+    start_time = time.perf_counter()
+    
+    generated_files = generate_dataset(
+        per_category=args.per_category,
+        output_dir=args.output,
+        seed=args.seed,
+        workers=args.workers,
+        shard_size=args.shard_size,
+        file_format=args.format
+    )
+    
+    total = args.per_category * len(CATEGORY_KEYWORDS)
+    print(f"✅ {total} exemples générés en {time.perf_counter() - start_time:.2f}s")
+    
+    if args.append_to:
+        append_to_file(generated_files, args.append_to)
+        print(f"✅ Exemples ajoutés à {args.append_to}")
+        print("\n🎉 Terminé! Vous pouvez maintenant entraîner le modèle avec: python ml/train_model.py")
+    else:
+        print(f"📂 Fragments écrits dans {args.output}")
+        print(f"\n🎉 Terminé! Entraîner avec: python ml/train_model.py --data {args.output}")
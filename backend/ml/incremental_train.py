@@ -0,0 +1,296 @@
+"""
+Script de ré-entraînement incrémental à partir des documents classés en base
+Lit la table documents par lots avec un curseur côté serveur et met à jour un modèle
+en ligne (partial_fit), sans jamais charger toute la table en mémoire
+
+Usage (depuis le dossier backend):
+    python -m ml.incremental_train
+    python -m ml.incremental_train --seed-data ml/training_data.csv --reset
+"""
+
+import os
+import argparse
+import time
+import joblib
+import numpy as np
+from datetime import datetime
+from sqlalchemy import select
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+
+from database import SessionLocal
+from ml.data_loading import iter_training_data
+import models
+
+
+# Catégories connues du modèle (partial_fit exige de les connaître dès le premier lot)
+CATEGORIES = ["Facture", "CV", "Contrat", "Lettre", "Autre"]
+
+# Fichiers de sortie
+CHECKPOINT_PATH = 'ml/checkpoints/incremental.pkl'
+VERSIONS_DIR = 'ml/versions'
+PUBLISHED_MODEL_PATH = 'ml/model.pkl'
+PUBLISHED_VECTORIZER_PATH = 'ml/vectorizer.pkl'
+PUBLISHED_INFO_PATH = 'ml/model_info.pkl'
+
+# Vectorizer sans état: pas de vocabulaire à ré-apprendre, mémoire constante
+VECTORIZER_PARAMS = {
+    'n_features': 2 ** 18,
+    'ngram_range': (1, 2),
+    'strip_accents': 'unicode',
+    'lowercase': True,
+    'alternate_sign': False,  # Valeurs positives, comme TF-IDF
+    'norm': 'l2'
+}
+
+
+def create_online_model():
+    """
+    Crée un classifieur compatible partial_fit
+    loss='log_loss' fournit predict_proba, requis par MLService
+    """
+    return SGDClassifier(loss='log_loss', alpha=1e-5, random_state=42)
+
+
+def load_checkpoint(checkpoint_path=CHECKPOINT_PATH):
+    """
+    Charge l'état de l'entraînement incrémental précédent
+
+    Returns:
+        Dictionnaire d'état ou None si aucun checkpoint
+    """
+    if not os.path.exists(checkpoint_path):
+        return None
+
+    state = joblib.load(checkpoint_path)
+    print(f"♻️  Checkpoint chargé: {state['documents_seen']} documents déjà appris, "
+          f"reprise après le document #{state['last_document_id']}")
+    return state
+
+
+def save_checkpoint(state, checkpoint_path=CHECKPOINT_PATH):
+    """
+    Sauvegarde l'état de l'entraînement de manière atomique
+    """
+    os.makedirs(os.path.dirname(checkpoint_path), exist_ok=True)
+    temp_path = checkpoint_path + ".tmp"
+    joblib.dump(state, temp_path)
+    os.replace(temp_path, checkpoint_path)
+
+
+def new_state():
+    """Crée un état d'entraînement vierge"""
+    return {
+        'model': create_online_model(),
+        'vectorizer': HashingVectorizer(**VECTORIZER_PARAMS),
+        'last_document_id': 0,
+        'documents_seen': 0,
+        'chunks_seen': 0,
+        'progressive_correct': 0,
+        'progressive_total': 0
+    }
+
+
+def learn_chunk(state, texts, labels):
+    """
+    Met à jour le modèle avec un lot de documents
+    Chaque lot est d'abord évalué puis appris (validation progressive)
+
+    Args:
+        state: État de l'entraînement
+        texts: Textes du lot
+        labels: Catégories du lot
+    """
+    X = state['vectorizer'].transform(texts)
+    y = np.asarray(labels)
+
+    model = state['model']
+    if state['chunks_seen'] > 0:
+        state['progressive_correct'] += int((model.predict(X) == y).sum())
+        state['progressive_total'] += len(y)
+
+    model.partial_fit(X, y, classes=CATEGORIES)
+
+    state['documents_seen'] += len(y)
+    state['chunks_seen'] += 1
+
+
+def seed_from_data(state, data_path, chunk_size):
+    """
+    Amorce le modèle avec les données synthétiques (CSV, Parquet ou dossier), lues par lots
+    """
+    print(f"🌱 Amorçage avec {data_path}...")
+    for chunk in iter_training_data(data_path, chunk_size=chunk_size):
+        chunk = chunk[chunk['category'].isin(CATEGORIES)]
+        if len(chunk):
+            learn_chunk(state, chunk['text'].astype(str).tolist(), chunk['category'].astype(str).tolist())
+    print(f"✅ Amorçage terminé: {state['documents_seen']} exemples")
+
+
+def stream_labelled_documents(db, after_id, chunk_size, min_confidence):
+    """
+    Parcourt les documents classés par id croissant, par lots
+    yield_per active un curseur côté serveur (PostgreSQL): seules
+    `chunk_size` lignes sont en mémoire à la fois
+
+    Args:
+        db: Session de base de données
+        after_id: Reprendre après cet id
+        chunk_size: Nombre de lignes par lot
+        min_confidence: Confiance minimale pour qu'une catégorie serve d'étiquette
+
+    Yields:
+        Listes de lignes (id, extracted_text, category)
+    """
+    query = select(
+        models.Document.id,
+        models.Document.extracted_text,
+        models.Document.category
+    ).where(
+        models.Document.id > after_id,
+        models.Document.category.in_(CATEGORIES),
+        models.Document.extracted_text.isnot(None),
+        models.Document.confidence >= min_confidence
+    ).order_by(models.Document.id).execution_options(yield_per=chunk_size)
+
+    result = db.execute(query)
+    for partition in result.partitions(chunk_size):
+        yield partition
+
+
+def publish_model(state):
+    """
+    Publie une nouvelle version du modèle
+    La version est conservée dans ml/versions/<version>/ puis copiée de manière
+    atomique à l'emplacement chargé par MLService
+
+    Returns:
+        Identifiant de la version publiée
+    """
+    version = datetime.now().strftime("%Y%m%d_%H%M%S") + "_incremental"
+    version_dir = os.path.join(VERSIONS_DIR, version)
+    os.makedirs(version_dir, exist_ok=True)
+
+    progressive_accuracy = (
+        state['progressive_correct'] / state['progressive_total']
+        if state['progressive_total'] else None
+    )
+    model_info = {
+        'model_name': 'SGD (log_loss, incrémental)',
+        'version': version,
+        'accuracy': progressive_accuracy,
+        'documents_seen': state['documents_seen'],
+        'last_document_id': state['last_document_id'],
+        'trained_at': datetime.now().isoformat()
+    }
+
+    artifacts = {
+        PUBLISHED_MODEL_PATH: state['model'],
+        PUBLISHED_VECTORIZER_PATH: state['vectorizer'],
+        PUBLISHED_INFO_PATH: model_info
+    }
+
+    # Écrire tous les fichiers avant de remplacer les fichiers publiés
+    staged = []
+    for published_path, artifact in artifacts.items():
+        joblib.dump(artifact, os.path.join(version_dir, os.path.basename(published_path)))
+        temp_path = published_path + ".tmp"
+        joblib.dump(artifact, temp_path)
+        staged.append((temp_path, published_path))
+
+    for temp_path, published_path in staged:
+        os.replace(temp_path, published_path)
+
+    return version
+
+
+def incremental_train(chunk_size=1000, checkpoint_every=10, min_confidence=0.8,
+                      seed_data=None, reset=False, publish=True):
+    """
+    Apprend les documents classés ajoutés depuis le dernier checkpoint
+
+    Args:
+        chunk_size: Nombre de documents lus et appris par lot
+        checkpoint_every: Sauvegarder l'état tous les N lots
+        min_confidence: Confiance minimale d'un document pour servir d'étiquette
+        seed_data: Données d'amorçage (CSV, Parquet ou dossier) utilisées quand on part de zéro
+        reset: Ignorer le checkpoint existant
+        publish: Publier le modèle obtenu pour l'API
+    """
+    print("🚀 Ré-entraînement incrémental depuis la base de données...")
+    print("="*80)
+    start_time = time.perf_counter()
+
+    state = None if reset else load_checkpoint()
+    # Relevé avant l'amorçage: un modèle appris des seules données d'amorçage est publié
+    documents_before = state['documents_seen'] if state is not None else 0
+    if state is None:
+        state = new_state()
+        if seed_data:
+            seed_from_data(state, seed_data, chunk_size)
+
+    db = SessionLocal()
+    try:
+        for chunk in stream_labelled_documents(db, state['last_document_id'], chunk_size, min_confidence):
+            learn_chunk(
+                state,
+                [row.extracted_text for row in chunk],
+                [row.category for row in chunk]
+            )
+            state['last_document_id'] = chunk[-1].id
+
+            if state['chunks_seen'] % checkpoint_every == 0:
+                save_checkpoint(state)
+                print(f"💾 Checkpoint: {state['documents_seen']} documents, "
+                      f"dernier id #{state['last_document_id']}")
+    finally:
+        db.close()
+
+    save_checkpoint(state)
+
+    new_documents = state['documents_seen'] - documents_before
+    print(f"\n✅ {new_documents} nouveaux exemples appris "
+          f"({state['documents_seen']} au total) en {time.perf_counter() - start_time:.2f}s")
+
+    if state['progressive_total']:
+        print(f"📈 Précision progressive: "
+              f"{state['progressive_correct'] / state['progressive_total'] * 100:.2f}%")
+
+    if state['documents_seen'] == 0:
+        print("⚠️  Aucun document appris, rien à publier")
+        return None
+
+    if not publish or new_documents == 0:
+        print("ℹ️  Modèle non publié")
+        return None
+
+    version = publish_model(state)
+    print(f"🏷️  Version publiée: {version}")
+    print("🚀 Redémarrer l'API (ou lancer une reclassification) pour utiliser le nouveau modèle")
+    return version
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ré-entraînement incrémental depuis la table documents")
+    parser.add_argument("--chunk-size", type=int, default=1000,
+                        help="Nombre de documents par lot")
+    parser.add_argument("--checkpoint-every", type=int, default=10,
+                        help="Sauvegarder l'état tous les N lots")
+    parser.add_argument("--min-confidence", type=float, default=0.8,
+                        help="Confiance minimale d'un document pour servir d'étiquette")
+    parser.add_argument("--seed-data", default=None,
+                        help="Données d'amorçage (ex. ml/training_data.csv ou ml/synthetic) quand on part de zéro")
+    parser.add_argument("--reset", action="store_true",
+                        help="Ignorer le checkpoint et repartir de zéro")
+    parser.add_argument("--no-publish", action="store_true",
+                        help="Mettre à jour le checkpoint sans publier de nouvelle version")
+    args = parser.parse_args()
+
+    incremental_train(
+        chunk_size=args.chunk_size,
+        checkpoint_every=args.checkpoint_every,
+        min_confidence=args.min_confidence,
+        seed_data=args.seed_data,
+        reset=args.reset,
+        publish=not args.no_publish
+    )
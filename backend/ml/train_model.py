@@ -4,13 +4,19 @@ Compare plusieurs algorithmes et choisit le meilleur automatiquement
 """
 
 import os
+import io
+import argparse
+import hashlib
 import joblib
+from contextlib import contextmanager
+from joblib import Parallel, delayed
+from sklearn.base import clone
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.linear_model import LogisticRegression
 from sklearn.svm import LinearSVC
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.model_selection import train_test_split, StratifiedKFold
 from sklearn.metrics import classification_report, accuracy_score, confusion_matrix, roc_curve, auc
 from sklearn.preprocessing import label_binarize
 import numpy as np
@@ -20,6 +26,194 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from pathlib import Path
 
+try:
+    from ml.data_loading import iter_training_data, group_data_files
+except ImportError:  # Exécution directe: python ml/train_model.py
+    from data_loading import iter_training_data, group_data_files
+
+
+# Dossier du cache des matrices TF-IDF (clé = hash du jeu de données)
+CACHE_DIR = 'ml/cache'
+
+# Paramètres du vectorizer TF-IDF (font partie de la clé de cache)
+VECTORIZER_PARAMS = {
+    'max_features': 5000,        # Augmenté pour capturer plus de patterns
+    'ngram_range': (1, 3),       # Unigrammes, bigrammes et trigrammes
+    'min_df': 2,                 # Fréquence minimale
+    'max_df': 0.7,               # Fréquence maximale
+    'strip_accents': 'unicode',  # Retirer les accents
+    'lowercase': True,           # Convertir en minuscules
+    'sublinear_tf': True         # Échelle logarithmique pour TF
+}
+
+# Paramètres du découpage train/test
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+CV_FOLDS = 5
+
+# Exemples chargés au plus: la comparaison des modèles (découpage stratifié,
+# validation croisée, courbes ROC) travaille sur l'ensemble en mémoire; pour apprendre
+# sur tout un corpus, utiliser incremental_train.py (lecture par lots, partial_fit)
+DEFAULT_MAX_ROWS = 1_000_000
+
+# Politiques de sélection du modèle déployé
+#   accuracy           : meilleure précision TEST
+#   latency_budget     : meilleure précision parmi les modèles dont la latence p99 tient le budget
+#   accuracy_tolerance : modèle le plus rapide parmi ceux à moins de `tolerance` de la meilleure précision
+SELECTION_POLICIES = ('accuracy', 'latency_budget', 'accuracy_tolerance')
+DEFAULT_P99_BUDGET_MS = 10.0
+DEFAULT_ACCURACY_TOLERANCE = 0.005
+
+# Paramètres du benchmark d'inférence
+BENCHMARK_SINGLE_RUNS = 200
+BENCHMARK_BATCH_SIZE = 64
+BENCHMARK_BATCH_RUNS = 20
+
+
+@contextmanager
+def timed_stage(stage_name, stage_times):
+    """
+    Mesure le temps réel (wall-clock) d'une étape du pipeline
+    
+    Args:
+        stage_name: Nom de l'étape affiché dans le récapitulatif
+        stage_times: Dictionnaire {étape: durée en secondes} à compléter
+    """
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_times[stage_name] = time.perf_counter() - start_time
+
+
+def compute_dataset_hash(X, y):
+    """
+    Calcule une empreinte SHA-256 du jeu de données et des paramètres de vectorisation
+    Deux exécutions sur les mêmes données partagent la même clé de cache
+    
+    Args:
+        X: Liste des textes
+        y: Liste des labels
+        
+    Returns:
+        Empreinte hexadécimale
+    """
+    digest = hashlib.sha256()
+    for text, label in zip(X, y):
+        digest.update(str(label).encode('utf-8'))
+        digest.update(b'\x1f')
+        digest.update(str(text).encode('utf-8'))
+        digest.update(b'\x1e')
+    digest.update(repr((TEST_SIZE, RANDOM_STATE)).encode('utf-8'))
+    digest.update(repr(sorted(VECTORIZER_PARAMS.items())).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def vectorize_with_cache(X_train, X_test, dataset_hash, cache_dir=CACHE_DIR, use_cache=True):
+    """
+    Vectorise les textes avec TF-IDF en réutilisant le cache disque si possible
+    
+    Args:
+        X_train: Textes d'entraînement
+        X_test: Textes de test
+        dataset_hash: Empreinte du jeu de données (clé de cache)
+        cache_dir: Dossier du cache
+        use_cache: Désactive la lecture/écriture du cache si False
+        
+    Returns:
+        Tuple (vectorizer, X_train_tfidf, X_test_tfidf)
+    """
+    cache_path = os.path.join(cache_dir, f"tfidf_{dataset_hash[:16]}.joblib")
+    
+    if use_cache and os.path.exists(cache_path):
+        try:
+            vectorizer, X_train_tfidf, X_test_tfidf = joblib.load(cache_path)
+            print(f"♻️  Matrices TF-IDF chargées depuis le cache: {cache_path}")
+            return vectorizer, X_train_tfidf, X_test_tfidf
+        except Exception as e:
+            print(f"⚠️  Cache TF-IDF illisible ({e}), nouvelle vectorisation...")
+    
+    vectorizer = TfidfVectorizer(**VECTORIZER_PARAMS)
+    X_train_tfidf = vectorizer.fit_transform(X_train)
+    X_test_tfidf = vectorizer.transform(X_test)
+    
+    if use_cache:
+        # Écriture atomique pour ne jamais laisser un cache à moitié écrit
+        os.makedirs(cache_dir, exist_ok=True)
+        temp_path = cache_path + ".tmp"
+        joblib.dump((vectorizer, X_train_tfidf, X_test_tfidf), temp_path)
+        os.replace(temp_path, cache_path)
+        print(f"💾 Matrices TF-IDF mises en cache: {cache_path}")
+    
+    return vectorizer, X_train_tfidf, X_test_tfidf
+
+
+def fit_candidate(model, X_train_tfidf, y_train, X_test_tfidf):
+    """
+    Entraîne un modèle candidat (exécuté dans un processus du pool)
+    
+    Returns:
+        Tuple (modèle entraîné, temps d'entraînement, prédictions train, prédictions test)
+    """
+    start_time = time.perf_counter()
+    model.fit(X_train_tfidf, y_train)
+    train_time = time.perf_counter() - start_time
+    return model, train_time, model.predict(X_train_tfidf), model.predict(X_test_tfidf)
+
+
+def score_cv_fold(model, X_train_tfidf, y_train, train_idx, val_idx):
+    """
+    Entraîne une copie du modèle sur un fold et retourne sa précision de validation
+    (exécuté dans un processus du pool)
+    """
+    fold_model = clone(model)
+    fold_model.fit(X_train_tfidf[train_idx], y_train[train_idx])
+    return accuracy_score(y_train[val_idx], fold_model.predict(X_train_tfidf[val_idx]))
+
+
+def evaluate_candidates(models, X_train_tfidf, y_train, X_test_tfidf, n_jobs=-1):
+    """
+    Entraîne tous les modèles et tous les folds de cross-validation en parallèle
+    Chaque (modèle, fold) est une tâche indépendante du pool de processus
+    
+    Args:
+        models: Dictionnaire {nom: modèle non entraîné}
+        X_train_tfidf: Matrice TF-IDF d'entraînement
+        y_train: Labels d'entraînement
+        X_test_tfidf: Matrice TF-IDF de test
+        n_jobs: Nombre de processus (-1 = tous les cœurs)
+        
+    Returns:
+        Dictionnaire {nom: {'fit': (...), 'cv_scores': np.ndarray}}
+    """
+    y_train = np.asarray(y_train)
+    
+    # Mêmes folds que cross_val_score(cv=5) pour un classifieur
+    folds = list(StratifiedKFold(n_splits=CV_FOLDS).split(X_train_tfidf, y_train))
+    
+    task_keys = []
+    tasks = []
+    for model_name, model in models.items():
+        task_keys.append((model_name, 'fit'))
+        tasks.append(delayed(fit_candidate)(clone(model), X_train_tfidf, y_train, X_test_tfidf))
+        for train_idx, val_idx in folds:
+            task_keys.append((model_name, 'cv'))
+            tasks.append(delayed(score_cv_fold)(model, X_train_tfidf, y_train, train_idx, val_idx))
+    
+    outputs = Parallel(n_jobs=n_jobs, backend='loky')(tasks)
+    
+    evaluations = {name: {'fit': None, 'cv_scores': []} for name in models}
+    for (model_name, kind), output in zip(task_keys, outputs):
+        if kind == 'fit':
+            evaluations[model_name]['fit'] = output
+        else:
+            evaluations[model_name]['cv_scores'].append(output)
+    
+    for evaluation in evaluations.values():
+        evaluation['cv_scores'] = np.array(evaluation['cv_scores'])
+    
+    return evaluations
+
 
 def calculate_roc_data(model, model_name, X_test, y_test, classes):
     """
@@ -134,69 +328,216 @@ def plot_all_roc_curves(roc_data_list, output_dir='ml/results'):
     print(f"   Résolution: 2400x1800 pixels (haute qualité)")
 
 
-def prepare_training_data(csv_path='ml/training_data.csv'):
+def prepare_training_data(data_path='ml/training_data.csv', chunk_size=100_000, max_rows=DEFAULT_MAX_ROWS):
     """
-    Charge les données d'entraînement depuis un fichier CSV
+    Charge les données d'entraînement par lots (CSV, Parquet ou dossier de fragments)
+    Les exemples retenus sont gardés en mémoire: max_rows borne cette mémoire et se
+    répartit entre les groupes de fragments (catégories), lus à tour de rôle
     
     Args:
-        csv_path: Chemin vers le fichier CSV contenant les données
+        data_path: Fichier ou dossier contenant les données
+        chunk_size: Nombre de lignes lues par lot
+        max_rows: Nombre maximal d'exemples à charger (None = tout, mémoire non bornée)
         
     Returns:
         Tuple (X, y) avec les textes et les labels
     """
-    print(f"📂 Chargement des données depuis {csv_path}...")
+    print(f"📂 Chargement des données depuis {data_path}...")
+    
+    if max_rows is not None:
+        # Au moins un lot de chaque groupe avant d'atteindre la limite
+        groups = len(group_data_files(data_path))
+        chunk_size = max(1, min(chunk_size, -(-max_rows // groups)))
+    
+    X = []
+    y = []
+    category_counts = pd.Series(dtype='int64')
+    truncated = False
+    
+    for chunk in iter_training_data(data_path, chunk_size=chunk_size):
+        if max_rows is not None and len(X) >= max_rows:
+            truncated = True
+            break
+        if max_rows is not None:
+            chunk = chunk.iloc[:max_rows - len(X)]
+        
+        X.extend(chunk['text'].astype(str).tolist())
+        y.extend(chunk['category'].astype(str).tolist())
+        category_counts = category_counts.add(chunk['category'].astype(str).value_counts(), fill_value=0)
+    
+    print(f"✅ Données chargées: {len(X)} exemples")
+    if truncated:
+        print(f"⚠️  Limite de {max_rows} exemples atteinte (--max-rows): le reste des données est ignoré")
+    print(f"📊 Répartition par catégorie:")
+    print(category_counts.astype('int64').sort_values(ascending=False))
+    
+    return X, y
+
+
+def predict_like_service(model, X):
+    """
+    Reproduit le travail fait par MLService.predict: prédiction + probabilités
+    """
+    predictions = model.predict(X)
+    if hasattr(model, 'predict_proba'):
+        model.predict_proba(X)
+    return predictions
+
+
+def percentile_ms(durations, percentile):
+    """Percentile d'une liste de durées (secondes) converti en millisecondes"""
+    return round(float(np.percentile(durations, percentile)) * 1000, 3)
+
+
+def benchmark_inference(model, vectorizer, texts, single_runs=BENCHMARK_SINGLE_RUNS,
+                        batch_size=BENCHMARK_BATCH_SIZE, batch_runs=BENCHMARK_BATCH_RUNS):
+    """
+    Mesure la latence d'inférence (vectorisation TF-IDF incluse) et la taille sérialisée d'un modèle
     
-    if not os.path.exists(csv_path):
-        raise FileNotFoundError(f"Le fichier {csv_path} n'existe pas!")
+    Args:
+        model: Modèle entraîné
+        vectorizer: Vectorizer TF-IDF entraîné
+        texts: Textes représentatifs (ensemble de test)
+        single_runs: Nombre de prédictions unitaires mesurées
+        batch_size: Taille des lots pour la mesure en batch
+        batch_runs: Nombre de lots mesurés
+        
+    Returns:
+        Dictionnaire des métriques (latences en ms, débit en docs/s, taille en Ko)
+    """
+    texts = list(texts)
+    
+    # Échauffement (caches, allocations)
+    predict_like_service(model, vectorizer.transform(texts[:1]))
+    
+    # Latence d'un document seul (cas de l'API /classify)
+    single_durations = []
+    for i in range(single_runs):
+        text = texts[i % len(texts)]
+        start_time = time.perf_counter()
+        predict_like_service(model, vectorizer.transform([text]))
+        single_durations.append(time.perf_counter() - start_time)
+    
+    # Latence d'un lot (cas de /classify/batch et des reclassifications)
+    batch_durations = []
+    for i in range(batch_runs):
+        offset = (i * batch_size) % len(texts)
+        batch = (texts[offset:] + texts[:offset])[:batch_size]
+        start_time = time.perf_counter()
+        predict_like_service(model, vectorizer.transform(batch))
+        batch_durations.append(time.perf_counter() - start_time)
+    
+    # Taille sérialisée (ce qui est chargé par l'API au démarrage)
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
     
-    # Charger le CSV
-    df = pd.read_csv(csv_path, encoding='utf-8')
+    return {
+        'single_p50_ms': percentile_ms(single_durations, 50),
+        'single_p95_ms': percentile_ms(single_durations, 95),
+        'single_p99_ms': percentile_ms(single_durations, 99),
+        'batch_size': batch_size,
+        'batch_p50_ms': percentile_ms(batch_durations, 50),
+        'batch_p99_ms': percentile_ms(batch_durations, 99),
+        'batch_throughput_docs_s': round(batch_size * len(batch_durations) / sum(batch_durations), 1),
+        'serialized_size_kb': round(len(buffer.getvalue()) / 1024, 2),
+        # MLService a besoin de predict_proba pour calculer la confiance
+        'servable': hasattr(model, 'predict_proba')
+    }
+
+
+def select_model(results, policy='accuracy', p99_budget_ms=DEFAULT_P99_BUDGET_MS,
+                 accuracy_tolerance=DEFAULT_ACCURACY_TOLERANCE):
+    """
+    Choisit le modèle à déployer selon la politique de sélection
     
-    print(f"✅ Données chargées: {len(df)} exemples")
-    print(f"📊 Répartition par catégorie:")
-    print(df['category'].value_counts())
+    Args:
+        results: Dictionnaire {nom: résultats} incluant 'benchmark'
+        policy: Une des SELECTION_POLICIES
+        p99_budget_ms: Budget de latence p99 (document seul) pour 'latency_budget'
+        accuracy_tolerance: Écart de précision toléré pour 'accuracy_tolerance'
+        
+    Returns:
+        Tuple (nom du modèle choisi, raison du choix)
+    """
+    if policy not in SELECTION_POLICIES:
+        raise ValueError(f"Politique inconnue: {policy}. Politiques disponibles: {SELECTION_POLICIES}")
     
-    X = df['text'].tolist()
-    y = df['category'].tolist()
+    # Seuls les modèles utilisables par MLService sont candidats
+    candidates = {name: res for name, res in results.items() if res['benchmark']['servable']}
+    if not candidates:
+        raise ValueError("Aucun modèle candidat ne fournit predict_proba")
     
-    return X, y
+    def p99(name):
+        return candidates[name]['benchmark']['single_p99_ms']
+    
+    def accuracy(name):
+        return candidates[name]['test_accuracy']
+    
+    # À précision égale, le modèle le plus rapide l'emporte
+    by_accuracy = sorted(candidates, key=lambda name: (-accuracy(name), p99(name)))
+    
+    if policy == 'accuracy':
+        return by_accuracy[0], "meilleure précision TEST"
+    
+    if policy == 'latency_budget':
+        within_budget = [name for name in by_accuracy if p99(name) <= p99_budget_ms]
+        if within_budget:
+            return within_budget[0], f"meilleure précision avec p99 <= {p99_budget_ms} ms"
+        fastest = min(candidates, key=p99)
+        return fastest, f"aucun modèle sous {p99_budget_ms} ms, modèle le plus rapide retenu"
+    
+    best_accuracy = accuracy(by_accuracy[0])
+    close_enough = [name for name in candidates if best_accuracy - accuracy(name) <= accuracy_tolerance]
+    chosen = min(close_enough, key=lambda name: (p99(name), -accuracy(name)))
+    return chosen, f"plus rapide à moins de {accuracy_tolerance * 100:.2f} pts de la meilleure précision"
+
 
-def train_model():
+def train_model(data_path='ml/training_data.csv', max_rows=DEFAULT_MAX_ROWS, n_jobs=-1, use_cache=True,
+                selection_policy='accuracy',
+                p99_budget_ms=DEFAULT_P99_BUDGET_MS, accuracy_tolerance=DEFAULT_ACCURACY_TOLERANCE):
     """
     Entraîne plusieurs modèles de classification et choisit le meilleur
+    
+    Args:
+        data_path: Fichier CSV/Parquet ou dossier de fragments à charger
+        max_rows: Nombre maximal d'exemples à charger (None = tout, mémoire non bornée)
+        n_jobs: Nombre de processus pour l'entraînement parallèle (-1 = tous les cœurs)
+        use_cache: Réutiliser les matrices TF-IDF mises en cache sur disque
+        selection_policy: Politique de choix du modèle déployé (voir SELECTION_POLICIES)
+        p99_budget_ms: Budget de latence p99 pour la politique 'latency_budget'
+        accuracy_tolerance: Écart de précision toléré pour la politique 'accuracy_tolerance'
     """
+    if selection_policy not in SELECTION_POLICIES:
+        raise ValueError(f"Politique inconnue: {selection_policy}. Politiques disponibles: {SELECTION_POLICIES}")
+    
     print("🚀 Démarrage de l'entraînement et comparaison des modèles ML...")
     print("="*80)
     
+    # Temps réel de chaque étape, affiché dans le récapitulatif
+    stage_times = {}
+    
     # Préparer les données
-    X, y = prepare_training_data()
+    with timed_stage("Chargement des données", stage_times):
+        X, y = prepare_training_data(data_path, max_rows=max_rows)
     
     print(f"\n📊 Nombre total d'exemples: {len(X)}")
     print(f"📊 Catégories: {set(y)}")
     
     # Diviser en ensembles d'entraînement et de test
     X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
+        X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=y
     )
     
     print(f"📚 Ensemble d'entraînement: {len(X_train)} exemples")
     print(f"🧪 Ensemble de test: {len(X_test)} exemples")
     
-    # Créer le vectorizer TF-IDF
+    # Créer le vectorizer TF-IDF (ou le recharger depuis le cache)
     print("\n🔧 Création du vectorizer TF-IDF...")
-    vectorizer = TfidfVectorizer(
-        max_features=5000,        # Augmenté pour capturer plus de patterns
-        ngram_range=(1, 3),       # Unigrammes, bigrammes et trigrammes
-        min_df=2,                 # Fréquence minimale
-        max_df=0.7,               # Fréquence maximale
-        strip_accents='unicode',  # Retirer les accents
-        lowercase=True,           # Convertir en minuscules
-        sublinear_tf=True         # Échelle logarithmique pour TF
-    )
-    
-    # Transformer les textes en features TF-IDF
-    X_train_tfidf = vectorizer.fit_transform(X_train)
-    X_test_tfidf = vectorizer.transform(X_test)
+    with timed_stage("Vectorisation TF-IDF", stage_times):
+        dataset_hash = compute_dataset_hash(X, y)
+        vectorizer, X_train_tfidf, X_test_tfidf = vectorize_with_cache(
+            X_train, X_test, dataset_hash, use_cache=use_cache
+        )
     
     print(f"✅ Vectorisation terminée: {X_train_tfidf.shape[1]} features créées")
     
@@ -212,26 +553,23 @@ def train_model():
     print("🤖 ENTRAÎNEMENT ET COMPARAISON DES MODÈLES")
     print("="*80)
     
+    # Entraîner tous les modèles et tous les folds CV en parallèle
+    print(f"⚙️  {len(models)} modèles x (1 + {CV_FOLDS} folds) tâches, n_jobs={n_jobs}")
+    with timed_stage("Entraînement + cross-validation (parallèle)", stage_times):
+        evaluations = evaluate_candidates(models, X_train_tfidf, y_train, X_test_tfidf, n_jobs=n_jobs)
+    
     results = {}
     roc_data_list = []  # Pour stocker les données ROC de tous les modèles
-    best_model = None
-    best_model_name = None
-    best_accuracy = 0
     
-    # Entraîner et évaluer chaque modèle
-    for model_name, model in models.items():
+    evaluation_start = time.perf_counter()
+    
+    # Évaluer chaque modèle
+    for model_name in models:
         print(f"\n{'='*80}")
         print(f"📊 Modèle: {model_name}")
         print(f"{'='*80}")
         
-        # Mesurer le temps d'entraînement
-        start_time = time.time()
-        model.fit(X_train_tfidf, y_train)
-        train_time = time.time() - start_time
-        
-        # Prédictions sur TRAIN et TEST
-        y_train_pred = model.predict(X_train_tfidf)
-        y_test_pred = model.predict(X_test_tfidf)
+        model, train_time, y_train_pred, y_test_pred = evaluations[model_name]['fit']
         
         # Calculer les précisions
         train_accuracy = accuracy_score(y_train, y_train_pred)
@@ -241,8 +579,8 @@ def train_model():
         overfitting_gap = train_accuracy - test_accuracy
         is_overfitting = overfitting_gap > 0.10  # Si différence > 10%
         
-        # Cross-validation (5-fold)
-        cv_scores = cross_val_score(model, X_train_tfidf, y_train, cv=5, scoring='accuracy')
+        # Cross-validation (5-fold), calculée en parallèle ci-dessus
+        cv_scores = evaluations[model_name]['cv_scores']
         cv_mean = cv_scores.mean()
         cv_std = cv_scores.std()
         
@@ -282,18 +620,37 @@ def train_model():
         if roc_data:
             roc_data_list.append(roc_data)
             results[model_name]['roc_auc_micro'] = roc_data['auc']
-        
-        # Mettre à jour le meilleur modèle (basé sur test_accuracy)
-        if test_accuracy > best_accuracy:
-            best_accuracy = test_accuracy
-            best_model = model
-            best_model_name = model_name
+    
+    stage_times["Évaluation et données ROC"] = time.perf_counter() - evaluation_start
+    
+    # Mesurer la latence d'inférence et la taille de chaque candidat
+    # (séquentiellement, pour ne pas fausser les mesures)
+    print("\n" + "="*80)
+    print("⚡ BENCHMARK D'INFÉRENCE")
+    print("="*80)
+    with timed_stage("Benchmark d'inférence", stage_times):
+        for model_name, result in results.items():
+            result['benchmark'] = benchmark_inference(result['model'], vectorizer, X_test)
+            bench = result['benchmark']
+            print(f"   {model_name:<40} p50 {bench['single_p50_ms']:>7.3f} ms  "
+                  f"p99 {bench['single_p99_ms']:>7.3f} ms  "
+                  f"lot de {bench['batch_size']}: {bench['batch_p50_ms']:>8.3f} ms  "
+                  f"{bench['serialized_size_kb']:>9.1f} Ko"
+                  + ("" if bench['servable'] else "  (pas de predict_proba, non déployable)"))
+    
+    # Choisir le modèle à déployer selon la politique
+    best_model_name, selection_reason = select_model(
+        results, selection_policy, p99_budget_ms=p99_budget_ms, accuracy_tolerance=accuracy_tolerance
+    )
+    best_model = results[best_model_name]['model']
+    best_accuracy = results[best_model_name]['test_accuracy']
     
     # Générer le graphique ROC comparatif unique
     print("\n" + "="*80)
     print("📈 GÉNÉRATION DU GRAPHIQUE ROC COMPARATIF")
     print("="*80)
-    plot_all_roc_curves(roc_data_list, output_dir='ml/results')
+    with timed_stage("Graphique ROC", stage_times):
+        plot_all_roc_curves(roc_data_list, output_dir='ml/results')
     
     # Afficher le récapitulatif
     print("\n" + "="*80)
@@ -303,8 +660,9 @@ def train_model():
     # Trier par précision TEST
     sorted_results = sorted(results.items(), key=lambda x: x[1]['test_accuracy'], reverse=True)
     
-    print(f"\n{'Rang':<5} {'Modèle':<40} {'Train':<10} {'Test':<10} {'AUC':<10} {'Écart':<10} {'Status'}")
-    print("-" * 105)
+    print(f"\n{'Rang':<5} {'Modèle':<40} {'Train':<10} {'Test':<10} {'AUC':<10} {'Écart':<10} "
+          f"{'p99 (ms)':<10} {'Taille (Ko)':<12} {'Status'}")
+    print("-" * 128)
     
     for rank, (name, result) in enumerate(sorted_results, 1):
         medal = "🥇" if rank == 1 else "🥈" if rank == 2 else "🥉" if rank == 3 else "  "
@@ -312,7 +670,9 @@ def train_model():
         auc_micro = result.get('roc_auc_micro', 0)
         print(f"{medal} {rank:<3} {name:<40} {result['train_accuracy']*100:>6.2f}%  "
               f"{result['test_accuracy']*100:>6.2f}%  {auc_micro:>6.3f}   "
-              f"{result['overfitting_gap']*100:>6.2f}%  {overfitting_icon}")
+              f"{result['overfitting_gap']*100:>6.2f}%  "
+              f"{result['benchmark']['single_p99_ms']:>8.3f}  "
+              f"{result['benchmark']['serialized_size_kb']:>10.1f}   {overfitting_icon}")
     
     # Analyse globale de l'overfitting
     print("\n" + "="*80)
@@ -334,7 +694,9 @@ def train_model():
     # Sauvegarder le meilleur modèle
     print("\n" + "="*80)
     print(f"🏆 MEILLEUR MODÈLE: {best_model_name}")
+    print(f"🧭 Politique de sélection: {selection_policy} ({selection_reason})")
     print(f"🎯 Précision TEST: {best_accuracy * 100:.2f}%")
+    print(f"⚡ Latence p99 (document seul): {results[best_model_name]['benchmark']['single_p99_ms']:.3f} ms")
     print(f"📊 Écart Train-Test: {results[best_model_name]['overfitting_gap'] * 100:.2f}%")
     
     if results[best_model_name]['is_overfitting']:
@@ -348,20 +710,39 @@ def train_model():
     print("="*80)
     
     print("\n Sauvegarde du meilleur modèle...")
-    os.makedirs("ml", exist_ok=True)
-    
-    joblib.dump(best_model, "ml/model.pkl")
-    joblib.dump(vectorizer, "ml/vectorizer.pkl")
-    
-    # Sauvegarder aussi les infos du modèle
-    model_info = {
-        'model_name': best_model_name,
-        'accuracy': best_accuracy,
-        'cv_mean': results[best_model_name]['cv_mean'],
-        'cv_std': results[best_model_name]['cv_std'],
-        'train_time': results[best_model_name]['train_time']
-    }
-    joblib.dump(model_info, "ml/model_info.pkl")
+    with timed_stage("Sauvegarde", stage_times):
+        os.makedirs("ml", exist_ok=True)
+        
+        joblib.dump(best_model, "ml/model.pkl")
+        joblib.dump(vectorizer, "ml/vectorizer.pkl")
+        
+        # Sauvegarder aussi les infos du modèle
+        model_info = {
+            'model_name': best_model_name,
+            'version': time.strftime("%Y%m%d_%H%M%S") + "_full",
+            'accuracy': best_accuracy,
+            'cv_mean': results[best_model_name]['cv_mean'],
+            'cv_std': results[best_model_name]['cv_std'],
+            'train_time': results[best_model_name]['train_time'],
+            'dataset_hash': dataset_hash,
+            'inference_benchmark': results[best_model_name]['benchmark'],
+            'selection': {
+                'policy': selection_policy,
+                'reason': selection_reason,
+                'p99_budget_ms': p99_budget_ms,
+                'accuracy_tolerance': accuracy_tolerance
+            },
+            'candidates': {
+                name: {
+                    'test_accuracy': res['test_accuracy'],
+                    'cv_mean': res['cv_mean'],
+                    'train_time': res['train_time'],
+                    **res['benchmark']
+                }
+                for name, res in results.items()
+            }
+        }
+        joblib.dump(model_info, "ml/model_info.pkl")
     
     print("✅ Meilleur modèle sauvegardé dans ml/model.pkl")
     print("✅ Vectorizer sauvegardé dans ml/vectorizer.pkl")
@@ -379,15 +760,49 @@ def train_model():
     
     for example in test_examples:
         example_tfidf = vectorizer.transform([example])
-        prediction = model.predict(example_tfidf)[0]
-        probas = model.predict_proba(example_tfidf)[0]
+        prediction = best_model.predict(example_tfidf)[0]
+        probas = best_model.predict_proba(example_tfidf)[0]
         confidence = max(probas)
         
         print(f"\n📄 Texte: {example[:60]}...")
         print(f"   → Catégorie: {prediction} (confiance: {confidence * 100:.1f}%)")
     
+    # Temps réel de chaque étape
+    print("\n" + "="*80)
+    print("⏱️  TEMPS PAR ÉTAPE (wall-clock)")
+    print("="*80)
+    for stage_name, duration in stage_times.items():
+        print(f"   {stage_name:<45} {duration:>8.2f}s")
+    print(f"   {'Total':<45} {sum(stage_times.values()):>8.2f}s")
+    
     print("\n✅ Entraînement terminé avec succès!")
     print("🚀 Le modèle est prêt à être utilisé par l'API")
 
 if __name__ == "__main__":
-    train_model()
+    parser = argparse.ArgumentParser(description="Entraîne et compare les modèles de classification")
+    parser.add_argument("--data", default='ml/training_data.csv',
+                        help="Fichier CSV/Parquet ou dossier de fragments (ex. ml/synthetic)")
+    parser.add_argument("--max-rows", type=int, default=DEFAULT_MAX_ROWS,
+                        help=f"Nombre maximal d'exemples gardés en mémoire, répartis entre les "
+                             f"catégories (défaut: {DEFAULT_MAX_ROWS}; 0 = tout)")
+    parser.add_argument("--n-jobs", type=int, default=-1,
+                        help="Nombre de processus parallèles (-1 = tous les cœurs)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Ignorer le cache des matrices TF-IDF")
+    parser.add_argument("--selection-policy", choices=SELECTION_POLICIES, default='accuracy',
+                        help="Politique de choix du modèle déployé")
+    parser.add_argument("--p99-budget-ms", type=float, default=DEFAULT_P99_BUDGET_MS,
+                        help="Budget de latence p99 par document (politique latency_budget)")
+    parser.add_argument("--accuracy-tolerance", type=float, default=DEFAULT_ACCURACY_TOLERANCE,
+                        help="Écart de précision toléré, ex. 0.005 = 0.5 pt (politique accuracy_tolerance)")
+    args = parser.parse_args()
+    
+    train_model(
+        data_path=args.data,
+        max_rows=args.max_rows or None,
+        n_jobs=args.n_jobs,
+        use_cache=not args.no_cache,
+        selection_policy=args.selection_policy,
+        p99_budget_ms=args.p99_budget_ms,
+        accuracy_tolerance=args.accuracy_tolerance
+    )
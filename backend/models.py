@@ -3,9 +3,9 @@ Modèles SQLAlchemy pour la base de données PostgreSQL
 Définit la structure des tables et les relations entre elles
 """
 
-from sqlalchemy import Column, Integer, String, Text, Float, DateTime, ForeignKey, Boolean
-from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, BigInteger, SmallInteger, String, Text, Float, Date, DateTime, ForeignKey, Boolean, Index, LargeBinary
+from sqlalchemy.orm import relationship, deferred, query_expression
+from sqlalchemy.sql import func, text
 from database import Base
 
 
@@ -46,14 +46,33 @@ class Document(Base):
     filename = Column(String(255), nullable=False)
     filepath = Column(String(500), nullable=False)
     file_type = Column(String(50))  # PDF, PNG, JPG
+    sha256 = Column(String(64))  # Empreinte du contenu (hexadécimal)
+    size_bytes = Column(BigInteger)  # Taille du fichier en octets
+    
+    # Contenu stocké une seule fois (filepath est alors le chemin du blob)
+    # Nul pour les documents non migrés: python -m services.blob_store
+    blob_sha256 = Column(String(64), ForeignKey("blobs.sha256"), index=True)
     
     # Résultats de l'analyse OCR
-    extracted_text = Column(Text)  # Texte extrait par OCR
+    # Texte extrait par OCR (jusqu'à plusieurs centaines de Ko): chargé uniquement
+    # sur demande avec undefer(), tout accès non prévu lève une erreur
+    extracted_text = deferred(Column(Text), raiseload=True)
+    
+    # Début du texte, calculé par la base pour les listes (with_expression)
+    text_preview = query_expression()
     
     # Résultats de la classification ML
     category = Column(String(100))  # Facture, CV, Contrat, Lettre, Autre
     confidence = Column(Float)  # Score de confiance (0-1)
     
+    # Langue détectée par l'OCR (copie de DocumentMetadata.language, pour les facettes)
+    language = Column(String(10))
+    
+    # Traitement en arrière-plan (auto_process): queued, ocr, classifying, done, failed
+    # (None: document traité par les routes /ocr et /classify)
+    processing_status = Column(String(20))
+    processing_error = Column(Text)
+    
     # Métadonnées temporelles
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -61,11 +80,140 @@ class Document(Base):
     # Relations
     owner = relationship("User", back_populates="documents")
     doc_metadata = relationship("DocumentMetadata", back_populates="document", cascade="all, delete-orphan")
+    signature = relationship("DocumentSignature", uselist=False, cascade="all, delete-orphan")
+    lsh_buckets = relationship("DocumentLSHBucket", cascade="all, delete-orphan")
+    
+    # Index des requêtes fréquentes (toujours filtrées par utilisateur)
+    # Créés par les migrations 0005 et 0009 (backend/migrations)
+    # (user_id, created_at, id): listes récentes et pagination par curseur
+    # (user_id, category, ...): filtres et comptes par facette lus dans l'index seul
+    __table_args__ = (
+        Index("ix_documents_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_documents_user_id_facets", "user_id", "category", "file_type", "language",
+              "confidence", "created_at"),
+    )
     
     def __repr__(self):
         return f"<Document(id={self.id}, filename={self.filename}, category={self.category})>"
 
 
+class Blob(Base):
+    """
+    Contenu de fichier stocké une seule fois (stockage adressé par contenu)
+    ref_count: nombre de documents qui pointent vers ce contenu; le fichier est
+    supprimé avec la dernière référence (voir services/blob_store.py)
+    """
+    __tablename__ = "blobs"
+    
+    sha256 = Column(String(64), primary_key=True)
+    size_bytes = Column(BigInteger, nullable=False)
+    path = Column(String(500), nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<Blob(sha256={self.sha256[:12]}, refs={self.ref_count})>"
+
+
+class ProcessingJob(Base):
+    """
+    Tâche de traitement d'un document (OCR puis classification), partagée par les
+    workers de tous les serveurs (voir services/job_queue.py)
+    Un worker réserve la tâche pour lease_expires_at (bail prolongé tant qu'il
+    travaille); une tâche dont le bail expire est reprise par un autre worker. Une
+    erreur la replanifie à available_at (délai croissant), puis la passe à "dead"
+    après PROCESSING_MAX_ATTEMPTS tentatives
+    """
+    __tablename__ = "processing_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
+    
+    # Propriétaire du document et rang dans sa file (réservation équitable), migration 0015
+    user_id = Column(Integer, ForeignKey("users.id"))
+    user_rank = Column(Integer, nullable=False, default=0)
+    
+    # pending, running, done, dead
+    status = Column(String(20), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime(timezone=True), nullable=False)
+    
+    # Worker qui détient la tâche et fin de son bail
+    locked_by = Column(String(100))
+    lease_expires_at = Column(DateTime(timezone=True))
+    
+    last_error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True))
+    
+    # Tâches réservables: en attente (par rang puis date) et en cours (par fin de bail),
+    # migrations 0014 et 0015; tâches non terminées de chaque utilisateur
+    __table_args__ = (
+        Index("ix_processing_jobs_pending", "user_rank", "available_at",
+              postgresql_where=text("status = 'pending'"), sqlite_where=text("status = 'pending'")),
+        Index("ix_processing_jobs_user_status", "user_id", "status"),
+        Index("ix_processing_jobs_running", "lease_expires_at",
+              postgresql_where=text("status = 'running'"), sqlite_where=text("status = 'running'")),
+    )
+    
+    def __repr__(self):
+        return f"<ProcessingJob(id={self.id}, document_id={self.document_id}, status={self.status})>"
+
+
+class UploadSession(Base):
+    """
+    Téléversement reprenable: le fichier est envoyé par morceaux numérotés
+    (chunk_size octets, le dernier plus court), écrits directement à leur position
+    dans le fichier path. Supprimé à la finalisation ou après expires_at
+    """
+    __tablename__ = "upload_sessions"
+    
+    id = Column(String(32), primary_key=True)  # UUID hexadécimal
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    
+    filename = Column(String(255), nullable=False)
+    file_type = Column(String(50), nullable=False)
+    total_size = Column(BigInteger, nullable=False)
+    chunk_size = Column(Integer, nullable=False)
+    sha256 = Column(String(64))  # Empreinte annoncée par le client (vérifiée à la fin)
+    path = Column(String(500), nullable=False)
+    
+    # open: morceaux acceptés, finalizing: finalisation en cours
+    status = Column(String(20), nullable=False, default="open")
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"<UploadSession(id={self.id}, filename={self.filename}, status={self.status})>"
+
+
+class UploadChunk(Base):
+    """Morceau reçu (et synchronisé sur le disque) d'un téléversement reprenable"""
+    __tablename__ = "upload_chunks"
+    
+    session_id = Column(String(32), ForeignKey("upload_sessions.id", ondelete="CASCADE"), primary_key=True)
+    chunk_index = Column(Integer, primary_key=True)
+    size = Column(Integer, nullable=False)
+
+
+class UploadChunkWrite(Base):
+    """
+    Morceau en cours d'écriture dans le fichier d'un téléversement reprenable
+    (migration 0016): la session n'est pas finalisée tant qu'il en reste dont le bail
+    (lease_until) n'a pas expiré. Le bail borne l'écriture, qui est interrompue à son
+    expiration: le morceau d'un processus arrêté n'empêche pas longtemps la finalisation
+    """
+    __tablename__ = "upload_chunk_writes"
+    
+    id = Column(Integer, primary_key=True)
+    session_id = Column(String(32), ForeignKey("upload_sessions.id", ondelete="CASCADE"), nullable=False, index=True)
+    chunk_index = Column(Integer, nullable=False)
+    writer = Column(String(100), nullable=False)  # Processus qui écrit (machine et PID)
+    lease_until = Column(DateTime(timezone=True), nullable=False)
+
+
 class DocumentMetadata(Base):
     """
     Table des métadonnées extraites des documents
@@ -94,5 +242,129 @@ class DocumentMetadata(Base):
     # Relation inverse vers Document
     document = relationship("Document", back_populates="doc_metadata")
     
+    # Une seule ligne de métadonnées par document (jointure par document_id)
+    __table_args__ = (
+        Index("uq_document_metadata_document_id", "document_id", unique=True),
+    )
+    
     def __repr__(self):
         return f"<DocumentMetadata(id={self.id}, document_id={self.document_id}, words={self.word_count})>"
+
+
+class DocumentSignature(Base):
+    """
+    Signature MinHash du texte extrait d'un document (détection des quasi-doublons)
+    Calculée après l'OCR, voir services/duplicate_detection.py
+    """
+    __tablename__ = "document_signatures"
+    
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    
+    # 128 minima 32 bits (512 octets)
+    signature = Column(LargeBinary, nullable=False)
+    shingle_count = Column(Integer, nullable=False)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<DocumentSignature(document_id={self.document_id}, shingles={self.shingle_count})>"
+
+
+class DocumentLSHBucket(Base):
+    """
+    Index LSH des signatures: une ligne par bande de la signature d'un document
+    Deux documents qui partagent un seau dans une bande sont candidats au doublon
+    """
+    __tablename__ = "document_lsh_buckets"
+    
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True)
+    band = Column(SmallInteger, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    
+    # Hachage 64 bits de (numéro de bande, valeurs de la bande)
+    bucket = Column(BigInteger, nullable=False)
+    
+    # Recherche des candidats: seaux d'un utilisateur
+    __table_args__ = (
+        Index("ix_document_lsh_buckets_user_id_bucket", "user_id", "bucket"),
+    )
+    
+    def __repr__(self):
+        return f"<DocumentLSHBucket(document_id={self.document_id}, band={self.band})>"
+
+
+class ReclassificationJob(Base):
+    """
+    Tâche de reclassification de toute la table documents après un ré-entraînement
+    La progression est enregistrée à chaque lot pour pouvoir reprendre après un arrêt
+    """
+    __tablename__ = "reclassification_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    
+    # pending, running, completed, failed, superseded
+    status = Column(String(20), nullable=False, default="pending")
+    
+    # Version du modèle utilisée (voir ml/model_info.pkl)
+    model_version = Column(String(100))
+    
+    # Parcours par id croissant: dernier id traité et borne fixée au démarrage
+    chunk_size = Column(Integer, nullable=False, default=500)
+    last_document_id = Column(Integer, nullable=False, default=0)
+    max_document_id = Column(Integer, nullable=False, default=0)
+    
+    # Progression
+    total_documents = Column(Integer, nullable=False, default=0)
+    processed_documents = Column(Integer, nullable=False, default=0)
+    updated_documents = Column(Integer, nullable=False, default=0)
+    
+    # Début de l'exécution en cours (le débit est calculé depuis ce point)
+    run_started_at = Column(DateTime(timezone=True))
+    run_start_processed = Column(Integer, nullable=False, default=0)
+    
+    error = Column(Text)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True))
+    
+    def __repr__(self):
+        return f"<ReclassificationJob(id={self.id}, status={self.status}, processed={self.processed_documents})>"
+
+
+class UserStat(Base):
+    """
+    Statistiques agrégées d'un utilisateur, tenues à jour à chaque modification de document
+    Une ligne par (utilisateur, dimension, valeur):
+    - ("total", ""): tous les documents
+    - ("category", <catégorie>): documents classés dans cette catégorie
+    - ("file_type", <type>): documents de ce type de fichier
+    """
+    __tablename__ = "user_stats"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    dimension = Column(String(20), primary_key=True)
+    bucket = Column(String(100), primary_key=True)
+    
+    document_count = Column(Integer, nullable=False, default=0)
+    confidence_sum = Column(Float, nullable=False, default=0.0)
+    confidence_count = Column(Integer, nullable=False, default=0)
+    word_count = Column(BigInteger, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<UserStat(user_id={self.user_id}, {self.dimension}={self.bucket}, count={self.document_count})>"
+
+
+class UserDailyCount(Base):
+    """
+    Nombre de documents créés par utilisateur et par jour (UTC), pour la timeline
+    """
+    __tablename__ = "user_daily_counts"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    document_count = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<UserDailyCount(user_id={self.user_id}, day={self.day}, count={self.document_count})>"
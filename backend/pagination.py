@@ -0,0 +1,74 @@
+"""
+Utilitaires de pagination par curseur (keyset)
+Le curseur est opaque pour le client: JSON encodé en base64 contenant les valeurs
+de tri du dernier élément renvoyé
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import literal, String
+
+
+def encode_cursor(values: dict) -> str:
+    """
+    Encode les valeurs de tri du dernier élément d'une page
+    
+    Args:
+        values: Valeurs sérialisables (les dates sont converties en ISO 8601)
+    
+    Returns:
+        Curseur base64 (URL-safe, sans padding)
+    """
+    payload = {
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in values.items()
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, keys: tuple) -> dict:
+    """
+    Décode un curseur reçu du client
+    
+    Args:
+        cursor: Curseur renvoyé dans next_cursor
+        keys: Clés attendues dans le curseur
+    
+    Returns:
+        Dictionnaire des valeurs de tri
+    
+    Raises:
+        HTTPException 400 si le curseur est invalide
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, dict) or set(values) != set(keys):
+            raise ValueError("clés inattendues")
+        return values
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+
+
+def cursor_datetime(value: str, dialect_name: str):
+    """
+    Date d'un curseur prête à être comparée à une colonne DateTime
+    
+    SQLite stocke les dates en texte: CURRENT_TIMESTAMP (server_default) n'a pas de
+    microsecondes alors que SQLAlchemy en ajoute toujours. On compare donc avec le
+    texte dans le format stocké pour que l'égalité (départage par id) fonctionne
+    """
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+    
+    if dialect_name != "sqlite":
+        return parsed
+    
+    text_format = "%Y-%m-%d %H:%M:%S.%f" if parsed.microsecond else "%Y-%m-%d %H:%M:%S"
+    return literal(parsed.strftime(text_format), String)
@@ -3,9 +3,9 @@ Schémas Pydantic pour la validation des données
 Utilisés pour valider les entrées/sorties de l'API REST
 """
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict
 
 # ========== Schémas pour les documents ==========
 
@@ -44,6 +44,8 @@ class DocumentResponse(DocumentBase):
     """Schéma de réponse complet pour un document"""
     id: int
     filepath: str
+    sha256: Optional[str] = None
+    size_bytes: Optional[int] = None
     extracted_text: Optional[str] = None
     category: Optional[str] = None
     confidence: Optional[float] = None
@@ -54,6 +56,108 @@ class DocumentResponse(DocumentBase):
     class Config:
         from_attributes = True
 
+class DocumentSummary(BaseModel):
+    """
+    Schéma allégé pour les listes de documents (sans le texte extrait complet)
+    Tous les champs sont optionnels: la liste peut être restreinte avec ?fields=
+    """
+    id: Optional[int] = None
+    filename: Optional[str] = None
+    file_type: Optional[str] = None
+    filepath: Optional[str] = None
+    size_bytes: Optional[int] = None
+    category: Optional[str] = None
+    confidence: Optional[float] = None
+    language: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    text_preview: Optional[str] = None  # 150 premiers caractères du texte extrait
+    doc_metadata: Optional[List[DocumentMetadataResponse]] = None
+
+class FacetCount(BaseModel):
+    """Nombre de documents pour une valeur d'une facette (None: valeur absente)"""
+    value: Optional[str] = None
+    count: int
+
+class DocumentFacets(BaseModel):
+    """
+    Comptes par facette des documents filtrés
+    Chaque facette ignore son propre filtre (les autres valeurs restent visibles)
+    """
+    total: int  # Documents correspondant à tous les filtres
+    category: List[FacetCount]
+    file_type: List[FacetCount]
+    language: List[FacetCount]
+
+class DocumentPage(BaseModel):
+    """Page de documents (pagination par curseur)"""
+    items: List[DocumentSummary]
+    next_cursor: Optional[str] = None  # À renvoyer dans ?cursor= pour la page suivante
+    has_more: bool
+    facets: Optional[DocumentFacets] = None  # Première page uniquement
+
+class SearchResult(BaseModel):
+    """Document trouvé par la recherche plein texte"""
+    id: int
+    filename: str
+    file_type: Optional[str] = None
+    category: Optional[str] = None
+    confidence: Optional[float] = None
+    created_at: datetime
+    rank: float  # Pertinence (plus élevée = plus pertinent)
+    snippet: Optional[str] = None  # Extrait, termes trouvés entre <mark> et </mark>
+
+class SearchPage(BaseModel):
+    """Page de résultats de recherche (pagination par curseur sur la pertinence)"""
+    items: List[SearchResult]
+    next_cursor: Optional[str] = None
+    has_more: bool
+
+class FuzzyMatch(BaseModel):
+    """Document dont le nom de fichier ou la catégorie ressemble au texte recherché"""
+    id: int
+    filename: str
+    file_type: Optional[str] = None
+    category: Optional[str] = None
+    confidence: Optional[float] = None
+    created_at: datetime
+    score: float  # Similarité des trigrammes (0-1, 1 = nom contenant le texte recherché)
+
+class FuzzySearchResponse(BaseModel):
+    """Meilleures correspondances de la recherche approximative, par score décroissant"""
+    query: str
+    items: List[FuzzyMatch]
+
+class DuplicateDocument(BaseModel):
+    """Quasi-doublon d'un document"""
+    id: int
+    filename: str
+    file_type: Optional[str] = None
+    category: Optional[str] = None
+    confidence: Optional[float] = None
+    created_at: datetime
+    similarity: float  # Similarité de Jaccard estimée (0-1)
+
+class DuplicatesResponse(BaseModel):
+    """Quasi-doublons d'un document, du plus similaire au moins similaire"""
+    document_id: int
+    duplicates: List[DuplicateDocument]
+
+class SimilarDocument(BaseModel):
+    """Document proche d'un autre (vecteurs TF-IDF)"""
+    id: int
+    filename: str
+    file_type: Optional[str] = None
+    category: Optional[str] = None
+    confidence: Optional[float] = None
+    created_at: datetime
+    score: float  # Similarité cosinus (0-1)
+
+class SimilarResponse(BaseModel):
+    """Documents similaires à un document, du plus proche au plus éloigné"""
+    document_id: int
+    similar: List[SimilarDocument]
+
 # ========== Schémas pour l'upload ==========
 
 class UploadResponse(BaseModel):
@@ -63,6 +167,55 @@ class UploadResponse(BaseModel):
     filename: str
     filepath: str
     file_type: str
+    sha256: str  # Empreinte SHA-256 du contenu
+    size_bytes: int
+    processing_status: Optional[str] = None  # "queued" avec auto_process
+
+class BatchUploadItem(BaseModel):
+    """Résultat d'un fichier d'un téléversement groupé"""
+    filename: str
+    status: str  # uploaded, error
+    document_id: Optional[int] = None
+    filepath: Optional[str] = None
+    file_type: Optional[str] = None
+    sha256: Optional[str] = None
+    size_bytes: Optional[int] = None
+    processing_status: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchUploadResponse(BaseModel):
+    """Réponse après un téléversement groupé"""
+    uploaded: int
+    failed: int
+    items: List[BatchUploadItem]  # Dans l'ordre des fichiers envoyés
+
+class UploadSessionCreate(BaseModel):
+    """Requête de création d'un téléversement reprenable"""
+    filename: str = Field(..., min_length=1, max_length=255)
+    total_size: int = Field(..., gt=0)  # Taille du fichier en octets
+    sha256: Optional[str] = Field(None, pattern=r"^[0-9a-fA-F]{64}$")  # Vérifiée à la finalisation
+
+class UploadSessionResponse(BaseModel):
+    """État d'un téléversement reprenable"""
+    upload_id: str
+    filename: str
+    file_type: str
+    status: str  # open, finalizing
+    total_size: int
+    chunk_size: int
+    chunk_count: int
+    received_bytes: int
+    offset: int  # Octets reçus sans interruption depuis le début du fichier
+    missing_chunks: List[int]  # Morceaux à envoyer (ou renvoyer)
+    expires_at: datetime
+
+class ProcessingStatusResponse(BaseModel):
+    """Avancement du traitement en arrière-plan d'un document"""
+    document_id: int
+    processing_status: Optional[str] = None  # queued, ocr, classifying, done, failed
+    processing_error: Optional[str] = None
+    category: Optional[str] = None
+    confidence: Optional[float] = None
 
 # ========== Schémas pour l'OCR ==========
 
@@ -78,11 +231,46 @@ class OCRResponse(BaseModel):
     language: str
     processing_time: float  # Temps en secondes
 
+class OCRClassStats(BaseModel):
+    """File d'une classe de priorité de l'OCR"""
+    priority: str  # interactive, guest, bulk, reclassification
+    queued: int
+    waiting_clients: int  # Demandeurs distincts en attente
+    in_flight: int
+    max_in_flight: int
+    served: int
+    rejected: int  # Refusées file pleine
+    wait_avg_ms: float
+    wait_p95_ms: float
+    wait_max_ms: float
+
+class OCRQueueResponse(BaseModel):
+    """Files de l'OCR de ce processus et tâches de traitement en base"""
+    slots: int
+    in_flight: int
+    classes: List[OCRClassStats]
+    jobs: Dict[str, int]  # Tâches processing_jobs par statut (tous les workers)
+
+class GuestAdmissionStats(BaseModel):
+    """Analyses visiteurs servies et refusées, limites et file des OCR visiteurs"""
+    served: int
+    rejected: int
+    rejected_by_reason: Dict[str, int]  # rate_limited, saturated, too_many_pages...
+    rate_per_minute: float  # Par adresse IP
+    burst: int
+    max_queued: int
+    max_pdf_pages: int
+    queued: int
+    in_flight: int
+    max_in_flight: int
+    wait_p95_ms: float
+
 # ========== Schémas pour la classification ==========
 
 class ClassifyRequest(BaseModel):
     """Requête pour classifier un document"""
     document_id: int
+    reuse_duplicate: bool = False  # Reprendre la catégorie d'un quasi-doublon déjà classé
 
 class ClassifyResponse(BaseModel):
     """Réponse de la classification"""
@@ -90,6 +278,32 @@ class ClassifyResponse(BaseModel):
     category: str
     confidence: float
     all_predictions: dict  # Toutes les catégories avec leurs scores
+    duplicate_of: Optional[int] = None  # Doublon dont la catégorie a été reprise
+
+class ReclassifyRequest(BaseModel):
+    """Requête pour lancer une reclassification de tous les documents"""
+    chunk_size: int = Field(500, ge=10, le=10000)
+    restart: bool = False  # Ignorer une tâche interrompue et repartir de zéro
+
+class ReclassificationJobResponse(BaseModel):
+    """État d'une tâche de reclassification"""
+    # Champ model_version: désactiver l'espace de noms réservé "model_" de pydantic
+    model_config = ConfigDict(protected_namespaces=())
+    
+    id: int
+    status: str
+    model_version: Optional[str] = None
+    chunk_size: int
+    last_document_id: int
+    total_documents: int
+    processed_documents: int
+    updated_documents: int
+    progress_percent: float
+    throughput_docs_per_s: Optional[float] = None
+    eta_seconds: Optional[float] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
 
 # ========== Schémas pour les statistiques ==========
 
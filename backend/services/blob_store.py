@@ -0,0 +1,349 @@
+"""
+Stockage des fichiers adressé par contenu
+Chaque contenu distinct est stocké une seule fois sous
+STORAGE_PATH/<2 premiers caractères du SHA-256>/<2 suivants>/<sha256><extension>
+(au plus 256 dossiers par niveau). La table blobs compte les documents qui
+pointent vers chaque contenu:
+- téléversement: la référence est ajoutée dans la transaction du document; le
+  fichier temporaire n'est synchronisé et renommé que si le contenu est nouveau,
+  sinon il est simplement supprimé
+- suppression: la dernière référence supprime la ligne blobs et déplace le fichier
+  dans la corbeille pendant la transaction (un téléversement concurrent du même
+  contenu attend la fin de celle-ci sur la ligne blobs); le fichier est supprimé
+  après le commit, ou remis en place si la transaction échoue
+
+Migration des fichiers des documents existants et nettoyage des fichiers orphelins
+(téléversements interrompus), depuis le dossier backend:
+    python -m services.blob_store
+    python -m services.blob_store --gc
+"""
+
+import argparse
+import os
+import re
+import shutil
+import time
+import uuid
+from contextlib import suppress
+from functools import partial
+from typing import Optional
+import anyio
+from sqlalchemy import select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from dotenv import load_dotenv
+from database import dialect_insert
+import models
+from services.file_storage import StagedFile, place_staged, discard_staged, hash_file
+
+load_dotenv()
+
+
+STORAGE_PATH = os.getenv("STORAGE_PATH", "./storage/documents")
+
+# Fichiers en cours de téléversement et fichiers en attente de suppression
+STAGING_PATH = os.path.join(STORAGE_PATH, ".staging")
+TRASH_PATH = os.path.join(STORAGE_PATH, ".trash")
+
+# Âge minimal (secondes) d'un fichier orphelin avant sa suppression par --gc
+# (un blob placé par une transaction pas encore validée n'a pas encore de ligne)
+GC_MIN_AGE = 3600
+
+_SHARD = re.compile(r"^[0-9a-f]{2}$")
+
+
+def blob_path(sha256: str, extension: str) -> str:
+    """Chemin du fichier d'un contenu (extension du premier fichier téléversé)"""
+    return os.path.join(STORAGE_PATH, sha256[:2], sha256[2:4], f"{sha256}{extension.lower()}")
+
+
+def _acquire_statement(dialect_name: str, rows: list):
+    """
+    Crée les lignes blobs (ref_count références) ou ajoute les références aux lignes
+    existantes; renvoie (sha256, path, ref_count) de chaque contenu
+    """
+    table = models.Blob.__table__
+    stmt = dialect_insert(dialect_name)(table).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=["sha256"],
+        set_={"ref_count": table.c.ref_count + stmt.excluded.ref_count}
+    ).returning(table.c.sha256, table.c.path, table.c.ref_count)
+
+
+async def _keep_or_discard(staged: StagedFile, path: str, is_new: bool):
+    """Place le fichier d'un nouveau contenu (ou dont le fichier a disparu), supprime sinon"""
+    if not is_new and await anyio.to_thread.run_sync(os.path.exists, path):
+        await discard_staged(staged.path)
+    else:
+        await place_staged(staged, path)
+
+
+async def store_blobs(db: AsyncSession, files: list, concurrency: int = 8) -> list:
+    """
+    Ajoute une référence au contenu de chaque fichier téléversé (dans la transaction en
+    cours), en une seule requête quel que soit le nombre de fichiers
+    
+    Args:
+        db: Session de base de données
+        files: Liste de (fichier écrit dans STAGING_PATH, extension)
+        concurrency: Fichiers placés (fsync, renommage) en parallèle
+    
+    Returns:
+        Chemin du fichier du contenu de chaque fichier, dans l'ordre de files
+    """
+    references = {}
+    for staged, extension in files:
+        row = references.setdefault(staged.sha256, {
+            "sha256": staged.sha256,
+            "size_bytes": staged.size_bytes,
+            "path": blob_path(staged.sha256, extension),
+            "ref_count": 0
+        })
+        row["ref_count"] += 1
+    
+    # Ordre des clés constant: pas d'interblocage entre deux lots concurrents (PostgreSQL)
+    rows = [references[sha256] for sha256 in sorted(references)]
+    stored = {
+        sha256: (path, ref_count)
+        for sha256, path, ref_count in (await db.execute(
+            _acquire_statement(db.bind.dialect.name, rows)
+        )).all()
+    }
+    
+    # Un seul fichier placé par contenu, les copies identiques du lot sont supprimées
+    placed = set()
+    limiter = anyio.CapacityLimiter(concurrency)
+    
+    async def keep_or_discard(staged: StagedFile, path: str, is_new: bool):
+        async with limiter:
+            await _keep_or_discard(staged, path, is_new)
+    
+    async with anyio.create_task_group() as group:
+        for staged, _ in files:
+            path, ref_count = stored[staged.sha256]
+            if staged.sha256 in placed:
+                group.start_soon(discard_staged, staged.path)
+                continue
+            placed.add(staged.sha256)
+            group.start_soon(keep_or_discard, staged, path,
+                             ref_count == references[staged.sha256]["ref_count"])
+    
+    return [stored[staged.sha256][0] for staged, _ in files]
+
+
+async def store_blob(db: AsyncSession, staged: StagedFile, extension: str) -> str:
+    """
+    Ajoute une référence au contenu d'un fichier téléversé (dans la transaction en cours)
+    
+    Args:
+        db: Session de base de données
+        staged: Fichier écrit dans STAGING_PATH (stage_upload)
+        extension: Extension du fichier (.pdf, .png...)
+    
+    Returns:
+        Chemin du fichier du contenu
+    """
+    return (await store_blobs(db, [(staged, extension)]))[0]
+
+
+class TrashedBlob:
+    """Fichier d'un contenu sans référence, déplacé dans la corbeille"""
+    
+    def __init__(self, path: str, trash_path: str):
+        self.path = path
+        self.trash_path = trash_path
+
+
+async def release_blob(db: AsyncSession, sha256: str) -> Optional[TrashedBlob]:
+    """
+    Retire une référence à un contenu (dans la transaction en cours, après la
+    suppression du document)
+    
+    Returns:
+        Fichier déplacé dans la corbeille si c'était la dernière référence
+        (purge_trashed après le commit, restore_trashed si la transaction échoue)
+    """
+    table = models.Blob.__table__
+    row = (await db.execute(
+        update(table).where(table.c.sha256 == sha256).values(
+            ref_count=table.c.ref_count - 1
+        ).returning(table.c.path, table.c.ref_count)
+    )).one_or_none()
+    if row is None or row.ref_count > 0:
+        return None
+    
+    await db.execute(delete(table).where(table.c.sha256 == sha256))
+    
+    trash_path = os.path.join(TRASH_PATH, f"{uuid.uuid4().hex}_{os.path.basename(row.path)}")
+    try:
+        await anyio.to_thread.run_sync(partial(os.makedirs, TRASH_PATH, exist_ok=True))
+        await anyio.to_thread.run_sync(os.replace, row.path, trash_path)
+    except FileNotFoundError:
+        return None
+    return TrashedBlob(row.path, trash_path)
+
+
+async def purge_trashed(trashed: Optional[TrashedBlob]):
+    """Supprime définitivement un fichier de la corbeille (après le commit)"""
+    if trashed is None:
+        return
+    with suppress(FileNotFoundError):
+        await anyio.to_thread.run_sync(os.unlink, trashed.trash_path)
+
+
+async def restore_trashed(trashed: Optional[TrashedBlob]):
+    """Remet en place un fichier de la corbeille (transaction annulée)"""
+    if trashed is None:
+        return
+    with suppress(FileNotFoundError):
+        await anyio.to_thread.run_sync(os.replace, trashed.trash_path, trashed.path)
+
+
+def _copy_durably(source: str, destination: str):
+    """Copie un fichier à destination (copie temporaire, fsync, renommage atomique)"""
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    os.makedirs(STAGING_PATH, exist_ok=True)
+    temporary = os.path.join(STAGING_PATH, f".{uuid.uuid4().hex}.part")
+    try:
+        shutil.copyfile(source, temporary)
+        with open(temporary, "r+b") as copied:
+            os.fsync(copied.fileno())
+        os.replace(temporary, destination)
+    finally:
+        with suppress(FileNotFoundError):
+            os.unlink(temporary)
+
+
+def migrate_documents(db, batch_size: int = 200) -> int:
+    """
+    Place les fichiers des documents sans blob dans le stockage par contenu (session
+    synchrone). Les fichiers sont copiés puis les anciens supprimés après le commit:
+    une interruption ne laisse aucun document sans fichier
+    
+    Returns:
+        Nombre de documents migrés
+    """
+    migrated = 0
+    last_id = 0
+    while True:
+        documents = db.execute(
+            select(models.Document).where(
+                models.Document.id > last_id,
+                models.Document.blob_sha256.is_(None)
+            ).options(load_only(
+                models.Document.filepath,
+                models.Document.sha256,
+                models.Document.size_bytes,
+                models.Document.blob_sha256
+            )).order_by(models.Document.id).limit(batch_size)
+        ).scalars().all()
+        if not documents:
+            return migrated
+        
+        created = {}
+        replaced = []
+        for document in documents:
+            if not os.path.exists(document.filepath):
+                print(f"⚠️ Fichier introuvable pour le document {document.id}: {document.filepath}")
+                continue
+            
+            sha256, size_bytes = hash_file(document.filepath)
+            blob = created.get(sha256) or db.get(models.Blob, sha256)
+            if blob is None:
+                path = blob_path(sha256, os.path.splitext(document.filepath)[1])
+                _copy_durably(document.filepath, path)
+                blob = created[sha256] = models.Blob(
+                    sha256=sha256, size_bytes=size_bytes, path=path, ref_count=0
+                )
+                db.add(blob)
+            
+            blob.ref_count += 1
+            if document.filepath != blob.path:
+                replaced.append(document.filepath)
+            document.filepath = blob.path
+            document.sha256 = sha256
+            document.size_bytes = size_bytes
+            document.blob_sha256 = sha256
+            migrated += 1
+        
+        db.commit()
+        for path in replaced:
+            with suppress(FileNotFoundError):
+                os.unlink(path)
+        
+        last_id = documents[-1].id
+        db.expunge_all()
+
+
+def _old_files(directory: str, min_age: float):
+    """Fichiers d'un dossier modifiés il y a plus de min_age secondes"""
+    if not os.path.isdir(directory):
+        return
+    limit = time.time() - min_age
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.stat().st_mtime < limit:
+            yield entry.path
+
+
+def collect_garbage(db, min_age: float = GC_MIN_AGE, batch_size: int = 500) -> int:
+    """
+    Supprime les fichiers du stockage par contenu sans ligne blobs (transaction
+    interrompue après le placement du fichier) et les fichiers de transit et de
+    corbeille abandonnés (session synchrone)
+    
+    Returns:
+        Nombre de fichiers supprimés
+    """
+    removed = 0
+    for directory in (STAGING_PATH, TRASH_PATH):
+        for path in _old_files(directory, min_age):
+            os.unlink(path)
+            removed += 1
+    
+    if not os.path.isdir(STORAGE_PATH):
+        return removed
+    
+    def check(candidates: dict) -> int:
+        known = set(db.scalars(
+            select(models.Blob.sha256).where(models.Blob.sha256.in_(list(candidates)))
+        ))
+        orphans = [path for sha256, path in candidates.items() if sha256 not in known]
+        for path in orphans:
+            with suppress(FileNotFoundError):
+                os.unlink(path)
+        return len(orphans)
+    
+    candidates = {}
+    for first in sorted(os.listdir(STORAGE_PATH)):
+        if not _SHARD.match(first):
+            continue
+        for second in sorted(os.listdir(os.path.join(STORAGE_PATH, first))):
+            for path in _old_files(os.path.join(STORAGE_PATH, first, second), min_age):
+                candidates[os.path.basename(path)[:64]] = path
+                if len(candidates) >= batch_size:
+                    removed += check(candidates)
+                    candidates = {}
+    if candidates:
+        removed += check(candidates)
+    return removed
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+    
+    parser = argparse.ArgumentParser(description="Stockage des fichiers adressé par contenu")
+    parser.add_argument("--gc", action="store_true",
+                        help="Supprimer les fichiers orphelins au lieu de migrer les documents")
+    parser.add_argument("--batch-size", type=int, default=200, help="Documents par transaction")
+    args = parser.parse_args()
+    
+    db = SessionLocal()
+    try:
+        if args.gc:
+            count = collect_garbage(db)
+            print(f"✅ {count} fichier(s) orphelin(s) supprimé(s)")
+        else:
+            count = migrate_documents(db, args.batch_size)
+            print(f"✅ {count} document(s) migré(s) vers le stockage par contenu")
+    finally:
+        db.close()
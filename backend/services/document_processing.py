@@ -0,0 +1,375 @@
+"""
+Traitement des documents: OCR puis classification
+Fonctions partagées par les routes /ocr et /classify et par les workers de traitement
+en arrière-plan: un téléversement avec auto_process=true renvoie dès que le fichier
+est écrit, le document passe à "queued" avec une tâche dans processing_jobs, et un
+worker de l'API (PROCESSING_WORKERS) ou d'un processus dédié (python worker.py)
+exécute l'OCR puis la classification. documents.processing_status suit l'avancement
+(queued, ocr, classifying, done, failed); GET /documents/{id}/status le renvoie
+"""
+
+import asyncio
+import os
+import tempfile
+from typing import Optional
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal
+from services.ocr_service import OCRService
+from services.image_processing import ImageProcessor
+from services.ml_service import MLService
+from services.stats_rollup import StatsDelta
+from services.duplicate_detection import compute_signature, index_document, find_duplicates, DUPLICATE_REUSE_THRESHOLD
+from services.vector_store import vector_store
+from services import job_queue
+from services.ocr_scheduler import ocr_scheduler, BULK
+import models
+
+
+ocr_service = OCRService()
+image_processor = ImageProcessor()
+ml_service = MLService()
+
+# Documents traités en parallèle par les workers de l'API (OCR limité par
+# OCR_MAX_IN_FLIGHT_BULK); 0: traitement par des workers dédiés (python worker.py)
+PROCESSING_WORKERS = int(os.getenv("PROCESSING_WORKERS", str(os.cpu_count() or 2)))
+
+# Intervalle de scrutation de processing_jobs par un worker inoccupé (secondes)
+POLL_INTERVAL = float(os.getenv("PROCESSING_POLL_SECONDS", "2"))
+
+
+class PermanentProcessingError(Exception):
+    """Erreur de traitement qu'une nouvelle tentative ne corrigerait pas"""
+
+
+def extract_document_text(filepath: str, file_type: str):
+    """
+    Extrait le texte et les informations d'image d'un fichier (bloquant: OCR Tesseract)
+    Exécuté dans un thread pour ne pas bloquer la boucle d'événements
+    
+    Args:
+        filepath: Chemin du fichier
+        file_type: "PDF" ou "IMAGE"
+    
+    Returns:
+        Tuple (texte extrait, métadonnées OCR, informations de l'image)
+    """
+    # Traiter selon le type de fichier
+    if file_type == "PDF":
+        # Extraire le texte du PDF
+        extracted_text, metadata_dict = ocr_service.extract_text_from_pdf(filepath)
+    else:
+        # Prétraiter l'image avec OpenCV
+        try:
+            preprocessed_image = image_processor.preprocess_image(filepath)
+            
+            # Sauvegarder l'image prétraitée temporairement
+            with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp_file:
+                temp_path = temp_file.name
+                import cv2
+                cv2.imwrite(temp_path, preprocessed_image)
+            
+            # Extraire le texte de l'image prétraitée
+            extracted_text, metadata_dict = ocr_service.extract_text_from_image(temp_path)
+            
+            # Nettoyer le fichier temporaire
+            os.unlink(temp_path)
+        
+        except Exception as e:
+            # Si le prétraitement échoue, utiliser l'image originale
+            print(f"Prétraitement échoué, utilisation de l'image originale: {e}")
+            extracted_text, metadata_dict = ocr_service.extract_text_from_image(filepath)
+    
+    # Obtenir les informations de l'image
+    image_info = image_processor.get_image_info(filepath)
+    
+    return extracted_text, metadata_dict, image_info
+
+
+async def save_ocr_result(db: AsyncSession, document: models.Document, extracted_text: str,
+                          metadata_dict: dict, image_info: dict):
+    """
+    Enregistre le texte extrait, la signature MinHash, les métadonnées et le nombre
+    de mots dans les statistiques (dans la transaction en cours, sans commit)
+    """
+    # Mettre à jour le document avec le texte extrait
+    document.extracted_text = extracted_text
+    document.language = metadata_dict.get("language")
+    
+    # Signature MinHash du nouveau texte (détection des quasi-doublons)
+    computed = await asyncio.to_thread(compute_signature, extracted_text)
+    await index_document(db, document, computed)
+    
+    # Créer ou mettre à jour les métadonnées
+    result = await db.execute(
+        select(models.DocumentMetadata).where(
+            models.DocumentMetadata.document_id == document.id
+        )
+    )
+    existing_metadata = result.scalars().first()
+    
+    # Mettre à jour le nombre de mots dans les statistiques agrégées
+    delta = StatsDelta()
+    delta.add_document(document, -1, word_count=existing_metadata.word_count if existing_metadata else 0)
+    delta.add_document(document, +1, word_count=metadata_dict.get("word_count"))
+    await delta.apply(db)
+    
+    if existing_metadata:
+        # Mettre à jour
+        existing_metadata.word_count = metadata_dict.get("word_count")
+        existing_metadata.char_count = metadata_dict.get("char_count")
+        existing_metadata.line_count = metadata_dict.get("line_count")
+        existing_metadata.language = metadata_dict.get("language")
+        existing_metadata.image_width = image_info.get("width")
+        existing_metadata.image_height = image_info.get("height")
+        existing_metadata.image_size_kb = image_info.get("size_kb")
+    else:
+        # Créer nouvelle métadonnée
+        db_metadata = models.DocumentMetadata(
+            document_id=document.id,
+            word_count=metadata_dict.get("word_count"),
+            char_count=metadata_dict.get("char_count"),
+            line_count=metadata_dict.get("line_count"),
+            language=metadata_dict.get("language"),
+            image_width=image_info.get("width"),
+            image_height=image_info.get("height"),
+            image_size_kb=image_info.get("size_kb")
+        )
+        db.add(db_metadata)
+
+
+async def find_classified_duplicate(db: AsyncSession, document: models.Document):
+    """
+    Quasi-doublon déjà classé le plus similaire (au-dessus de DUPLICATE_REUSE_THRESHOLD)
+    
+    Returns:
+        Document doublon, ou None
+    """
+    duplicates = await find_duplicates(db, document.id, document.user_id, DUPLICATE_REUSE_THRESHOLD)
+    if not duplicates:
+        return None
+    
+    result = await db.execute(
+        select(models.Document).where(
+            models.Document.id.in_([duplicate_id for duplicate_id, _ in duplicates]),
+            models.Document.category.isnot(None),
+            models.Document.confidence.isnot(None)
+        )
+    )
+    classified = {candidate.id: candidate for candidate in result.scalars().all()}
+    
+    # Doublons triés par similarité décroissante
+    for duplicate_id, _ in duplicates:
+        if duplicate_id in classified:
+            return classified[duplicate_id]
+    return None
+
+
+async def save_classification(db: AsyncSession, document: models.Document, category: str,
+                              confidence: float):
+    """Enregistre la catégorie et met à jour les statistiques (transaction en cours, sans commit)"""
+    delta = StatsDelta()
+    delta.add_document(document, -1)
+    document.category = category
+    document.confidence = confidence
+    delta.add_document(document, +1)
+    await delta.apply(db)
+
+
+def classify_text(extracted_text: str):
+    """
+    Classifie un texte (bloquant); un texte vide est classé "Autre" comme dans predict()
+    
+    Returns:
+        Tuple (catégorie, confiance, vecteurs TF-IDF ou None)
+    """
+    if not extracted_text.strip():
+        return "Autre", 0.0, None
+    vectors = ml_service.vectorize([extracted_text])
+    category, confidence, _ = ml_service.predict_vectors(vectors)[0]
+    return category, confidence, vectors
+
+
+async def set_processing_status(db: AsyncSession, document_id: int, status: str,
+                                error: Optional[str] = None):
+    """Met à jour l'avancement du traitement d'un document (commit)"""
+    await db.execute(
+        update(models.Document).where(models.Document.id == document_id).values(
+            processing_status=status, processing_error=error
+        )
+    )
+    await db.commit()
+
+
+class DocumentProcessingPool:
+    """
+    Workers de traitement (OCR puis classification) des documents téléversés avec
+    auto_process, dans l'API ou dans un processus dédié (python worker.py)
+    Chaque worker réserve une tâche de processing_jobs (services/job_queue.py), prolonge
+    son bail pendant le traitement et enregistre chaque étape en vérifiant qu'il le
+    détient encore. L'OCR et la classification passent par ocr_scheduler en classe
+    "bulk": un OCR interactif n'attend pas derrière un import massif
+    """
+    
+    def __init__(self, workers: int = PROCESSING_WORKERS, worker_id: Optional[str] = None):
+        self.workers = workers
+        self.worker_id = worker_id or job_queue.default_worker_id()
+        self._tasks = []
+        self._wakeup = asyncio.Event()
+    
+    def is_running(self) -> bool:
+        """Indique si le pool est démarré dans ce processus"""
+        return bool(self._tasks)
+    
+    async def start(self):
+        """Démarre les workers (aucun si workers vaut 0: traitement par python worker.py)"""
+        if self.is_running() or self.workers <= 0:
+            return
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"document-processing-{index}")
+            for index in range(self.workers)
+        ]
+    
+    async def stop(self):
+        """Arrête les workers et rend leurs tâches en cours aux autres workers"""
+        if not self.is_running():
+            return
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        
+        async with AsyncSessionLocal() as db:
+            released = await job_queue.release_jobs(db, self.worker_id)
+        if released:
+            print(f"🔄 {released} tâche(s) de traitement rendue(s)")
+    
+    def notify(self):
+        """Réveille les workers de ce processus (nouvelles tâches validées)"""
+        self._wakeup.set()
+    
+    async def _work(self):
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    claimed = await job_queue.claim_jobs(db, self.worker_id)
+            except Exception as e:
+                print(f"⚠️ Erreur lors de la réservation d'une tâche de traitement: {e}")
+                claimed = []
+            
+            if not claimed:
+                # Attendre une nouvelle tâche de ce processus ou l'intervalle de scrutation
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            try:
+                await self.process(claimed[0])
+            except Exception as e:
+                print(f"⚠️ Erreur lors du traitement du document {claimed[0].document_id}: {e}")
+    
+    async def _heartbeat(self, claimed: job_queue.ClaimedJob, lost: asyncio.Event):
+        """Prolonge le bail de la tâche tant qu'elle est traitée"""
+        while True:
+            await asyncio.sleep(job_queue.LEASE_SECONDS / 3)
+            try:
+                async with AsyncSessionLocal() as db:
+                    if not await job_queue.extend_lease(db, claimed.id, self.worker_id):
+                        lost.set()
+                        return
+            except Exception as e:
+                print(f"⚠️ Prolongation du bail de la tâche {claimed.id} impossible: {e}")
+    
+    async def process(self, claimed: job_queue.ClaimedJob):
+        """
+        Traite une tâche réservée; une erreur la replanifie (délai croissant) ou la
+        passe à "dead", et le document à "failed", après la dernière tentative
+        """
+        lost = asyncio.Event()
+        heartbeat = asyncio.create_task(self._heartbeat(claimed, lost))
+        try:
+            async with AsyncSessionLocal() as db:
+                try:
+                    if claimed.attempts > job_queue.MAX_ATTEMPTS:
+                        # Bail expiré à chaque tentative (worker arrêté pendant le traitement)
+                        raise PermanentProcessingError(
+                            f"Abandon après {job_queue.MAX_ATTEMPTS} tentatives interrompues"
+                        )
+                    await self._process_document(db, claimed, lost)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    await db.rollback()
+                    error = str(e)[:1000]
+                    status = await job_queue.fail_job(
+                        db, claimed, self.worker_id, error,
+                        retry=not isinstance(e, PermanentProcessingError)
+                    )
+                    if status is None:
+                        await db.rollback()
+                    else:
+                        await set_processing_status(
+                            db, claimed.document_id,
+                            "failed" if status == job_queue.DEAD else "queued", error
+                        )
+                    raise
+        finally:
+            heartbeat.cancel()
+    
+    async def _process_document(self, db: AsyncSession, claimed: job_queue.ClaimedJob,
+                                lost: asyncio.Event):
+        """OCR puis classification; chaque étape est validée avec la vérification du bail"""
+        document = await db.get(models.Document, claimed.document_id)
+        if document is None:
+            # Document supprimé entre-temps
+            await job_queue.complete_job(db, claimed.id, self.worker_id)
+            await db.commit()
+            return
+        if not os.path.exists(document.filepath):
+            raise PermanentProcessingError("Fichier physique non trouvé")
+        
+        # OCR
+        document.processing_status = "ocr"
+        document.processing_error = None
+        await db.commit()
+        extracted_text, metadata_dict, image_info = await ocr_scheduler.run(
+            BULK, claimed.user_id, extract_document_text, document.filepath, document.file_type
+        )
+        
+        document = await db.get(models.Document, claimed.document_id, populate_existing=True)
+        if lost.is_set() or not await job_queue.hold_lease(db, claimed.id, self.worker_id):
+            # Tâche reprise par un autre worker: son résultat prévaut
+            await db.rollback()
+            return
+        if document is None:
+            await job_queue.complete_job(db, claimed.id, self.worker_id)
+            await db.commit()
+            return
+        await save_ocr_result(db, document, extracted_text, metadata_dict, image_info)
+        document.processing_status = "classifying"
+        await db.commit()
+        
+        # Classification
+        category, confidence, vectors = await ocr_scheduler.run(
+            BULK, claimed.user_id, classify_text, extracted_text
+        )
+        
+        document = await db.get(models.Document, claimed.document_id, populate_existing=True)
+        if lost.is_set() or not await job_queue.complete_job(db, claimed.id, self.worker_id):
+            await db.rollback()
+            return
+        if document is not None:
+            await save_classification(db, document, category, confidence)
+            document.processing_status = "done"
+        await db.commit()
+        
+        if document is not None and vectors is not None:
+            await asyncio.to_thread(
+                vector_store.add, document.user_id, [document.id], vectors, ml_service.model_version
+            )
+
+
+processing_pool = DocumentProcessingPool()
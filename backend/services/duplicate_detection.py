@@ -0,0 +1,264 @@
+"""
+Détection des quasi-doublons (même document photographié, scanné, exporté en PDF)
+Le texte extrait est découpé en shingles (suites de SHINGLE_SIZE mots), résumé par une
+signature MinHash de NUM_PERM minima, puis indexé par LSH: la signature est coupée en
+BANDS bandes de ROWS valeurs et chaque bande est hachée dans un seau. Deux documents
+dont la similarité de Jaccard dépasse ~0.4 partagent au moins un seau avec une forte
+probabilité: la recherche ne lit que les documents des mêmes seaux (index
+(user_id, bucket)) au lieu de comparer tous les documents de l'utilisateur
+
+Calcul des signatures manquantes (documents traités avant la migration 0007),
+depuis le dossier backend:
+    python -m services.duplicate_detection
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import unicodedata
+import zlib
+from typing import Optional
+import numpy as np
+from sqlalchemy import select, delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, undefer
+import models
+
+
+# Paramètres MinHash / LSH (les modifier impose de recalculer toutes les signatures)
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+MINHASH_SEED = 1
+
+# Similarité minimale (Jaccard estimée) pour signaler un doublon
+DUPLICATE_THRESHOLD = float(os.getenv("DUPLICATE_THRESHOLD", "0.7"))
+
+# Similarité minimale pour réutiliser la catégorie d'un doublon lors de la classification
+DUPLICATE_REUSE_THRESHOLD = float(os.getenv("DUPLICATE_REUSE_THRESHOLD", "0.9"))
+
+# Plus grand nombre premier < 2^32: (a * x + b) tient dans 64 bits pour x < 2^32
+_PRIME = np.uint64(4294967291)
+
+_rng = np.random.default_rng(MINHASH_SEED)
+_A = _rng.integers(1, int(_PRIME), size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, int(_PRIME), size=NUM_PERM, dtype=np.uint64)
+
+# Shingles traités par bloc (limite la mémoire pour les longs textes)
+_BLOCK_SIZE = 4096
+
+
+def normalize_words(text: str) -> list:
+    """Mots du texte en minuscules, sans accents (insensible aux variations d'OCR)"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return re.findall(r"\w+", stripped)
+
+
+def shingle_hashes(text: str) -> np.ndarray:
+    """
+    Hachages 32 bits distincts des shingles du texte
+    
+    Returns:
+        Tableau uint64 (vide si le texte ne contient aucun mot)
+    """
+    words = normalize_words(text)
+    if len(words) < SHINGLE_SIZE:
+        shingles = [" ".join(words)] if words else []
+    else:
+        shingles = [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+    return np.unique(np.fromiter(
+        (zlib.crc32(shingle.encode()) for shingle in shingles), dtype=np.uint64, count=len(shingles)
+    ))
+
+
+def compute_signature(text: Optional[str]) -> Optional[tuple]:
+    """
+    Signature MinHash d'un texte (calcul vectorisé, à exécuter hors de la boucle d'événements)
+    
+    Args:
+        text: Texte extrait
+    
+    Returns:
+        Tuple (signature uint32 de NUM_PERM valeurs, nombre de shingles), None si le texte est vide
+    """
+    hashes = shingle_hashes(text or "")
+    if hashes.size == 0:
+        return None
+    
+    signature = np.full(NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+    for start in range(0, hashes.size, _BLOCK_SIZE):
+        block = hashes[start:start + _BLOCK_SIZE, None]
+        permuted = (block * _A + _B) % _PRIME
+        np.minimum(signature, permuted.min(axis=0), out=signature)
+    
+    return signature.astype(np.uint32), int(hashes.size)
+
+
+def band_buckets(signature: np.ndarray) -> list:
+    """
+    Seau LSH de chaque bande (hachage 64 bits signé incluant le numéro de bande,
+    pour qu'une recherche par seau suffise)
+    """
+    buckets = []
+    for band in range(BANDS):
+        values = signature[band * ROWS:(band + 1) * ROWS].tobytes()
+        digest = hashlib.blake2b(band.to_bytes(2, "little") + values, digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, "little", signed=True))
+    return buckets
+
+
+def similarity(signature_a: np.ndarray, signature_b: np.ndarray) -> float:
+    """Similarité de Jaccard estimée: proportion de minima identiques"""
+    return float(np.mean(signature_a == signature_b))
+
+
+def load_signature(raw: bytes) -> np.ndarray:
+    """Signature stockée en base (octets) vers tableau numpy"""
+    return np.frombuffer(raw, dtype=np.uint32)
+
+
+def signature_rows(document_id: int, user_id: int, computed: tuple) -> tuple:
+    """Lignes document_signatures et document_lsh_buckets d'un document"""
+    signature, shingle_count = computed
+    signature_row = {
+        "document_id": document_id,
+        "user_id": user_id,
+        "signature": signature.tobytes(),
+        "shingle_count": shingle_count
+    }
+    bucket_rows = [
+        {"document_id": document_id, "band": band, "user_id": user_id, "bucket": bucket}
+        for band, bucket in enumerate(band_buckets(signature))
+    ]
+    return signature_row, bucket_rows
+
+
+async def index_document(db: AsyncSession, document: models.Document, computed: Optional[tuple]):
+    """
+    Remplace la signature et les seaux LSH d'un document (dans la transaction en cours)
+    
+    Args:
+        db: Session de base de données
+        document: Document dont le texte vient d'être extrait
+        computed: Résultat de compute_signature (None: texte vide, le document est retiré de l'index)
+    """
+    await db.execute(delete(models.DocumentLSHBucket).where(
+        models.DocumentLSHBucket.document_id == document.id
+    ))
+    await db.execute(delete(models.DocumentSignature).where(
+        models.DocumentSignature.document_id == document.id
+    ))
+    if computed is None:
+        return
+    
+    signature_row, bucket_rows = signature_rows(document.id, document.user_id, computed)
+    await db.execute(insert(models.DocumentSignature.__table__), [signature_row])
+    await db.execute(insert(models.DocumentLSHBucket.__table__), bucket_rows)
+
+
+async def find_duplicates(db: AsyncSession, document_id: int, user_id: int,
+                          threshold: float = DUPLICATE_THRESHOLD, limit: int = 20) -> Optional[list]:
+    """
+    Quasi-doublons d'un document parmi les documents du même utilisateur
+    
+    Args:
+        db: Session de base de données
+        document_id: ID du document
+        user_id: Propriétaire du document
+        threshold: Similarité estimée minimale
+        limit: Nombre maximum de doublons
+    
+    Returns:
+        Liste de tuples (document_id, similarité) par similarité décroissante,
+        None si le document n'a pas de signature (OCR non effectué)
+    """
+    raw = await db.scalar(
+        select(models.DocumentSignature.signature).where(
+            models.DocumentSignature.document_id == document_id
+        )
+    )
+    if raw is None:
+        return None
+    signature = load_signature(raw)
+    
+    # Candidats: documents partageant au moins un seau
+    Bucket = models.DocumentLSHBucket
+    candidates = select(Bucket.document_id).where(
+        Bucket.user_id == user_id,
+        Bucket.bucket.in_(band_buckets(signature)),
+        Bucket.document_id != document_id
+    ).distinct()
+    
+    rows = (await db.execute(
+        select(models.DocumentSignature.document_id, models.DocumentSignature.signature).where(
+            models.DocumentSignature.document_id.in_(candidates)
+        )
+    )).all()
+    
+    scored = [
+        (candidate_id, similarity(signature, load_signature(candidate)))
+        for candidate_id, candidate in rows
+    ]
+    duplicates = [(candidate_id, score) for candidate_id, score in scored if score >= threshold]
+    duplicates.sort(key=lambda item: (-item[1], item[0]))
+    return duplicates[:limit]
+
+
+def backfill(db, batch_size: int = 500) -> int:
+    """
+    Calcule les signatures des documents qui ont un texte extrait mais pas de signature
+    (session synchrone)
+    
+    Returns:
+        Nombre de documents indexés
+    """
+    indexed = 0
+    last_id = 0
+    while True:
+        documents = db.execute(
+            select(models.Document).where(
+                models.Document.id > last_id,
+                models.Document.extracted_text.isnot(None),
+                ~models.Document.id.in_(select(models.DocumentSignature.document_id))
+            ).options(
+                load_only(models.Document.id, models.Document.user_id),
+                undefer(models.Document.extracted_text)
+            ).order_by(models.Document.id).limit(batch_size)
+        ).scalars().all()
+        if not documents:
+            return indexed
+        
+        signatures, buckets = [], []
+        for document in documents:
+            computed = compute_signature(document.extracted_text)
+            if computed is not None:
+                signature_row, bucket_rows = signature_rows(document.id, document.user_id, computed)
+                signatures.append(signature_row)
+                buckets.extend(bucket_rows)
+        
+        if signatures:
+            db.execute(insert(models.DocumentSignature.__table__), signatures)
+            db.execute(insert(models.DocumentLSHBucket.__table__), buckets)
+        db.commit()
+        
+        indexed += len(signatures)
+        last_id = documents[-1].id
+        db.expunge_all()
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+    
+    parser = argparse.ArgumentParser(description="Calcule les signatures MinHash manquantes")
+    parser.add_argument("--batch-size", type=int, default=500, help="Documents par transaction")
+    args = parser.parse_args()
+    
+    db = SessionLocal()
+    try:
+        count = backfill(db, args.batch_size)
+        print(f"✅ {count} document(s) indexé(s) pour la détection des doublons")
+    finally:
+        db.close()
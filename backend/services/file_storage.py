@@ -0,0 +1,146 @@
+"""
+Écriture des fichiers téléversés sur le disque
+Le fichier est lu par blocs, écrit de manière non bloquante (anyio) dans un fichier
+temporaire du dossier de transit, haché (SHA-256) et compté au passage, puis
+synchronisé sur le disque (fsync) et renommé atomiquement à sa destination: le
+fichier final n'est jamais partiel, même après un arrêt brutal du serveur
+"""
+
+import hashlib
+import os
+import uuid
+from contextlib import suppress
+from functools import partial
+import anyio
+from fastapi import UploadFile
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+# Taille des blocs lus dans le fichier téléversé
+CHUNK_SIZE = 1024 * 1024
+
+MEGABYTE = 1024 * 1024
+
+
+def _size_limit(variable: str, default_mb: str) -> int:
+    """Taille maximale en octets lue dans une variable d'environnement (en Mo)"""
+    return int(float(os.getenv(variable, default_mb)) * MEGABYTE)
+
+
+# Taille maximale par type de fichier (PDF, IMAGE)
+MAX_UPLOAD_SIZES = {
+    "PDF": _size_limit("MAX_UPLOAD_SIZE_PDF_MB", "50"),
+    "IMAGE": _size_limit("MAX_UPLOAD_SIZE_IMAGE_MB", "20"),
+}
+
+
+class UploadTooLarge(Exception):
+    """Le fichier téléversé dépasse la taille maximale de son type"""
+    
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        super().__init__(f"Fichier supérieur à {max_size} octets")
+
+
+def _sync_directory(directory: str):
+    """Synchronise le dossier pour rendre le renommage durable (POSIX uniquement)"""
+    if os.name != "posix":
+        return
+    descriptor = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+class StagedFile:
+    """Fichier téléversé écrit dans le dossier de transit, avec son empreinte et sa taille"""
+    
+    def __init__(self, path: str, sha256: str, size_bytes: int):
+        self.path = path
+        self.sha256 = sha256
+        self.size_bytes = size_bytes
+
+
+async def stage_upload(upload: UploadFile, directory: str, max_size: int) -> StagedFile:
+    """
+    Écrit un fichier téléversé dans un fichier temporaire sans bloquer la boucle
+    d'événements, en calculant son empreinte et sa taille au passage
+    Le fichier n'est pas encore synchronisé sur le disque: place_staged le rend
+    durable à sa destination, discard_staged le supprime
+    
+    Args:
+        upload: Fichier reçu par FastAPI
+        directory: Dossier de transit (même système de fichiers que la destination)
+        max_size: Taille maximale en octets
+    
+    Returns:
+        Fichier temporaire, SHA-256 en hexadécimal et taille en octets
+    
+    Raises:
+        UploadTooLarge: Fichier trop volumineux (le fichier temporaire est supprimé)
+    """
+    # Taille annoncée par le client: refus immédiat, sans lire le fichier
+    if upload.size is not None and upload.size > max_size:
+        raise UploadTooLarge(max_size)
+    
+    await anyio.to_thread.run_sync(partial(os.makedirs, directory, exist_ok=True))
+    temporary = os.path.join(directory, f".{uuid.uuid4().hex}.part")
+    
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        async with await anyio.open_file(temporary, "wb") as output:
+            while chunk := await upload.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLarge(max_size)
+                await output.write(chunk)
+                # hashlib libère le GIL: le hachage ne bloque pas les autres requêtes
+                await anyio.to_thread.run_sync(hasher.update, chunk)
+    except BaseException:
+        await discard_staged(temporary)
+        raise
+    
+    return StagedFile(temporary, hasher.hexdigest(), size)
+
+
+def hash_file(path: str) -> tuple:
+    """SHA-256 et taille d'un fichier (bloquant)"""
+    hasher = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as source:
+        while chunk := source.read(CHUNK_SIZE):
+            hasher.update(chunk)
+            size += len(chunk)
+    return hasher.hexdigest(), size
+
+
+def _sync_file(path: str):
+    """Écrit le contenu du fichier sur le disque (fsync)"""
+    with open(path, "r+b") as stored:
+        os.fsync(stored.fileno())
+
+
+async def place_staged(staged: StagedFile, destination: str):
+    """
+    Synchronise le fichier temporaire (fsync) puis le renomme atomiquement à sa
+    destination: le fichier final n'est jamais partiel, même après un arrêt brutal
+    """
+    directory = os.path.dirname(destination) or "."
+    try:
+        await anyio.to_thread.run_sync(_sync_file, staged.path)
+        await anyio.to_thread.run_sync(partial(os.makedirs, directory, exist_ok=True))
+        await anyio.to_thread.run_sync(os.replace, staged.path, destination)
+        await anyio.to_thread.run_sync(_sync_directory, directory)
+    except BaseException:
+        await discard_staged(staged.path)
+        raise
+
+
+async def discard_staged(path: str):
+    """Supprime un fichier temporaire (sans erreur s'il a déjà été placé ou supprimé)"""
+    with suppress(FileNotFoundError):
+        await anyio.to_thread.run_sync(os.unlink, path)
@@ -0,0 +1,307 @@
+"""
+Recherche approximative sur le nom de fichier et la catégorie des documents
+(fautes de frappe, noms partiels)
+PostgreSQL: extension pg_trgm et index GIN (migration 0008), score = meilleur de
+similarity(filename), word_similarity(q, filename) et similarity(category)
+SQLite: index de trigrammes en mémoire par utilisateur, construit à la première
+recherche puis mis à jour à partir du journal des documents modifiés (migration
+0008); mêmes trigrammes et mêmes seuils que pg_trgm
+"""
+
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+import numpy as np
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+
+
+# Seuils par défaut de pg_trgm (pg_trgm.similarity_threshold, pg_trgm.word_similarity_threshold)
+SIMILARITY_THRESHOLD = 0.3
+WORD_SIMILARITY_THRESHOLD = 0.6
+
+# Index en mémoire conservés (utilisateurs les plus récemment interrogés)
+CACHE_SIZE = 128
+
+# Documents modifiés tolérés dans le segment des modifications avant reconstruction
+# (au moins 10% des documents de l'utilisateur)
+MAX_CHANGES = 1000
+
+_WORD = re.compile(r"[^\W_]+")
+
+POSTGRES_FUZZY_SEARCH = r"""
+    SELECT id,
+           GREATEST(similarity(filename, :q), word_similarity(:q, filename),
+                    coalesce(similarity(category, :q), 0),
+                    CASE WHEN filename ILIKE :pattern THEN 1.0 ELSE 0 END) AS score
+    FROM documents
+    WHERE user_id = :user_id
+      AND (filename % :q OR :q <% filename OR category % :q OR filename ILIKE :pattern)
+    ORDER BY score DESC, id DESC
+    LIMIT :limit
+"""
+
+
+def normalize(value: Optional[str]) -> str:
+    """Minuscules, sans accents, séparateurs (_ - . etc.) remplacés par des espaces"""
+    lowered = (value or "").lower()
+    if not lowered.isascii():
+        decomposed = unicodedata.normalize("NFKD", lowered)
+        lowered = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(_WORD.findall(lowered))
+
+
+def trigrams(normalized: str) -> set:
+    """
+    Trigrammes d'une chaîne normalisée (normalize), comme pg_trgm: chaque mot est
+    entouré de "  " et " "
+    """
+    result = set()
+    for word in normalized.split():
+        padded = f"  {word} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+class TrigramIndex:
+    """
+    Index inversé trigramme -> positions des chaînes qui le contiennent (listes
+    concaténées dans un seul tableau, découpé par offsets)
+    Le nombre de trigrammes communs avec la requête est compté en une passe
+    sur les listes des trigrammes de la requête (np.bincount)
+    """
+    
+    def __init__(self, values: list):
+        """
+        Args:
+            values: Chaînes normalisées (normalize)
+        """
+        self.gram_ids = {}
+        known = {}
+        codes = []
+        self.sizes = np.zeros(len(values), dtype=np.int32)
+        for position, value in enumerate(values):
+            grams = known.get(value)
+            if grams is None:
+                grams = known[value] = [
+                    self.gram_ids.setdefault(gram, len(self.gram_ids)) for gram in trigrams(value)
+                ]
+            self.sizes[position] = len(grams)
+            codes.extend(grams)
+        
+        codes = np.array(codes, dtype=np.int32)
+        order = np.argsort(codes, kind="stable")
+        self.positions = np.repeat(np.arange(len(values), dtype=np.int32), self.sizes)[order]
+        self.offsets = np.searchsorted(codes[order], np.arange(len(self.gram_ids) + 1))
+    
+    def scores(self, query_grams: set) -> tuple:
+        """
+        Similarités de toutes les chaînes avec la requête
+        
+        Returns:
+            Tuple (similarity: Jaccard des trigrammes, word_similarity: part des trigrammes
+            de la requête présents dans la chaîne)
+        """
+        gram_ids = [self.gram_ids[gram] for gram in query_grams if gram in self.gram_ids]
+        if not gram_ids:
+            empty = np.zeros(len(self.sizes))
+            return empty, empty
+        shared = np.bincount(
+            np.concatenate([self.positions[self.offsets[i]:self.offsets[i + 1]] for i in gram_ids]),
+            minlength=len(self.sizes)
+        )
+        union = len(query_grams) + self.sizes - shared
+        similarity = np.divide(shared, union, out=np.zeros(len(self.sizes)), where=union > 0)
+        return similarity, shared / len(query_grams)
+
+
+class NameSegment:
+    """Noms de fichiers et catégories d'un ensemble de documents indexés en mémoire"""
+    
+    def __init__(self, rows: list):
+        self.rows = [(row[0], row[1], row[2]) for row in rows]
+        self.ids = np.array([row[0] for row in self.rows], dtype=np.int64)
+        # Noms normalisés, un par ligne, pour la recherche de sous-chaîne
+        names = [normalize(row[1]) for row in self.rows]
+        self.haystack = "\n".join(names)
+        self.line_starts = np.cumsum([0] + [len(name) + 1 for name in names[:-1]])
+        self.filenames = TrigramIndex(names)
+        categories = {category: normalize(category) for category in {row[2] for row in self.rows}}
+        self.categories = TrigramIndex([categories[row[2]] for row in self.rows])
+    
+    def match(self, query_grams: set, needle: str) -> tuple:
+        """
+        Documents du segment qui correspondent à la requête (mêmes score et seuils
+        que la requête PostgreSQL)
+        
+        Returns:
+            Tuple (ids, scores) des documents retenus
+        """
+        if self.ids.size == 0:
+            return self.ids, np.zeros(0)
+        filename_similarity, word_similarity = self.filenames.scores(query_grams)
+        category_similarity, _ = self.categories.scores(query_grams)
+        
+        # Noms contenant le texte recherché (après une occurrence, reprise à la ligne suivante)
+        contains = np.zeros(self.ids.size, dtype=bool)
+        found = []
+        start = self.haystack.find(needle) if needle else -1
+        while start != -1:
+            found.append(start)
+            end = self.haystack.find("\n", start)
+            start = self.haystack.find(needle, end + 1) if end != -1 else -1
+        contains[np.searchsorted(self.line_starts, found, side="right") - 1] = True
+        
+        matches = (
+            (filename_similarity >= SIMILARITY_THRESHOLD)
+            | (word_similarity >= WORD_SIMILARITY_THRESHOLD)
+            | (category_similarity >= SIMILARITY_THRESHOLD)
+            | contains
+        )
+        score = np.maximum.reduce([filename_similarity, word_similarity, category_similarity,
+                                   contains.astype(float)])
+        return self.ids[matches], score[matches]
+
+
+class UserNameIndex:
+    """
+    Index en mémoire des documents d'un utilisateur: segment de base et segment des
+    documents modifiés depuis sa construction (les versions de ces documents dans le
+    segment de base sont masquées)
+    """
+    
+    def __init__(self, base: NameSegment, last_seq: int, changes: Optional[NameSegment] = None,
+                 masked: Optional[np.ndarray] = None):
+        self.base = base
+        self.changes = changes or NameSegment([])
+        self.masked = masked if masked is not None else np.zeros(0, dtype=np.int64)
+        self.last_seq = last_seq
+    
+    def with_changes(self, changed_ids: list, rows: list, last_seq: int) -> "UserNameIndex":
+        """Nouvel index où les documents changed_ids sont remplacés par rows (supprimés si absents)"""
+        changed = set(changed_ids)
+        kept = [row for row in self.changes.rows if row[0] not in changed]
+        masked = np.union1d(self.masked, np.array(changed_ids, dtype=np.int64))
+        return UserNameIndex(self.base, last_seq, NameSegment(kept + list(rows)), masked)
+    
+    def capacity(self) -> int:
+        """Documents modifiés que le segment des modifications peut encore absorber"""
+        return max(MAX_CHANGES, self.base.ids.size // 10) - self.masked.size
+    
+    def search(self, q: str, limit: int) -> list:
+        """
+        Meilleures correspondances
+        
+        Returns:
+            Liste de tuples (document_id, score) par score décroissant
+        """
+        needle = normalize(q)
+        query_grams = trigrams(needle)
+        base_ids, base_scores = self.base.match(query_grams, needle)
+        if self.masked.size:
+            visible = ~np.isin(base_ids, self.masked)
+            base_ids, base_scores = base_ids[visible], base_scores[visible]
+        change_ids, change_scores = self.changes.match(query_grams, needle)
+        
+        ids = np.concatenate([base_ids, change_ids])
+        scores = np.concatenate([base_scores, change_scores])
+        order = np.lexsort((-ids, -scores))[:limit]
+        return [(int(ids[i]), round(float(scores[i]), 4)) for i in order]
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+async def _user_index(db: AsyncSession, user_id: int) -> UserNameIndex:
+    """
+    Index en mémoire d'un utilisateur (SQLite), mis à jour à partir du journal
+    document_name_changes (seuls les documents modifiés sont relus), reconstruit
+    quand les modifications dépassent la capacité du segment des modifications ou
+    quand le journal a été purgé au-delà de la dernière entrée prise en compte
+    """
+    min_seq, max_seq = (await db.execute(
+        # Sous-requêtes séparées: SQLite ne lit alors qu'une extrémité de la clé primaire
+        text(
+            "SELECT (SELECT min(seq) FROM document_name_changes), "
+            "(SELECT max(seq) FROM document_name_changes)"
+        )
+    )).one()
+    max_seq = max_seq or 0
+    key = (str(db.bind.url), user_id)
+    
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+    
+    if cached is not None and (min_seq is None or cached.last_seq >= min_seq - 1):
+        capacity = cached.capacity()
+        changed_ids = (await db.execute(
+            text(
+                "SELECT DISTINCT document_id FROM document_name_changes "
+                "WHERE user_id = :user_id AND seq > :after AND seq <= :until LIMIT :limit"
+            ),
+            {"user_id": user_id, "after": cached.last_seq, "until": max_seq, "limit": capacity + 1}
+        )).scalars().all()
+        if not changed_ids:
+            cached.last_seq = max(cached.last_seq, max_seq)
+            return cached
+        
+        if len(changed_ids) <= capacity:
+            rows = (await db.execute(
+                select(models.Document.id, models.Document.filename, models.Document.category).where(
+                    models.Document.user_id == user_id,
+                    models.Document.id.in_(changed_ids)
+                )
+            )).all()
+            index = cached.with_changes(changed_ids, rows, max_seq)
+            with _cache_lock:
+                _cache[key] = index
+            return index
+    
+    rows = (await db.execute(
+        select(models.Document.id, models.Document.filename, models.Document.category).where(
+            models.Document.user_id == user_id
+        )
+    )).all()
+    index = UserNameIndex(NameSegment(rows), max_seq)
+    
+    with _cache_lock:
+        _cache[key] = index
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return index
+
+
+def _like_pattern(q: str) -> str:
+    """Motif ILIKE "contient q" (caractères spéciaux de LIKE échappés)"""
+    escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+async def fuzzy_search(db: AsyncSession, user_id: int, q: str, limit: int) -> list:
+    """
+    Documents d'un utilisateur dont le nom de fichier ou la catégorie ressemble à q
+    
+    Args:
+        db: Session de base de données
+        user_id: ID de l'utilisateur
+        q: Texte recherché (nom partiel ou mal orthographié)
+        limit: Nombre maximum de résultats
+    
+    Returns:
+        Liste de tuples (document_id, score entre 0 et 1) par score décroissant
+    """
+    if db.bind.dialect.name == "postgresql":
+        rows = (await db.execute(text(POSTGRES_FUZZY_SEARCH), {
+            "user_id": user_id, "q": q, "pattern": _like_pattern(q), "limit": limit
+        })).all()
+        return [(row.id, round(float(row.score), 4)) for row in rows]
+    
+    index = await _user_index(db, user_id)
+    return index.search(q, limit)
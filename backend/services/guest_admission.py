@@ -0,0 +1,117 @@
+"""
+Contrôle d'admission de l'analyse visiteur (/api/analyze-guest, sans authentification)
+- débit par adresse IP: seau à jetons (GUEST_RATE_PER_MINUTE, rafale GUEST_BURST),
+  429 avec Retry-After au-delà
+- saturation: au plus OCR_MAX_IN_FLIGHT_GUEST OCR visiteurs simultanés (ocr_scheduler)
+  et GUEST_MAX_QUEUED en attente, 503 avec Retry-After au-delà
+- PDF visiteurs limités à GUEST_MAX_PDF_PAGES pages
+Les demandes servies et refusées (par motif) sont renvoyées par GET /api/analyze-guest/stats
+"""
+
+import os
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+# Analyses par minute et par adresse IP, et rafale autorisée
+GUEST_RATE_PER_MINUTE = float(os.getenv("GUEST_RATE_PER_MINUTE", "6"))
+GUEST_BURST = int(os.getenv("GUEST_BURST", "3"))
+
+# Analyses visiteurs en attente d'OCR au-delà desquelles les suivantes sont refusées
+GUEST_MAX_QUEUED = int(os.getenv("GUEST_MAX_QUEUED", "8"))
+
+# Délai conseillé aux visiteurs refusés pour saturation (secondes)
+GUEST_RETRY_AFTER_SECONDS = int(os.getenv("GUEST_RETRY_AFTER_SECONDS", "10"))
+
+# Pages au plus par PDF visiteur
+GUEST_MAX_PDF_PAGES = int(os.getenv("GUEST_MAX_PDF_PAGES", "5"))
+
+# Adresses IP suivies au plus (les moins récentes sont oubliées)
+GUEST_TRACKED_CLIENTS = 10000
+
+# Motifs de refus
+RATE_LIMITED = "rate_limited"
+SATURATED = "saturated"
+UNSUPPORTED_TYPE = "unsupported_type"
+TOO_LARGE = "too_large"
+TOO_MANY_PAGES = "too_many_pages"
+INVALID_DOCUMENT = "invalid_document"
+NO_TEXT = "no_text"
+FAILED = "failed"
+REJECTION_REASONS = (RATE_LIMITED, SATURATED, UNSUPPORTED_TYPE, TOO_LARGE, TOO_MANY_PAGES, INVALID_DOCUMENT,
+                     NO_TEXT, FAILED)
+
+
+class TokenBucketLimiter:
+    """Seau à jetons par clé: rate jetons par seconde, burst jetons au plus"""
+    
+    def __init__(self, rate: float, burst: int, max_keys: int = GUEST_TRACKED_CLIENTS):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        # Clé -> (jetons, instant de la dernière mise à jour), de la moins récente à la plus récente
+        self._buckets = OrderedDict()
+    
+    def acquire(self, key) -> float:
+        """
+        Prend un jeton pour la clé
+        
+        Returns:
+            0 si la demande est admise, sinon le délai en secondes avant le prochain jeton
+        """
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        
+        if tokens >= 1:
+            tokens -= 1
+            wait = 0.0
+        else:
+            wait = (1 - tokens) / self.rate if self.rate > 0 else float("inf")
+        
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class GuestAdmission:
+    """Débit par adresse IP et compteurs des analyses visiteurs"""
+    
+    def __init__(self):
+        self.limiter = TokenBucketLimiter(GUEST_RATE_PER_MINUTE / 60, GUEST_BURST)
+        self.served = 0
+        self.rejected = {reason: 0 for reason in REJECTION_REASONS}
+    
+    def admit(self, client: str) -> float:
+        """
+        Prend un jeton du seau de l'adresse IP
+        
+        Returns:
+            0 si la demande est admise, sinon le délai avant de réessayer (secondes)
+        """
+        return self.limiter.acquire(client)
+    
+    def record_served(self):
+        self.served += 1
+    
+    def record_rejected(self, reason: str):
+        self.rejected[reason] += 1
+    
+    def stats(self) -> dict:
+        """Demandes servies et refusées (par motif) depuis le démarrage du processus"""
+        return {
+            "served": self.served,
+            "rejected": sum(self.rejected.values()),
+            "rejected_by_reason": dict(self.rejected),
+            "rate_per_minute": GUEST_RATE_PER_MINUTE,
+            "burst": GUEST_BURST,
+            "max_queued": GUEST_MAX_QUEUED,
+            "max_pdf_pages": GUEST_MAX_PDF_PAGES
+        }
+
+
+guest_admission = GuestAdmission()
@@ -0,0 +1,240 @@
+"""
+File durable des tâches de traitement des documents (table processing_jobs)
+Partagée par tous les workers (API et python worker.py, sur un ou plusieurs serveurs):
+- réservation: une seule requête UPDATE ... WHERE id IN (SELECT ... FOR UPDATE SKIP
+  LOCKED) RETURNING; deux workers ne réservent jamais la même tâche et ne s'attendent
+  pas (SQLite sérialise les écritures: SKIP LOCKED inutile)
+- bail: le worker prolonge lease_expires_at tant qu'il travaille (heartbeat); une
+  tâche dont le bail expire (worker arrêté brutalement) est reprise par un autre
+- résultat: enregistré dans la transaction qui vérifie que le worker détient encore
+  le bail, pour qu'un worker en retard n'écrase pas le travail d'un autre
+- équité: une tâche reçoit le rang de son document dans la file de son utilisateur
+  (user_rank) et les tâches sont réservées par rang: le premier fichier d'un
+  utilisateur passe avant le millième d'un import massif d'un autre
+- erreur: nouvelle tentative après un délai croissant (PROCESSING_RETRY_BASE_SECONDS,
+  doublé à chaque tentative), puis "dead" après PROCESSING_MAX_ATTEMPTS tentatives
+"""
+
+import os
+import random
+import socket
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import select, update, insert, func, case, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from dotenv import load_dotenv
+import models
+
+load_dotenv()
+
+
+# Durée du bail d'une tâche (prolongé toutes les LEASE_SECONDS / 3 secondes)
+LEASE_SECONDS = float(os.getenv("PROCESSING_LEASE_SECONDS", "120"))
+
+# Tentatives avant de passer la tâche à "dead"
+MAX_ATTEMPTS = int(os.getenv("PROCESSING_MAX_ATTEMPTS", "5"))
+
+# Délai avant la première nouvelle tentative (doublé ensuite, plafonné)
+RETRY_BASE_SECONDS = float(os.getenv("PROCESSING_RETRY_BASE_SECONDS", "30"))
+RETRY_MAX_SECONDS = float(os.getenv("PROCESSING_RETRY_MAX_SECONDS", "3600"))
+
+# Statuts des tâches
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+DEAD = "dead"
+
+
+def default_worker_id() -> str:
+    """Identifiant d'un worker: machine et processus"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def utc_now() -> datetime:
+    """Heure courante en UTC (les horloges des serveurs doivent être synchronisées)"""
+    return datetime.now(timezone.utc)
+
+
+def retry_delay(attempts: int) -> float:
+    """Délai avant la tentative suivante (exponentiel, avec une part aléatoire)"""
+    delay = min(RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.75, 1.0)
+
+
+class ClaimedJob:
+    """Tâche réservée par un worker"""
+    
+    def __init__(self, id: int, document_id: int, user_id: Optional[int], attempts: int):
+        self.id = id
+        self.document_id = document_id
+        self.user_id = user_id
+        self.attempts = attempts
+
+
+async def enqueue_documents(db: AsyncSession, user_id: int, document_ids: list):
+    """
+    Crée une tâche par document d'un utilisateur, après ses tâches non terminées:
+    les rangs continuent après le plus grand rang en attente ou en cours, pour que
+    les tâches d'un utilisateur restent dans l'ordre d'arrivée (dans la transaction
+    en cours, sans commit)
+    """
+    if not document_ids:
+        return
+    job = models.ProcessingJob
+    last_rank = await db.scalar(
+        select(func.coalesce(func.max(job.user_rank), -1)).where(
+            job.user_id == user_id, job.status.in_((PENDING, RUNNING))
+        )
+    )
+    now = utc_now()
+    await db.execute(insert(job), [
+        {
+            "document_id": document_id,
+            "user_id": user_id,
+            "user_rank": last_rank + 1 + rank,
+            "status": PENDING,
+            "attempts": 0,
+            "available_at": now
+        }
+        for rank, document_id in enumerate(document_ids)
+    ])
+
+
+async def claim_jobs(db: AsyncSession, worker_id: str, limit: int = 1) -> list:
+    """
+    Réserve des tâches disponibles (en attente, ou dont le bail a expiré) et valide
+    
+    Args:
+        db: Session de base de données
+        worker_id: Identifiant du worker
+        limit: Nombre maximum de tâches
+    
+    Returns:
+        Liste de ClaimedJob (attempts inclut la tentative réservée)
+    """
+    job = models.ProcessingJob
+    now = utc_now()
+    claimable = select(job.id).where(
+        or_(
+            and_(job.status == PENDING, job.available_at <= now),
+            and_(job.status == RUNNING, job.lease_expires_at < now)
+        )
+    ).order_by(job.user_rank, job.available_at, job.id).limit(limit).with_for_update(skip_locked=True)
+    
+    rows = (await db.execute(
+        update(job).where(job.id.in_(claimable.scalar_subquery())).values(
+            status=RUNNING,
+            locked_by=worker_id,
+            lease_expires_at=now + timedelta(seconds=LEASE_SECONDS),
+            attempts=job.attempts + 1
+        ).returning(job.id, job.document_id, job.user_id, job.attempts)
+        .execution_options(synchronize_session=False)
+    )).all()
+    await db.commit()
+    return [ClaimedJob(*row) for row in rows]
+
+
+def _held(job_id: int, worker_id: str):
+    """Conditions: la tâche est en cours et le worker détient son bail"""
+    job = models.ProcessingJob
+    return and_(job.id == job_id, job.status == RUNNING, job.locked_by == worker_id)
+
+
+async def extend_lease(db: AsyncSession, job_id: int, worker_id: str) -> bool:
+    """
+    Prolonge le bail d'une tâche (heartbeat, dans sa propre transaction)
+    
+    Returns:
+        False si le worker ne détient plus le bail (tâche reprise par un autre)
+    """
+    result = await db.execute(
+        update(models.ProcessingJob).where(_held(job_id, worker_id)).values(
+            lease_expires_at=utc_now() + timedelta(seconds=LEASE_SECONDS)
+        ).execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+
+async def hold_lease(db: AsyncSession, job_id: int, worker_id: str) -> bool:
+    """
+    Vérifie et prolonge le bail dans la transaction en cours (avant d'y valider un
+    résultat): la ligne reste verrouillée jusqu'au commit
+    
+    Returns:
+        False si le worker ne détient plus le bail (annuler la transaction)
+    """
+    result = await db.execute(
+        update(models.ProcessingJob).where(_held(job_id, worker_id)).values(
+            lease_expires_at=utc_now() + timedelta(seconds=LEASE_SECONDS)
+        ).execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+async def complete_job(db: AsyncSession, job_id: int, worker_id: str) -> bool:
+    """
+    Termine une tâche (dans la transaction du résultat, sans commit)
+    
+    Returns:
+        False si le worker ne détient plus le bail (annuler la transaction)
+    """
+    result = await db.execute(
+        update(models.ProcessingJob).where(_held(job_id, worker_id)).values(
+            status=DONE, locked_by=None, lease_expires_at=None, finished_at=utc_now()
+        ).execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+async def fail_job(db: AsyncSession, claimed: ClaimedJob, worker_id: str, error: str,
+                   retry: bool = True) -> Optional[str]:
+    """
+    Replanifie une tâche après une erreur, ou la passe à "dead" (dernière tentative,
+    ou retry=False), sans commit
+    
+    Returns:
+        Nouveau statut (pending ou dead), None si le worker ne détient plus le bail
+    """
+    dead = not retry or claimed.attempts >= MAX_ATTEMPTS
+    values = {"status": DEAD, "finished_at": utc_now()} if dead else {
+        "status": PENDING,
+        "available_at": utc_now() + timedelta(seconds=retry_delay(claimed.attempts))
+    }
+    result = await db.execute(
+        update(models.ProcessingJob).where(_held(claimed.id, worker_id)).values(
+            locked_by=None, lease_expires_at=None, last_error=error, **values
+        ).execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return None
+    return values["status"]
+
+
+async def release_jobs(db: AsyncSession, worker_id: str) -> int:
+    """
+    Rend immédiatement disponibles les tâches d'un worker qui s'arrête (la tentative
+    interrompue n'est pas comptée), avec commit
+    
+    Returns:
+        Nombre de tâches rendues
+    """
+    job = models.ProcessingJob
+    result = await db.execute(
+        update(job).where(job.status == RUNNING, job.locked_by == worker_id).values(
+            status=PENDING,
+            locked_by=None,
+            lease_expires_at=None,
+            available_at=utc_now(),
+            attempts=case((job.attempts > 0, job.attempts - 1), else_=0)
+        ).execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def queue_counts(db: AsyncSession) -> dict:
+    """Nombre de tâches par statut"""
+    job = models.ProcessingJob
+    rows = (await db.execute(select(job.status, func.count()).group_by(job.status))).all()
+    return {status: count for status, count in rows}
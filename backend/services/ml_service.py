@@ -21,10 +21,12 @@ class MLService:
         """
         self.model_path = os.path.join("ml", "model.pkl")
         self.vectorizer_path = os.path.join("ml", "vectorizer.pkl")
+        self.model_info_path = os.path.join("ml", "model_info.pkl")
         
         self.model = None
         self.vectorizer = None
         self.categories = None  # Sera défini après chargement du modèle
+        self.model_version = None  # Version publiée (train_model.py ou incremental_train.py)
         
         # Charger le modèle s'il existe
         self.load_model()
@@ -39,7 +41,9 @@ class MLService:
                 self.vectorizer = joblib.load(self.vectorizer_path)
                 # Récupérer les catégories directement du modèle (ordre correct)
                 self.categories = self.model.classes_.tolist()
-                print(f"✅ Modèle ML chargé avec succès")
+                if os.path.exists(self.model_info_path):
+                    self.model_version = joblib.load(self.model_info_path).get("version")
+                print(f"✅ Modèle ML chargé avec succès (version: {self.model_version or 'inconnue'})")
                 print(f"📊 Catégories (ordre du modèle): {self.categories}")
             else:
                 print("⚠️ Modèle ML non trouvé. Veuillez exécuter train_model.py")
@@ -91,9 +95,57 @@ class MLService:
         except Exception as e:
             raise Exception(f"Erreur lors de la prédiction: {str(e)}")
     
+    def vectorize(self, texts: list):
+        """
+        Représentation TF-IDF des textes (celle utilisée par le modèle)
+        Permet de classifier et d'indexer les mêmes vecteurs (services/vector_store.py)
+        
+        Args:
+            texts: Liste de textes
+            
+        Returns:
+            Matrice creuse (une ligne par texte)
+        """
+        if self.model is None or self.vectorizer is None or self.categories is None:
+            raise Exception("Modèle ML non chargé. Veuillez entraîner le modèle d'abord.")
+        
+        return self.vectorizer.transform(texts)
+    
+    def predict_vectors(self, vectors) -> list:
+        """
+        Prédit les catégories à partir de vecteurs calculés par vectorize()
+        
+        Args:
+            vectors: Matrice creuse TF-IDF
+            
+        Returns:
+            Liste de tuples (catégorie, confiance, tous_scores)
+        """
+        try:
+            probabilities = self.model.predict_proba(vectors)
+            best_indices = np.argmax(probabilities, axis=1)
+            
+            results = []
+            for row, best_index in enumerate(best_indices):
+                all_predictions = {
+                    category: round(float(prob), 4)
+                    for category, prob in zip(self.model.classes_, probabilities[row])
+                }
+                results.append((
+                    str(self.model.classes_[best_index]),
+                    round(float(probabilities[row, best_index]), 4),
+                    all_predictions
+                ))
+            
+            return results
+            
+        except Exception as e:
+            raise Exception(f"Erreur lors de la prédiction: {str(e)}")
+    
     def predict_batch(self, texts: list) -> list:
         """
         Prédit les catégories de plusieurs documents
+        La vectorisation et la prédiction sont faites en une seule passe sur tout le lot
         
         Args:
             texts: Liste de textes à classifier
@@ -101,10 +153,20 @@ class MLService:
         Returns:
             Liste de tuples (catégorie, confiance, tous_scores)
         """
-        results = []
-        for text in texts:
-            result = self.predict(text)
-            results.append(result)
+        if self.model is None or self.vectorizer is None or self.categories is None:
+            raise Exception("Modèle ML non chargé. Veuillez entraîner le modèle d'abord.")
+        
+        # Les textes vides sont classés "Autre" comme dans predict()
+        results = [("Autre", 0.0, {}) for _ in texts]
+        indices = [i for i, text in enumerate(texts) if text and len(text.strip()) > 0]
+        
+        if not indices:
+            return results
+        
+        vectors = self.vectorize([texts[i] for i in indices])
+        for i, prediction in zip(indices, self.predict_vectors(vectors)):
+            results[i] = prediction
+        
         return results
     
     def get_feature_importance(self, category: str, top_n: int = 10) -> Dict[str, float]:
@@ -130,6 +192,9 @@ class MLService:
             coefficients = self.model.coef_[category_idx]
             
             # Obtenir les noms des features (mots)
+            # Un HashingVectorizer (modèle incrémental) n'a pas de vocabulaire
+            if not hasattr(self.vectorizer, "get_feature_names_out"):
+                return {}
             feature_names = self.vectorizer.get_feature_names_out()
             
             # Trier par importance
@@ -155,10 +220,16 @@ class MLService:
         if self.model is None:
             return {"status": "not_loaded"}
         
+        if hasattr(self.vectorizer, "get_feature_names_out"):
+            n_features = len(self.vectorizer.get_feature_names_out())
+        else:
+            n_features = self.vectorizer.n_features
+        
         return {
             "status": "loaded",
             "model_type": type(self.model).__name__,
+            "version": self.model_version,
             "categories": self.categories,
-            "n_features": len(self.vectorizer.get_feature_names_out()),
+            "n_features": n_features,
             "model_path": self.model_path
         }
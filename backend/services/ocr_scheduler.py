@@ -0,0 +1,239 @@
+"""
+Ordonnancement de l'OCR (et des calculs ML associés) entre classes de priorité
+Tout le travail CPU du traitement des documents passe par ocr_scheduler, qui dispose
+de OCR_SLOTS threads (un cœur par OCR Tesseract):
+- classes servies dans l'ordre de priorité: interactive (POST /ocr), guest
+  (/analyze-guest), bulk (auto_process, python worker.py), reclassification
+- au plus OCR_MAX_IN_FLIGHT_<CLASSE> exécutions par classe: par défaut bulk laisse un
+  thread libre, pour qu'un OCR interactif n'attende pas la fin d'un import massif
+- dans une classe, les demandeurs (utilisateur, adresse IP, tâche) sont servis à tour
+  de rôle: un utilisateur qui importe des milliers de fichiers ne bloque pas les autres
+Les files et les temps d'attente par classe sont renvoyés par GET /api/ocr/queue
+(par processus: chaque worker a son propre ordonnanceur)
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+# Classes de priorité, de la plus prioritaire à la moins prioritaire
+INTERACTIVE = "interactive"
+GUEST = "guest"
+BULK = "bulk"
+RECLASSIFICATION = "reclassification"
+PRIORITY_CLASSES = (INTERACTIVE, GUEST, BULK, RECLASSIFICATION)
+
+# Exécutions simultanées, toutes classes confondues
+OCR_SLOTS = int(os.getenv("OCR_SLOTS", str(os.cpu_count() or 2)))
+
+# Temps d'attente conservés par classe pour les statistiques
+WAIT_SAMPLES = 1000
+
+
+class SchedulerSaturated(Exception):
+    """File d'une classe pleine: la demande est refusée sans attendre"""
+
+
+def default_max_in_flight(slots: int) -> dict:
+    """Limites par défaut de chaque classe (OCR_MAX_IN_FLIGHT_<CLASSE> les remplace)"""
+    defaults = {
+        INTERACTIVE: slots,
+        GUEST: max(slots // 2, 1),
+        BULK: max(slots - 1, 1),
+        RECLASSIFICATION: max(slots // 4, 1)
+    }
+    return {
+        priority: int(os.getenv(f"OCR_MAX_IN_FLIGHT_{priority.upper()}", str(limit)))
+        for priority, limit in defaults.items()
+    }
+
+
+class _ClassState:
+    """File d'attente et statistiques d'une classe de priorité"""
+    
+    def __init__(self, max_in_flight: int):
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.queued = 0
+        self.served = 0
+        self.rejected = 0
+        # Demandeurs servis à tour de rôle: clé -> demandes en attente (ordre d'arrivée)
+        self.waiting = OrderedDict()
+        self.waits = deque(maxlen=WAIT_SAMPLES)
+    
+    def push(self, key, ticket):
+        self.waiting.setdefault(key, deque()).append(ticket)
+        self.queued += 1
+    
+    def pop(self):
+        """Première demande du demandeur suivant, qui passe en fin de tour"""
+        key, tickets = next(iter(self.waiting.items()))
+        ticket = tickets.popleft()
+        if tickets:
+            self.waiting.move_to_end(key)
+        else:
+            del self.waiting[key]
+        self.queued -= 1
+        return ticket
+    
+    def remove(self, key, ticket):
+        """Retire une demande annulée avant d'avoir été servie"""
+        tickets = self.waiting.get(key)
+        if tickets is None or ticket not in tickets:
+            return
+        tickets.remove(ticket)
+        if not tickets:
+            del self.waiting[key]
+        self.queued -= 1
+
+
+class OCRScheduler:
+    """Exécute les fonctions bloquantes du traitement par classe de priorité"""
+    
+    def __init__(self, slots: int = OCR_SLOTS, max_in_flight: Optional[dict] = None):
+        self._executor = None
+        self.configure(slots, max_in_flight)
+    
+    def configure(self, slots: int, max_in_flight: Optional[dict] = None):
+        """
+        Change le nombre de threads et les limites par classe (avant toute exécution)
+        
+        Args:
+            slots: Exécutions simultanées, toutes classes confondues
+            max_in_flight: Limites par classe (les classes absentes gardent leur défaut)
+        """
+        limits = default_max_in_flight(slots)
+        limits.update(max_in_flight or {})
+        self.slots = slots
+        self.in_flight = 0
+        self._classes = {
+            priority: _ClassState(min(max(limits[priority], 1), slots))
+            for priority in PRIORITY_CLASSES
+        }
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.slots, thread_name_prefix="ocr")
+        return self._executor
+    
+    def _dispatch(self):
+        """Attribue les threads libres aux demandes, par ordre de priorité"""
+        while self.in_flight < self.slots:
+            for priority in PRIORITY_CLASSES:
+                state = self._classes[priority]
+                if state.waiting and state.in_flight < state.max_in_flight:
+                    ticket = state.pop()
+                    if ticket.done():
+                        # Demande annulée entre-temps
+                        break
+                    state.in_flight += 1
+                    self.in_flight += 1
+                    ticket.set_result(None)
+                    break
+            else:
+                return
+    
+    def _release(self, priority: str):
+        state = self._classes[priority]
+        state.in_flight -= 1
+        self.in_flight -= 1
+        self._dispatch()
+    
+    def saturated(self, priority: str, max_queued: int) -> bool:
+        """Indique si une nouvelle demande de la classe attendrait derrière max_queued autres"""
+        state = self._classes[priority]
+        return state.in_flight >= state.max_in_flight and state.queued >= max_queued
+    
+    async def run(self, priority: str, key, function, *args, max_queued: Optional[int] = None):
+        """
+        Exécute une fonction bloquante dans un thread, à son tour
+        
+        Args:
+            priority: Classe de priorité (PRIORITY_CLASSES)
+            key: Demandeur, pour le partage équitable dans la classe (ID utilisateur, adresse IP...)
+            function: Fonction bloquante
+            *args: Arguments de la fonction
+            max_queued: Demandes en attente au-delà desquelles la classe refuse
+        
+        Returns:
+            Résultat de la fonction
+        
+        Raises:
+            SchedulerSaturated: max_queued demandes attendent déjà dans la classe
+        """
+        state = self._classes[priority]
+        loop = asyncio.get_running_loop()
+        ticket = loop.create_future()
+        queued_at = time.perf_counter()
+        
+        state.push(key, ticket)
+        self._dispatch()
+        if max_queued is not None and not ticket.done() and state.queued > max_queued:
+            state.remove(key, ticket)
+            state.rejected += 1
+            raise SchedulerSaturated(priority)
+        try:
+            await ticket
+        except asyncio.CancelledError:
+            if ticket.done() and not ticket.cancelled():
+                # Thread attribué juste avant l'annulation
+                self._release(priority)
+            else:
+                state.remove(key, ticket)
+            raise
+        
+        state.waits.append(time.perf_counter() - queued_at)
+        state.served += 1
+        
+        try:
+            future = self._get_executor().submit(function, *args)
+        except Exception:
+            self._release(priority)
+            raise
+        
+        def release(_):
+            # Le thread est rendu à la fin de la fonction, même si l'appelant a abandonné
+            try:
+                loop.call_soon_threadsafe(self._release, priority)
+            except RuntimeError:
+                # Boucle d'événements fermée (arrêt du processus)
+                pass
+        
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+    
+    def stats(self) -> dict:
+        """
+        Files et temps d'attente par classe (millisecondes, sur les WAIT_SAMPLES
+        dernières exécutions)
+        """
+        classes = []
+        for priority in PRIORITY_CLASSES:
+            state = self._classes[priority]
+            waits = sorted(state.waits)
+            classes.append({
+                "priority": priority,
+                "queued": state.queued,
+                "waiting_clients": len(state.waiting),
+                "in_flight": state.in_flight,
+                "max_in_flight": state.max_in_flight,
+                "served": state.served,
+                "rejected": state.rejected,
+                "wait_avg_ms": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+                "wait_p95_ms": round(waits[int(0.95 * (len(waits) - 1))] * 1000, 1) if waits else 0.0,
+                "wait_max_ms": round(waits[-1] * 1000, 1) if waits else 0.0
+            })
+        return {"slots": self.slots, "in_flight": self.in_flight, "classes": classes}
+
+
+ocr_scheduler = OCRScheduler()
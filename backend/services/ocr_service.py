@@ -4,16 +4,23 @@ Utilise Tesseract pour extraire le texte des images et PDF
 """
 
 import pytesseract
-from PIL import Image
+from PIL import Image, UnidentifiedImageError
+import io
 import os
+import re
+import subprocess
 from pdf2image import convert_from_path
-import tempfile
-from typing import Tuple, Dict
+from pdf2image.parsers import parse_buffer_to_ppm
+from typing import BinaryIO, Tuple, Dict
 import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
+class InvalidDocument(Exception):
+    """Document illisible (PDF ou image invalide ou corrompu): erreur du client"""
+
+
 class OCRService:
     """
     Service d'extraction de texte à partir d'images et de PDF
@@ -115,25 +122,16 @@ class OCRService:
             total_chars = 0
             total_lines = 0
             
-            # Extraire le texte de chaque page
+            # Extraire le texte de chaque page (image en mémoire)
             for i, image in enumerate(images):
-                # Sauvegarder temporairement l'image
-                with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp_file:
-                    temp_path = temp_file.name
-                    image.save(temp_path, 'PNG')
-                
-                # Extraire le texte de cette page
                 page_text = pytesseract.image_to_string(
-                    Image.open(temp_path),
+                    image,
                     lang=lang,
                     config='--psm 3'
                 )
                 
                 all_text.append(f"--- Page {i+1} ---\n{page_text}")
                 
-                # Nettoyer le fichier temporaire
-                os.unlink(temp_path)
-                
                 # Compter les mots/chars/lignes
                 total_words += len(page_text.split())
                 total_chars += len(page_text)
@@ -154,6 +152,147 @@ class OCRService:
             }
             
             return full_text, metadata
+        
+        except Exception as e:
+            raise Exception(f"Erreur lors de l'extraction OCR du PDF: {str(e)}")
+    
+    def _image_to_string_in_memory(self, image: Image.Image, lang: str) -> str:
+        """
+        OCR d'une image par l'entrée et la sortie standard de Tesseract
+        (pytesseract passe par des fichiers temporaires)
+        """
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        
+        result = subprocess.run(
+            [pytesseract.pytesseract.tesseract_cmd, "stdin", "stdout", "-l", lang, "--psm", "3"],
+            input=buffer.getvalue(),
+            capture_output=True
+        )
+        if result.returncode != 0:
+            raise Exception(result.stderr.decode("utf-8", errors="replace").strip())
+        return result.stdout.decode("utf-8", errors="replace")
+    
+    def extract_text_from_image_file(self, image_file: BinaryIO, lang: str = None) -> Tuple[str, Dict]:
+        """
+        Extrait le texte d'une image lue depuis un fichier ouvert ou un tampon en
+        mémoire, sans écrire sur le disque
+        
+        Args:
+            image_file: Contenu de l'image (BytesIO, SpooledTemporaryFile...)
+            lang: Code langue
+        
+        Returns:
+            Tuple (texte extrait, métadonnées)
+        """
+        start_time = time.time()
+        
+        if lang is None:
+            lang = self.default_language
+        
+        image_file.seek(0)
+        try:
+            image = Image.open(image_file)
+        except UnidentifiedImageError:
+            raise InvalidDocument("Image illisible ou corrompue")
+        
+        try:
+            text = self._image_to_string_in_memory(image, lang).strip()
+            
+            processing_time = time.time() - start_time
+            
+            metadata = {
+                "word_count": len(text.split()),
+                "char_count": len(text),
+                "line_count": len(text.split('\n')),
+                "language": lang,
+                "processing_time": round(processing_time, 2)
+            }
+            
+            return text, metadata
+        
+        except Exception as e:
+            raise Exception(f"Erreur lors de l'extraction OCR: {str(e)}")
+    
+    def count_pdf_pages_from_file(self, pdf_file: BinaryIO) -> int:
+        """
+        Nombre de pages d'un PDF, transmis à pdfinfo par l'entrée standard
+        
+        Args:
+            pdf_file: Contenu du PDF (BytesIO, SpooledTemporaryFile...)
+        
+        Returns:
+            Nombre de pages
+        
+        Raises:
+            InvalidDocument: pdfinfo ne reconnaît pas un PDF valide
+        """
+        pdf_file.seek(0)
+        result = subprocess.run(["pdfinfo", "-"], input=pdf_file.read(), capture_output=True)
+        pages = re.search(rb"^Pages:\s+(\d+)", result.stdout, re.MULTILINE)
+        if result.returncode != 0 or pages is None:
+            raise InvalidDocument(
+                f"Impossible de lire le PDF: {result.stderr.decode('utf-8', errors='replace').strip()}"
+            )
+        return int(pages.group(1))
+    
+    def extract_text_from_pdf_file(self, pdf_file: BinaryIO, lang: str = None,
+                                   max_pages: int = None) -> Tuple[str, Dict]:
+        """
+        Extrait le texte d'un PDF lu depuis un fichier ouvert ou un tampon en mémoire:
+        pdftoppm reçoit le PDF par l'entrée standard et renvoie les pages par la sortie
+        standard, sans fichier temporaire
+        
+        Args:
+            pdf_file: Contenu du PDF (BytesIO, SpooledTemporaryFile...)
+            lang: Code langue
+            max_pages: Pages converties au plus (les premières)
+        
+        Returns:
+            Tuple (texte extrait, métadonnées)
+        """
+        start_time = time.time()
+        
+        if lang is None:
+            lang = self.default_language
+        
+        try:
+            command = ["pdftoppm", "-r", "300"]
+            if max_pages is not None:
+                command += ["-l", str(max_pages)]
+            
+            pdf_file.seek(0)
+            result = subprocess.run(command + ["-"], input=pdf_file.read(), capture_output=True)
+            if result.returncode != 0:
+                raise Exception(result.stderr.decode("utf-8", errors="replace").strip())
+            images = parse_buffer_to_ppm(result.stdout)
+            
+            all_text = []
+            total_words = 0
+            total_chars = 0
+            total_lines = 0
+            
+            for i, image in enumerate(images):
+                page_text = self._image_to_string_in_memory(image, lang)
+                all_text.append(f"--- Page {i+1} ---\n{page_text}")
+                total_words += len(page_text.split())
+                total_chars += len(page_text)
+                total_lines += len(page_text.split('\n'))
+            
+            full_text = "\n\n".join(all_text).strip()
+            
+            processing_time = time.time() - start_time
+            
+            metadata = {
+                "word_count": total_words,
+                "char_count": total_chars,
+                "line_count": total_lines,
+                "language": lang,
+                "page_count": len(images),
+                "processing_time": round(processing_time, 2)
+            }
+            
+            return full_text, metadata
             
         except Exception as e:
             raise Exception(f"Erreur lors de l'extraction OCR du PDF: {str(e)}")
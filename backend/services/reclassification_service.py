@@ -0,0 +1,286 @@
+"""
+Service de reclassification en arrière-plan
+Parcourt toute la table documents par lots d'ids croissants après un ré-entraînement,
+reclassifie chaque lot en une passe et met à jour en masse les lignes qui changent
+"""
+
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import select, update, func
+from database import AsyncSessionLocal
+from services.ml_service import MLService
+from services.stats_rollup import StatsDelta
+from services.vector_store import vector_store
+from services.ocr_scheduler import ocr_scheduler, RECLASSIFICATION
+import models
+
+
+# Statuts d'une tâche qui peut être reprise
+RESUMABLE_STATUSES = ("pending", "running", "failed")
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """SQLite renvoie des dates naïves: on les considère en UTC"""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def predict_chunk(ml_service: MLService, rows: list) -> tuple:
+    """
+    Classifie un lot de documents (bloquant, exécuté dans un thread)
+    
+    Returns:
+        Tuple (prédictions dans l'ordre des lignes, lignes vectorisées, vecteurs TF-IDF)
+    """
+    # Les textes vides sont classés "Autre" comme dans predict()
+    vectorized = [row for row in rows if row.extracted_text.strip()]
+    vectors = ml_service.vectorize([row.extracted_text for row in vectorized]) if vectorized else None
+    predicted = dict(zip(
+        (row.id for row in vectorized),
+        ml_service.predict_vectors(vectors) if vectorized else []
+    ))
+    predictions = [predicted.get(row.id, ("Autre", 0.0, {})) for row in rows]
+    return predictions, vectorized, vectors
+
+
+def index_chunk(ml_service: MLService, rows: list, vectors):
+    """Enregistre les vecteurs d'un lot dans l'index des documents similaires (par utilisateur)"""
+    positions_by_user = {}
+    for position, row in enumerate(rows):
+        positions_by_user.setdefault(row.user_id, []).append(position)
+    for user_id, positions in positions_by_user.items():
+        vector_store.add(user_id, [rows[p].id for p in positions], vectors[positions], ml_service.model_version)
+
+
+def job_progress(job: models.ReclassificationJob) -> dict:
+    """
+    Calcule l'avancement, le débit et le temps restant estimé d'une tâche
+    
+    Args:
+        job: Tâche de reclassification
+    
+    Returns:
+        Dictionnaire (progress_percent, throughput_docs_per_s, eta_seconds)
+    """
+    progress_percent = 100.0
+    if job.total_documents:
+        progress_percent = round(min(job.processed_documents / job.total_documents, 1.0) * 100, 2)
+    
+    throughput = None
+    eta_seconds = None
+    run_started_at = _as_utc(job.run_started_at)
+    
+    if job.status == "running" and run_started_at:
+        elapsed = (datetime.now(timezone.utc) - run_started_at).total_seconds()
+        processed_this_run = job.processed_documents - job.run_start_processed
+        if elapsed > 0 and processed_this_run > 0:
+            throughput = round(processed_this_run / elapsed, 2)
+            remaining = max(job.total_documents - job.processed_documents, 0)
+            eta_seconds = round(remaining / throughput, 1)
+    
+    return {
+        "progress_percent": progress_percent,
+        "throughput_docs_per_s": throughput,
+        "eta_seconds": eta_seconds
+    }
+
+
+class ReclassificationService:
+    """
+    Gère l'exécution d'une tâche de reclassification dans une tâche asyncio dédiée
+    Une seule tâche s'exécute à la fois; sa progression est enregistrée en base
+    dans la même transaction que les mises à jour de chaque lot
+    """
+    
+    def __init__(self):
+        self._task = None
+        self._stop_event = asyncio.Event()
+        self._lock = asyncio.Lock()
+    
+    def is_running(self) -> bool:
+        """Indique si une tâche s'exécute dans ce processus"""
+        return self._task is not None and not self._task.done()
+    
+    async def start(self, chunk_size: int = 500, restart: bool = False) -> int:
+        """
+        Lance une nouvelle tâche ou reprend la dernière tâche interrompue
+        
+        Args:
+            chunk_size: Nombre de documents par lot (nouvelle tâche uniquement)
+            restart: Abandonner la tâche interrompue et repartir de zéro
+        
+        Returns:
+            ID de la tâche en cours d'exécution
+        """
+        async with self._lock:
+            async with AsyncSessionLocal() as db:
+                if self.is_running():
+                    running_job = await self._latest_job(db)
+                    return running_job.id
+                
+                # Charger la dernière version publiée du modèle (lecture disque hors boucle)
+                ml_service = await asyncio.to_thread(MLService)
+                if ml_service.model is None:
+                    raise Exception("Modèle ML non chargé. Veuillez entraîner le modèle d'abord.")
+                
+                job = await self._latest_job(db)
+                resumable = (
+                    job is not None
+                    and job.status in RESUMABLE_STATUSES
+                    and not restart
+                    and job.model_version == ml_service.model_version
+                )
+                
+                if job is not None and job.status in RESUMABLE_STATUSES and not resumable:
+                    # Tâche interrompue obsolète (autre modèle ou redémarrage demandé)
+                    job.status = "superseded"
+                    job.finished_at = datetime.now(timezone.utc)
+                
+                if not resumable:
+                    job = await self._create_job(db, chunk_size, ml_service.model_version)
+                
+                job.status = "running"
+                job.error = None
+                job.run_started_at = datetime.now(timezone.utc)
+                job.run_start_processed = job.processed_documents
+                await db.commit()
+                job_id = job.id
+            
+            self._stop_event.clear()
+            self._task = asyncio.create_task(
+                self._run(job_id, ml_service),
+                name=f"reclassification-{job_id}"
+            )
+            return job_id
+    
+    async def resume_interrupted(self) -> Optional[int]:
+        """
+        Reprend au démarrage une tâche restée "running" (arrêt brutal du serveur)
+        
+        Returns:
+            ID de la tâche reprise, ou None
+        """
+        async with AsyncSessionLocal() as db:
+            job = await self._latest_job(db)
+            if job is None or job.status != "running":
+                return None
+        
+        try:
+            return await self.start()
+        except Exception as e:
+            print(f"⚠️ Reprise de la reclassification impossible: {e}")
+            return None
+    
+    async def stop(self):
+        """Demande l'arrêt de la tâche après le lot en cours"""
+        self._stop_event.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, timeout=30)
+            except asyncio.TimeoutError:
+                pass
+    
+    @staticmethod
+    async def _latest_job(db) -> Optional[models.ReclassificationJob]:
+        return await db.scalar(
+            select(models.ReclassificationJob).order_by(
+                models.ReclassificationJob.id.desc()
+            ).limit(1)
+        )
+    
+    @staticmethod
+    async def _create_job(db, chunk_size: int, model_version: Optional[str]) -> models.ReclassificationJob:
+        """Crée une tâche bornée aux documents existants au démarrage"""
+        max_document_id, total_documents = (await db.execute(
+            select(
+                func.coalesce(func.max(models.Document.id), 0),
+                func.count(models.Document.id)
+            ).where(models.Document.extracted_text.isnot(None))
+        )).one()
+        
+        job = models.ReclassificationJob(
+            status="pending",
+            model_version=model_version,
+            chunk_size=chunk_size,
+            last_document_id=0,
+            max_document_id=max_document_id,
+            total_documents=total_documents,
+            processed_documents=0,
+            updated_documents=0,
+            run_start_processed=0
+        )
+        db.add(job)
+        await db.flush()
+        return job
+    
+    async def _run(self, job_id: int, ml_service: MLService):
+        """Boucle principale: un lot = une transaction (mises à jour + progression)"""
+        async with AsyncSessionLocal() as db:
+            try:
+                job = await db.get(models.ReclassificationJob, job_id)
+                print(f"🔄 Reclassification #{job_id} démarrée après le document #{job.last_document_id}")
+                
+                while not self._stop_event.is_set():
+                    rows = (await db.execute(
+                        select(
+                            models.Document.id,
+                            models.Document.user_id,
+                            models.Document.extracted_text,
+                            models.Document.category,
+                            models.Document.confidence
+                        ).where(
+                            models.Document.id > job.last_document_id,
+                            models.Document.id <= job.max_document_id,
+                            models.Document.extracted_text.isnot(None)
+                        ).order_by(models.Document.id).limit(job.chunk_size)
+                    )).all()
+                    
+                    if not rows:
+                        job.status = "completed"
+                        job.finished_at = datetime.now(timezone.utc)
+                        await db.commit()
+                        # Tous les documents sont indexés avec le nouveau modèle
+                        await asyncio.to_thread(vector_store.drop_other_versions, ml_service.model_version)
+                        print(f"✅ Reclassification #{job_id} terminée: "
+                              f"{job.updated_documents}/{job.processed_documents} documents modifiés")
+                        break
+                    
+                    # Le calcul (CPU) s'exécute hors de la boucle d'événements, après l'OCR
+                    predictions, vectorized, vectors = await ocr_scheduler.run(
+                        RECLASSIFICATION, job_id, predict_chunk, ml_service, rows
+                    )
+                    
+                    # Ne réécrire que les lignes dont le résultat change
+                    changes = []
+                    delta = StatsDelta()
+                    for row, (category, confidence, _) in zip(rows, predictions):
+                        if row.category != category or row.confidence != confidence:
+                            changes.append({"id": row.id, "category": category, "confidence": confidence})
+                            delta.add(row.user_id, -1, category=row.category, confidence=row.confidence)
+                            delta.add(row.user_id, +1, category=category, confidence=confidence)
+                    if changes:
+                        await db.execute(update(models.Document), changes)
+                        await delta.apply(db)
+                    
+                    job.last_document_id = rows[-1].id
+                    job.processed_documents += len(rows)
+                    job.updated_documents += len(changes)
+                    await db.commit()
+                    
+                    if vectorized:
+                        await asyncio.to_thread(index_chunk, ml_service, vectorized, vectors)
+            
+            except Exception as e:
+                await db.rollback()
+                job = await db.get(models.ReclassificationJob, job_id)
+                if job is not None:
+                    job.status = "failed"
+                    job.error = str(e)
+                    await db.commit()
+                print(f"❌ Reclassification #{job_id} échouée: {e}")
+
+
+# Instance partagée par l'API
+reclassification_service = ReclassificationService()
@@ -0,0 +1,148 @@
+"""
+Recherche plein texte dans le texte extrait des documents
+PostgreSQL: colonne tsvector (configuration french) indexée en GIN, classement ts_rank_cd
+et extraits ts_headline. SQLite: table FTS5 documents_fts, classement bm25 et extraits
+snippet() (voir la migration 0006)
+Les résultats sont triés par pertinence décroissante puis par id décroissant, ce qui
+permet une pagination par curseur sur (rank, id)
+"""
+
+import re
+from typing import Optional
+from sqlalchemy import text, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+# Configuration linguistique PostgreSQL (racinisation et mots vides français)
+SEARCH_CONFIG = "french"
+
+# Marqueurs des termes trouvés dans les extraits
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+
+# Nombre de mots par extrait
+SNIPPET_WORDS = 24
+
+POSTGRES_HEADLINE_OPTIONS = (
+    f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, "
+    f"MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 3}, "
+    'MaxFragments=2, FragmentDelimiter=" … "'
+)
+
+# Le rang est recalculé dans la condition du curseur (un alias n'y est pas visible)
+POSTGRES_SEARCH = """
+    SELECT d.id, ts_rank_cd(d.search_vector, query) AS rank
+    FROM documents AS d, websearch_to_tsquery(CAST(:config AS regconfig), :q) AS query
+    WHERE d.user_id = :user_id AND d.search_vector @@ query
+    {keyset}
+    ORDER BY rank DESC, d.id DESC
+    LIMIT :limit
+"""
+POSTGRES_KEYSET = "AND (ts_rank_cd(d.search_vector, query), d.id) < (:rank, :id)"
+
+POSTGRES_SNIPPETS = """
+    SELECT id, ts_headline(CAST(:config AS regconfig), coalesce(extracted_text, ''),
+                           websearch_to_tsquery(CAST(:config AS regconfig), :q), :options)
+    FROM documents
+    WHERE id IN :ids
+"""
+
+# bm25() est négatif (plus petit = plus pertinent): le rang exposé est son opposé.
+# Poids nul pour la colonne user_id, qui ne sert qu'au filtrage
+SQLITE_RANK = "-bm25(documents_fts, 1.0, 0.0)"
+
+SQLITE_SEARCH = f"""
+    SELECT documents_fts.rowid AS id, {SQLITE_RANK} AS rank
+    FROM documents_fts
+    WHERE documents_fts MATCH :match
+    {{keyset}}
+    ORDER BY rank DESC, id DESC
+    LIMIT :limit
+"""
+SQLITE_KEYSET = f"AND ({SQLITE_RANK}, documents_fts.rowid) < (:rank, :id)"
+
+SQLITE_SNIPPETS = f"""
+    SELECT rowid, snippet(documents_fts, 0, '{HIGHLIGHT_START}', '{HIGHLIGHT_STOP}', ' … ', {SNIPPET_WORDS})
+    FROM documents_fts
+    WHERE documents_fts MATCH :match AND rowid IN :ids
+"""
+
+
+def fts5_query(q: str, user_id: int) -> Optional[str]:
+    """
+    Traduit la saisie de l'utilisateur en requête FTS5 (tous les mots doivent être présents)
+    Chaque mot est mis entre guillemets: la syntaxe FTS5 (NEAR, *, :) n'est pas exposée
+    
+    Args:
+        q: Texte recherché
+        user_id: Propriétaire des documents (filtre sur la colonne user_id de l'index)
+    
+    Returns:
+        Requête MATCH, ou None si la saisie ne contient aucun mot
+    """
+    words = re.findall(r"\w+", q)
+    if not words:
+        return None
+    terms = " ".join(f'"{word}"' for word in words)
+    return f'user_id:"{user_id}" AND ({terms})'
+
+
+async def search_documents(db: AsyncSession, user_id: int, q: str, limit: int,
+                           after: Optional[dict] = None) -> list:
+    """
+    Recherche les documents d'un utilisateur contenant les termes demandés
+    
+    Args:
+        db: Session de base de données
+        user_id: ID de l'utilisateur
+        q: Texte recherché (syntaxe websearch sous PostgreSQL: "expression", OR, -exclu)
+        limit: Nombre maximum de résultats
+        after: Valeurs {"rank", "id"} du dernier résultat de la page précédente
+    
+    Returns:
+        Liste de tuples (id, rank) triée par pertinence décroissante
+    """
+    params = {"user_id": user_id, "limit": limit}
+    if after is not None:
+        params.update(rank=after["rank"], id=after["id"])
+    
+    if db.bind.dialect.name == "postgresql":
+        sql = POSTGRES_SEARCH.format(keyset=POSTGRES_KEYSET if after is not None else "")
+        params.update(config=SEARCH_CONFIG, q=q)
+    else:
+        match = fts5_query(q, user_id)
+        if match is None:
+            return []
+        sql = SQLITE_SEARCH.format(keyset=SQLITE_KEYSET if after is not None else "")
+        params.update(match=match)
+    
+    rows = (await db.execute(text(sql), params)).all()
+    return [(row.id, float(row.rank)) for row in rows]
+
+
+async def highlight_snippets(db: AsyncSession, user_id: int, q: str, document_ids: list) -> dict:
+    """
+    Extraits surlignés pour une page de résultats (calculés seulement pour ces documents)
+    
+    Args:
+        db: Session de base de données
+        user_id: ID de l'utilisateur
+        q: Texte recherché
+        document_ids: IDs des documents de la page
+    
+    Returns:
+        Dictionnaire {document_id: extrait}
+    """
+    if not document_ids:
+        return {}
+    
+    if db.bind.dialect.name == "postgresql":
+        sql = text(POSTGRES_SNIPPETS).bindparams(bindparam("ids", expanding=True))
+        params = {"config": SEARCH_CONFIG, "q": q, "options": POSTGRES_HEADLINE_OPTIONS,
+                  "ids": document_ids}
+    else:
+        sql = text(SQLITE_SNIPPETS).bindparams(bindparam("ids", expanding=True))
+        params = {"match": fts5_query(q, user_id), "ids": document_ids}
+    
+    rows = (await db.execute(sql, params)).all()
+    return {document_id: snippet for document_id, snippet in rows}
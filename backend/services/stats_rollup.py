@@ -0,0 +1,362 @@
+"""
+Statistiques par utilisateur maintenues de manière incrémentale
+Chaque modification de document (téléversement, OCR, classification, suppression,
+reclassification) applique un delta aux tables user_stats et user_daily_counts dans
+la même transaction; les routes /stats lisent ces quelques lignes au lieu de
+parcourir tous les documents de l'utilisateur
+
+Reconstruction complète (écarts éventuels), depuis le dossier backend:
+    python -m services.stats_rollup
+    python -m services.stats_rollup --user-id 42
+"""
+
+import argparse
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import select, delete, insert, func, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import dialect_insert
+import models
+import schemas
+
+
+# Dimensions de la table user_stats
+TOTAL = "total"
+CATEGORY = "category"
+FILE_TYPE = "file_type"
+
+# Colonnes incrémentées par les deltas
+STAT_COLUMNS = ("document_count", "confidence_sum", "confidence_count", "word_count")
+
+
+def utc_today() -> date:
+    """Jour courant en UTC (les compteurs journaliers sont en UTC)"""
+    return datetime.now(timezone.utc).date()
+
+
+def utc_day(value: Optional[datetime]) -> date:
+    """Jour UTC d'une date de création (SQLite renvoie des dates naïves en UTC)"""
+    if value is None:
+        return utc_today()
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+
+def _upsert(dialect_name: str, table, key_columns, increment_columns):
+    """
+    Construit un INSERT ... ON CONFLICT DO UPDATE qui ajoute les valeurs aux compteurs existants
+    """
+    stmt = dialect_insert(dialect_name)(table)
+    return stmt.on_conflict_do_update(
+        index_elements=list(key_columns),
+        set_={column: table.c[column] + stmt.excluded[column] for column in increment_columns}
+    )
+
+
+class StatsDelta:
+    """
+    Accumule les variations de statistiques causées par des modifications de documents
+    Une modification s'écrit comme le retrait de l'ancien état (sign=-1) suivi de
+    l'ajout du nouvel état (sign=+1); les contributions identiques s'annulent
+    """
+    
+    def __init__(self):
+        self.stats = defaultdict(lambda: [0, 0.0, 0, 0])
+        self.daily = defaultdict(int)
+    
+    def add(self, user_id: int, sign: int, category: Optional[str] = None,
+            file_type: Optional[str] = None, confidence: Optional[float] = None,
+            word_count: Optional[int] = None, day: Optional[date] = None):
+        """
+        Ajoute (sign=+1) ou retire (sign=-1) la contribution d'un état de document
+        
+        Args:
+            user_id: Propriétaire du document
+            sign: +1 ou -1
+            category: Catégorie (None si non classé)
+            file_type: Type de fichier
+            confidence: Score de confiance (None si non classé)
+            word_count: Nombre de mots extraits
+            day: Jour de création (uniquement à la création et à la suppression)
+        """
+        has_confidence = confidence is not None
+        confidence = confidence or 0.0
+        
+        total = self.stats[(user_id, TOTAL, "")]
+        total[0] += sign
+        total[1] += sign * confidence
+        total[2] += sign * has_confidence
+        total[3] += sign * (word_count or 0)
+        
+        if category is not None:
+            by_category = self.stats[(user_id, CATEGORY, category)]
+            by_category[0] += sign
+            by_category[1] += sign * confidence
+            by_category[2] += sign * has_confidence
+        
+        self.stats[(user_id, FILE_TYPE, file_type or "")][0] += sign
+        
+        if day is not None:
+            self.daily[(user_id, day)] += sign
+    
+    def add_document(self, document: models.Document, sign: int,
+                     word_count: Optional[int] = None, day: Optional[date] = None):
+        """Ajoute ou retire la contribution de l'état courant d'un document"""
+        self.add(
+            document.user_id, sign,
+            category=document.category,
+            file_type=document.file_type,
+            confidence=document.confidence,
+            word_count=word_count,
+            day=day
+        )
+    
+    def rows(self):
+        """Lignes non nulles à appliquer (user_stats, user_daily_counts)"""
+        stats_rows = [
+            {
+                "user_id": user_id, "dimension": dimension, "bucket": bucket,
+                **dict(zip(STAT_COLUMNS, values))
+            }
+            for (user_id, dimension, bucket), values in self.stats.items()
+            if any(values)
+        ]
+        daily_rows = [
+            {"user_id": user_id, "day": day, "document_count": count}
+            for (user_id, day), count in self.daily.items()
+            if count
+        ]
+        return stats_rows, daily_rows
+    
+    async def apply(self, db: AsyncSession):
+        """
+        Applique les deltas dans la transaction en cours (sans commit)
+        
+        Args:
+            db: Session de base de données
+        """
+        stats_rows, daily_rows = self.rows()
+        dialect_name = db.bind.dialect.name
+        
+        if stats_rows:
+            await db.execute(
+                _upsert(dialect_name, models.UserStat.__table__,
+                        ("user_id", "dimension", "bucket"), STAT_COLUMNS),
+                stats_rows
+            )
+        if daily_rows:
+            await db.execute(
+                _upsert(dialect_name, models.UserDailyCount.__table__,
+                        ("user_id", "day"), ("document_count",)),
+                daily_rows
+            )
+
+
+async def read_statistics(db: AsyncSession, user_id: int) -> schemas.StatsResponse:
+    """
+    Statistiques d'un utilisateur lues depuis les tables agrégées
+    (quelques lignes, quel que soit le nombre de documents)
+    
+    Args:
+        db: Session de base de données
+        user_id: ID de l'utilisateur
+    
+    Returns:
+        Statistiques complètes
+    """
+    stats = (await db.execute(
+        select(models.UserStat).where(models.UserStat.user_id == user_id)
+    )).scalars().all()
+    
+    recent_documents = await db.scalar(
+        select(func.coalesce(func.sum(models.UserDailyCount.document_count), 0)).where(
+            models.UserDailyCount.user_id == user_id,
+            models.UserDailyCount.day > utc_today() - timedelta(days=7)
+        )
+    )
+    
+    total = next((row for row in stats if row.dimension == TOTAL), None)
+    avg_confidence = (
+        total.confidence_sum / total.confidence_count
+        if total is not None and total.confidence_count else 0.0
+    )
+    
+    return schemas.StatsResponse(
+        total_documents=total.document_count if total is not None else 0,
+        documents_by_category={
+            row.bucket: row.document_count
+            for row in stats if row.dimension == CATEGORY and row.document_count
+        },
+        average_confidence=round(avg_confidence, 4),
+        total_words_extracted=total.word_count if total is not None else 0,
+        documents_by_type={
+            row.bucket or None: row.document_count
+            for row in stats if row.dimension == FILE_TYPE and row.document_count
+        },
+        recent_documents=recent_documents
+    )
+
+
+async def read_category_stats(db: AsyncSession, user_id: int) -> dict:
+    """
+    Statistiques par catégorie lues depuis user_stats
+    
+    Args:
+        db: Session de base de données
+        user_id: ID de l'utilisateur
+    
+    Returns:
+        Nombre de documents classés et statistiques par catégorie
+    """
+    rows = (await db.execute(
+        select(models.UserStat).where(
+            models.UserStat.user_id == user_id,
+            models.UserStat.dimension == CATEGORY,
+            models.UserStat.document_count > 0
+        )
+    )).scalars().all()
+    
+    total_classified = sum(row.document_count for row in rows)
+    
+    if total_classified == 0:
+        return {"message": "Aucun document classé", "categories": []}
+    
+    categories_data = [
+        {
+            "category": row.bucket,
+            "count": row.document_count,
+            "percentage": round(row.document_count / total_classified * 100, 2),
+            "avg_confidence": round(
+                row.confidence_sum / row.confidence_count if row.confidence_count else 0.0, 4
+            )
+        }
+        for row in rows
+    ]
+    categories_data.sort(key=lambda x: x['count'], reverse=True)
+    
+    return {
+        "total_classified": total_classified,
+        "categories": categories_data
+    }
+
+
+async def read_timeline(db: AsyncSession, user_id: int, days: int) -> list:
+    """
+    Nombre de documents créés par jour (UTC) sur les `days` derniers jours
+    
+    Returns:
+        Liste de {"date", "count"} triée par date
+    """
+    rows = (await db.execute(
+        select(models.UserDailyCount.day, models.UserDailyCount.document_count).where(
+            models.UserDailyCount.user_id == user_id,
+            models.UserDailyCount.day >= utc_today() - timedelta(days=days),
+            models.UserDailyCount.document_count > 0
+        ).order_by(models.UserDailyCount.day)
+    )).all()
+    
+    return [{"date": str(day), "count": count} for day, count in rows]
+
+
+def _utc_date_expression(dialect_name: str):
+    """Jour UTC de created_at, calculé par la base"""
+    if dialect_name == "postgresql":
+        return func.date(func.timezone("UTC", models.Document.created_at))
+    return func.date(models.Document.created_at)
+
+
+def rebuild(db, user_id: Optional[int] = None):
+    """
+    Recalcule les tables agrégées depuis la table documents (session synchrone)
+    
+    Args:
+        db: Session de base de données
+        user_id: Limiter la reconstruction à un utilisateur
+    """
+    Document = models.Document
+    stats_table = models.UserStat.__table__
+    daily_table = models.UserDailyCount.__table__
+    
+    def scoped(query):
+        return query.where(Document.user_id == user_id) if user_id is not None else query
+    
+    stats_delete = delete(models.UserStat)
+    daily_delete = delete(models.UserDailyCount)
+    if user_id is not None:
+        stats_delete = stats_delete.where(models.UserStat.user_id == user_id)
+        daily_delete = daily_delete.where(models.UserDailyCount.user_id == user_id)
+    db.execute(stats_delete)
+    db.execute(daily_delete)
+    
+    stat_columns = ["user_id", "dimension", "bucket", *STAT_COLUMNS]
+    
+    # Totaux (avec les mots extraits)
+    db.execute(insert(stats_table).from_select(stat_columns, scoped(
+        select(
+            Document.user_id,
+            literal(TOTAL),
+            literal(""),
+            func.count(Document.id),
+            func.coalesce(func.sum(Document.confidence), 0.0),
+            func.count(Document.confidence),
+            func.coalesce(func.sum(models.DocumentMetadata.word_count), 0)
+        ).outerjoin(
+            models.DocumentMetadata,
+            models.DocumentMetadata.document_id == Document.id
+        ).group_by(Document.user_id)
+    )))
+    
+    # Par catégorie
+    db.execute(insert(stats_table).from_select(stat_columns, scoped(
+        select(
+            Document.user_id,
+            literal(CATEGORY),
+            Document.category,
+            func.count(Document.id),
+            func.coalesce(func.sum(Document.confidence), 0.0),
+            func.count(Document.confidence),
+            literal(0)
+        ).where(Document.category.isnot(None)).group_by(Document.user_id, Document.category)
+    )))
+    
+    # Par type de fichier
+    file_type = func.coalesce(Document.file_type, "")
+    db.execute(insert(stats_table).from_select(stat_columns, scoped(
+        select(
+            Document.user_id,
+            literal(FILE_TYPE),
+            file_type,
+            func.count(Document.id),
+            literal(0.0),
+            literal(0),
+            literal(0)
+        ).group_by(Document.user_id, file_type)
+    )))
+    
+    # Par jour
+    day = _utc_date_expression(db.bind.dialect.name)
+    db.execute(insert(daily_table).from_select(["user_id", "day", "document_count"], scoped(
+        select(Document.user_id, day, func.count(Document.id)).where(
+            Document.created_at.isnot(None)
+        ).group_by(Document.user_id, day)
+    )))
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+    
+    parser = argparse.ArgumentParser(description="Reconstruit les statistiques agrégées par utilisateur")
+    parser.add_argument("--user-id", type=int, default=None,
+                        help="Limiter la reconstruction à un utilisateur")
+    args = parser.parse_args()
+    
+    db = SessionLocal()
+    try:
+        rebuild(db, args.user_id)
+        db.commit()
+        rows = db.scalar(select(func.count()).select_from(models.UserStat))
+        print(f"✅ Statistiques reconstruites ({rows} lignes dans user_stats)")
+    finally:
+        db.close()
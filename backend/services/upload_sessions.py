@@ -0,0 +1,473 @@
+"""
+Téléversements reprenables (gros PDF sur des connexions instables)
+Le client crée une session (taille totale, empreinte SHA-256 facultative), envoie des
+morceaux numérotés de chunk_size octets dans n'importe quel ordre, consulte les
+morceaux manquants après une coupure puis finalise:
+- chaque morceau est écrit directement à sa position dans le fichier de la session
+  (écritures positionnelles, fichier créé à sa taille finale), synchronisé sur le
+  disque puis enregistré dans upload_chunks: un morceau enregistré n'est jamais
+  renvoyé
+- chaque morceau en cours d'écriture est inscrit dans upload_chunk_writes avec un
+  bail (UPLOAD_CHUNK_WRITE_LEASE_MINUTES): la session n'est pas finalisée tant qu'il
+  en reste, l'écriture est interrompue à l'expiration du bail et les écritures d'un
+  processus arrêté sont oubliées au démarrage suivant (ou à l'expiration du bail)
+- à la finalisation, le fichier est haché et comparé à l'empreinte annoncée, puis
+  placé dans le stockage par contenu (renommage, sans copie)
+- les sessions sans activité depuis UPLOAD_SESSION_TTL_HOURS sont supprimées toutes
+  les UPLOAD_SESSION_GC_INTERVAL_MINUTES par l'API
+"""
+
+import asyncio
+import hashlib
+import os
+import socket
+import time
+import uuid
+from contextlib import suppress
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Optional
+import anyio
+from sqlalchemy import select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from dotenv import load_dotenv
+from database import AsyncSessionLocal
+from services.file_storage import CHUNK_SIZE, MEGABYTE
+from services.blob_store import STORAGE_PATH
+from services.job_queue import default_worker_id
+import models
+
+load_dotenv()
+
+
+# Fichiers des sessions en cours (hors du dossier de transit nettoyé par blob_store --gc)
+UPLOADS_PATH = os.path.join(STORAGE_PATH, ".uploads")
+
+# Taille des morceaux (le dernier est plus court)
+UPLOAD_CHUNK_SIZE = int(float(os.getenv("UPLOAD_CHUNK_SIZE_MB", "8")) * MEGABYTE)
+
+# Durée de vie d'une session sans nouveau morceau
+UPLOAD_SESSION_TTL = timedelta(hours=float(os.getenv("UPLOAD_SESSION_TTL_HOURS", "24")))
+
+# Durée maximale de l'écriture d'un morceau (bail), et marge avant d'ignorer un bail
+# expiré (écriture en cours à l'expiration, écarts d'horloge entre serveurs)
+UPLOAD_CHUNK_WRITE_LEASE = timedelta(minutes=float(os.getenv("UPLOAD_CHUNK_WRITE_LEASE_MINUTES", "30")))
+WRITE_LEASE_GRACE = timedelta(minutes=1)
+
+# Intervalle entre deux suppressions des sessions expirées (secondes)
+GC_INTERVAL = float(os.getenv("UPLOAD_SESSION_GC_INTERVAL_MINUTES", "15")) * 60
+
+
+class ChunkRejected(Exception):
+    """Morceau de taille ou d'empreinte incorrecte, ou trop lent (non enregistré, à renvoyer)"""
+
+
+def _expires_at() -> datetime:
+    """Expiration d'une session à partir de maintenant"""
+    return datetime.now(timezone.utc) + UPLOAD_SESSION_TTL
+
+
+def _active_writes(session_id):
+    """Écritures de la session dont le bail n'a pas expiré (marge comprise)"""
+    return select(models.UploadChunkWrite.id).where(
+        models.UploadChunkWrite.session_id == session_id,
+        models.UploadChunkWrite.lease_until >= datetime.now(timezone.utc) - WRITE_LEASE_GRACE
+    )
+
+
+def chunk_count(session: models.UploadSession) -> int:
+    """Nombre de morceaux de la session"""
+    return -(-session.total_size // session.chunk_size)
+
+
+def chunk_length(session: models.UploadSession, chunk_index: int) -> int:
+    """Taille attendue d'un morceau (le dernier contient le reste)"""
+    return min(session.chunk_size, session.total_size - chunk_index * session.chunk_size)
+
+
+def _create_file(path: str, size: int):
+    """Crée le fichier de la session à sa taille finale (fichier creux)"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    try:
+        os.ftruncate(descriptor, size)
+    finally:
+        os.close(descriptor)
+
+
+async def create_session(db: AsyncSession, user_id: int, filename: str, file_type: str,
+                         total_size: int, sha256: Optional[str]) -> models.UploadSession:
+    """
+    Crée une session de téléversement et son fichier
+    
+    Args:
+        db: Session de base de données
+        user_id: ID de l'utilisateur
+        filename: Nom du fichier
+        file_type: PDF ou IMAGE
+        total_size: Taille totale en octets (limite vérifiée par l'appelant)
+        sha256: Empreinte du fichier complet, vérifiée à la finalisation (facultative)
+    
+    Returns:
+        Session créée
+    """
+    session_id = uuid.uuid4().hex
+    session = models.UploadSession(
+        id=session_id,
+        user_id=user_id,
+        filename=filename,
+        file_type=file_type,
+        total_size=total_size,
+        chunk_size=UPLOAD_CHUNK_SIZE,
+        sha256=sha256.lower() if sha256 else None,
+        path=os.path.join(UPLOADS_PATH, f"{session_id}.part"),
+        status="open",
+        expires_at=_expires_at()
+    )
+    db.add(session)
+    await db.commit()
+    
+    # Fichier créé après la ligne: un fichier sans session n'existe qu'après une suppression interrompue
+    await anyio.to_thread.run_sync(_create_file, session.path, total_size)
+    return session
+
+
+async def get_session(db: AsyncSession, session_id: str, user_id: int) -> Optional[models.UploadSession]:
+    """Session d'un utilisateur (None si inconnue, expirée ou d'un autre utilisateur)"""
+    return await db.scalar(
+        select(models.UploadSession).where(
+            models.UploadSession.id == session_id,
+            models.UploadSession.user_id == user_id
+        )
+    )
+
+
+async def received_chunks(db: AsyncSession, session_id: str) -> set:
+    """Index des morceaux reçus"""
+    return set(await db.scalars(
+        select(models.UploadChunk.chunk_index).where(models.UploadChunk.session_id == session_id)
+    ))
+
+
+def upload_progress(session: models.UploadSession, received: set) -> dict:
+    """
+    Avancement d'une session
+    
+    Returns:
+        Dictionnaire (chunk_count, received_bytes, offset, missing_chunks); offset:
+        octets reçus sans interruption depuis le début du fichier
+    """
+    count = chunk_count(session)
+    missing = [index for index in range(count) if index not in received]
+    offset = session.total_size if not missing else missing[0] * session.chunk_size
+    return {
+        "chunk_count": count,
+        "received_bytes": sum(chunk_length(session, index) for index in received),
+        "offset": offset,
+        "missing_chunks": missing,
+    }
+
+
+def _write_at(descriptor: int, data: bytes, position: int, hasher):
+    """Écrit des octets à une position du fichier et les ajoute à l'empreinte (bloquant)"""
+    view = memoryview(data)
+    while view:
+        if hasattr(os, "pwrite"):
+            written = os.pwrite(descriptor, view, position)
+        else:
+            # Windows: le descripteur n'est partagé avec aucune autre requête
+            os.lseek(descriptor, position, os.SEEK_SET)
+            written = os.write(descriptor, view)
+        view = view[written:]
+        position += written
+    hasher.update(data)
+
+
+async def write_chunk(stream: AsyncIterator[bytes], path: str, offset: int, length: int,
+                      expected_sha256: Optional[str] = None, deadline: Optional[datetime] = None):
+    """
+    Écrit un morceau reçu à sa position dans le fichier de la session puis le
+    synchronise sur le disque (le morceau peut ensuite être enregistré comme reçu)
+    
+    Args:
+        stream: Corps de la requête, par blocs
+        path: Fichier de la session
+        offset: Position du morceau dans le fichier
+        length: Taille attendue du morceau
+        expected_sha256: Empreinte du morceau annoncée par le client (facultative)
+        deadline: Fin du bail de l'écriture: plus rien n'est écrit au-delà
+    
+    Raises:
+        ChunkRejected: Taille ou empreinte incorrecte, ou bail expiré
+    """
+    def check_deadline():
+        # Bail expiré: la session peut être finalisée sans attendre ce morceau
+        if deadline is not None and datetime.now(timezone.utc) > deadline:
+            raise ChunkRejected("Envoi du morceau trop long: interrompu, à renvoyer")
+    
+    descriptor = await anyio.to_thread.run_sync(os.open, path, os.O_WRONLY)
+    try:
+        hasher = hashlib.sha256()
+        received = 0
+        written = 0
+        buffer = bytearray()
+        async for piece in stream:
+            received += len(piece)
+            if received > length:
+                raise ChunkRejected(f"Morceau plus long que prévu ({length} octets)")
+            buffer += piece
+            # Écritures par blocs de CHUNK_SIZE: peu d'allers-retours vers les threads
+            if len(buffer) >= CHUNK_SIZE:
+                data = bytes(buffer)
+                buffer.clear()
+                check_deadline()
+                await anyio.to_thread.run_sync(_write_at, descriptor, data, offset + written, hasher)
+                written += len(data)
+        if buffer:
+            check_deadline()
+            await anyio.to_thread.run_sync(_write_at, descriptor, bytes(buffer), offset + written, hasher)
+        
+        if received != length:
+            raise ChunkRejected(f"Morceau incomplet: {received} octets reçus sur {length}")
+        if expected_sha256 and hasher.hexdigest() != expected_sha256.lower():
+            raise ChunkRejected("Empreinte SHA-256 du morceau incorrecte")
+        
+        await anyio.to_thread.run_sync(getattr(os, "fdatasync", os.fsync), descriptor)
+    finally:
+        await anyio.to_thread.run_sync(os.close, descriptor)
+
+
+async def begin_chunk(db: AsyncSession, session_id: str,
+                      chunk_index: int) -> Optional[models.UploadChunkWrite]:
+    """
+    Inscrit un morceau en cours d'écriture (jusqu'à record_chunk, au plus
+    UPLOAD_CHUNK_WRITE_LEASE): la session ne peut pas être finalisée pendant l'écriture
+    
+    Returns:
+        Écriture inscrite (lease_until: fin de son bail), None si la session n'accepte
+        plus de morceaux (finalisation en cours)
+    """
+    # Ligne de la session verrouillée (comme claim_session)
+    result = await db.execute(
+        update(models.UploadSession).where(
+            models.UploadSession.id == session_id,
+            models.UploadSession.status == "open"
+        ).values(expires_at=_expires_at())
+    )
+    if result.rowcount != 1:
+        await db.rollback()
+        return None
+    
+    write = models.UploadChunkWrite(
+        session_id=session_id,
+        chunk_index=chunk_index,
+        writer=default_worker_id(),
+        lease_until=datetime.now(timezone.utc) + UPLOAD_CHUNK_WRITE_LEASE
+    )
+    db.add(write)
+    await db.commit()
+    return write
+
+
+async def record_chunk(db: AsyncSession, write: models.UploadChunkWrite, size: Optional[int]) -> bool:
+    """
+    Termine l'écriture d'un morceau (begin_chunk): l'enregistre comme reçu (size) ou
+    le marque manquant (size None, morceau refusé qui a pu écraser une version reçue)
+    et prolonge la session
+    
+    Returns:
+        False si la session a été supprimée ou l'écriture oubliée pendant l'écriture
+        (rien n'est enregistré)
+    """
+    result = await db.execute(
+        update(models.UploadSession).where(
+            models.UploadSession.id == write.session_id,
+            models.UploadSession.status == "open"
+        ).values(expires_at=_expires_at())
+    )
+    released = await db.execute(
+        delete(models.UploadChunkWrite).where(models.UploadChunkWrite.id == write.id)
+    )
+    if result.rowcount != 1 or released.rowcount != 1:
+        await db.rollback()
+        return False
+    
+    await db.execute(
+        delete(models.UploadChunk).where(
+            models.UploadChunk.session_id == write.session_id,
+            models.UploadChunk.chunk_index == write.chunk_index
+        )
+    )
+    if size is not None:
+        db.add(models.UploadChunk(session_id=write.session_id, chunk_index=write.chunk_index, size=size))
+    await db.commit()
+    return True
+
+
+def _process_alive(pid: int) -> bool:
+    """Indique si un processus de cette machine existe encore"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+async def release_abandoned_writes(db: AsyncSession) -> int:
+    """
+    Oublie les écritures laissées par les processus arrêtés de cette machine (au
+    démarrage: leurs requêtes n'existent plus), sans attendre l'expiration de leur bail
+    
+    Returns:
+        Nombre d'écritures oubliées
+    """
+    current = default_worker_id()
+    writes = await db.execute(
+        select(models.UploadChunkWrite.id, models.UploadChunkWrite.writer).where(
+            models.UploadChunkWrite.writer.like(f"{socket.gethostname()}-%")
+        )
+    )
+    abandoned = []
+    for write_id, writer in writes:
+        pid = writer.rsplit("-", 1)[1]
+        # Windows: os.kill(pid, 0) arrêterait le processus
+        if writer == current or (os.name != "nt" and pid.isdigit() and not _process_alive(int(pid))):
+            abandoned.append(write_id)
+    
+    if abandoned:
+        await db.execute(delete(models.UploadChunkWrite).where(models.UploadChunkWrite.id.in_(abandoned)))
+    await db.commit()
+    return len(abandoned)
+
+
+async def claim_session(db: AsyncSession, session_id: str) -> bool:
+    """
+    Passe la session en finalisation (plus aucun morceau accepté)
+    
+    Returns:
+        False si elle est déjà en cours de finalisation (requête concurrente) ou si
+        un morceau est en cours d'écriture (bail non expiré)
+    """
+    result = await db.execute(
+        update(models.UploadSession).where(
+            models.UploadSession.id == session_id,
+            models.UploadSession.status == "open",
+            ~_active_writes(session_id).exists()
+        ).values(status="finalizing")
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+
+async def forget_sessions(db: AsyncSession, session_ids: list):
+    """Supprime les lignes de sessions et de leurs morceaux (dans la transaction en cours)"""
+    # SQLite n'applique pas ON DELETE CASCADE sans PRAGMA foreign_keys
+    await db.execute(delete(models.UploadChunk).where(models.UploadChunk.session_id.in_(session_ids)))
+    await db.execute(delete(models.UploadChunkWrite).where(models.UploadChunkWrite.session_id.in_(session_ids)))
+    await db.execute(delete(models.UploadSession).where(models.UploadSession.id.in_(session_ids)))
+
+
+async def delete_sessions(db: AsyncSession, session_ids: list):
+    """Supprime des sessions, leurs morceaux et leurs fichiers"""
+    paths = list(await db.scalars(
+        select(models.UploadSession.path).where(models.UploadSession.id.in_(session_ids))
+    ))
+    await forget_sessions(db, session_ids)
+    await db.commit()
+    
+    for path in paths:
+        with suppress(FileNotFoundError):
+            await anyio.to_thread.run_sync(os.unlink, path)
+
+
+def _orphan_files(known_ids: set, min_age: float) -> list:
+    """Fichiers de UPLOADS_PATH sans session, plus anciens que min_age secondes"""
+    if not os.path.isdir(UPLOADS_PATH):
+        return []
+    limit = time.time() - min_age
+    return [
+        entry.path for entry in os.scandir(UPLOADS_PATH)
+        if entry.is_file() and entry.name[:32] not in known_ids and entry.stat().st_mtime < limit
+    ]
+
+
+async def collect_expired_sessions(db: AsyncSession, batch_size: int = 500) -> int:
+    """
+    Supprime les sessions expirées et les fichiers de session orphelins
+    
+    Returns:
+        Nombre de sessions supprimées
+    """
+    removed = 0
+    while True:
+        expired = list(await db.scalars(
+            select(models.UploadSession.id).where(
+                models.UploadSession.expires_at < datetime.now(timezone.utc)
+            ).limit(batch_size)
+        ))
+        if not expired:
+            break
+        await delete_sessions(db, expired)
+        removed += len(expired)
+    
+    # Écritures dont le bail a expiré (processus arrêté sur une autre machine)
+    await db.execute(
+        delete(models.UploadChunkWrite).where(
+            models.UploadChunkWrite.lease_until < datetime.now(timezone.utc) - WRITE_LEASE_GRACE
+        )
+    )
+    await db.commit()
+    
+    known_ids = set(await db.scalars(select(models.UploadSession.id)))
+    await db.rollback()
+    orphans = await anyio.to_thread.run_sync(
+        _orphan_files, known_ids, UPLOAD_SESSION_TTL.total_seconds()
+    )
+    for path in orphans:
+        with suppress(FileNotFoundError):
+            await anyio.to_thread.run_sync(os.unlink, path)
+    return removed
+
+
+class UploadSessionCollector:
+    """Suppression périodique des sessions expirées, en tâche de fond de l'API"""
+    
+    def __init__(self, interval: float = GC_INTERVAL):
+        self.interval = interval
+        self._task = None
+    
+    def start(self):
+        """Démarre la tâche (au démarrage de l'API)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Arrête la tâche (à l'arrêt de l'API)"""
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+    
+    async def _run(self):
+        try:
+            async with AsyncSessionLocal() as db:
+                released = await release_abandoned_writes(db)
+            if released:
+                print(f"🔄 {released} écriture(s) de morceau interrompue(s) par un arrêt oubliée(s)")
+        except Exception as e:
+            print(f"⚠️ Erreur lors de la reprise des écritures de morceaux: {e}")
+        
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    removed = await collect_expired_sessions(db)
+                if removed:
+                    print(f"🧹 {removed} session(s) de téléversement expirée(s) supprimée(s)")
+            except Exception as e:
+                print(f"⚠️ Erreur lors de la suppression des sessions de téléversement: {e}")
+            await asyncio.sleep(self.interval)
+
+
+upload_session_collector = UploadSessionCollector()
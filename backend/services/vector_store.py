@@ -0,0 +1,389 @@
+"""
+Index des vecteurs TF-IDF des documents pour la recherche de documents similaires
+Les vecteurs calculés par MLService lors de la classification sont normalisés (L2)
+et enregistrés sur disque, par version du modèle et par utilisateur:
+
+    VECTOR_STORE_PATH/<version du modèle>/<user_id>/seg_<horodatage>_<pid>.npz
+
+Chaque classification ajoute un petit segment (float32 + index int32); une suppression
+ajoute un segment de suppression. Pour un même document, le segment le plus récent
+l'emporte. Au-delà de VECTOR_STORE_MAX_SEGMENTS segments, ils sont fusionnés en un seul.
+La similarité est le produit scalaire (cosinus) calculé sur les colonnes des termes du
+document recherché seulement (index inversé CSC), puis recalculé exactement sur les
+meilleurs candidats
+
+Reconstruction complète (nouveau modèle, index perdu), depuis le dossier backend:
+    python -m services.vector_store
+    python -m services.vector_store --user-id 42
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+
+VECTOR_STORE_PATH = os.getenv("VECTOR_STORE_PATH", "./vector_store")
+VECTOR_STORE_MAX_SEGMENTS = int(os.getenv("VECTOR_STORE_MAX_SEGMENTS", "16"))
+
+# Termes du document recherché utilisés pour présélectionner les candidats (plus forts poids)
+QUERY_TERMS = 64
+
+# Candidats recalculés exactement, par résultat demandé
+CANDIDATES_PER_RESULT = 4
+
+# Index chargés en mémoire (utilisateurs les plus récemment interrogés)
+CACHE_SIZE = 64
+
+
+class UserIndex:
+    """Vecteurs d'un utilisateur chargés en mémoire (sans doublons ni suppressions)"""
+    
+    def __init__(self, ids: np.ndarray, rows):
+        self.ids = ids
+        self.rows = rows.tocsr()
+        self.columns = rows.tocsc()  # Index inversé: documents contenant chaque terme
+        self.positions = {int(document_id): position for position, document_id in enumerate(ids)}
+
+
+class VectorStore:
+    """
+    Stockage sur disque et recherche des plus proches voisins par utilisateur
+    Les écritures sont atomiques (fichier temporaire puis os.replace): plusieurs
+    processus peuvent ajouter des segments en parallèle
+    """
+    
+    def __init__(self, root: str = VECTOR_STORE_PATH):
+        self.root = root
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._cache = OrderedDict()
+    
+    @staticmethod
+    def version_key(model_version: Optional[str]) -> str:
+        """Nom de dossier de la version du modèle (les vecteurs de versions différentes ne sont pas comparables)"""
+        return "".join(char if char.isalnum() or char in "-_." else "_" for char in (model_version or "default"))
+    
+    def _user_dir(self, user_id: int, model_version: Optional[str]) -> str:
+        return os.path.join(self.root, self.version_key(model_version), str(user_id))
+    
+    def _lock(self, user_dir: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(user_dir, threading.Lock())
+    
+    @staticmethod
+    def _segments(user_dir: str) -> list:
+        return sorted(glob.glob(os.path.join(user_dir, "seg_*.npz")))
+    
+    @staticmethod
+    def _write_segment(path: str, ids: np.ndarray, rows=None):
+        """Écrit un segment (rows=None: segment de suppression)"""
+        arrays = {"ids": ids.astype(np.int64)}
+        if rows is not None:
+            rows = rows.tocsr()
+            arrays.update(
+                data=rows.data.astype(np.float32),
+                indices=rows.indices.astype(np.int32),
+                indptr=rows.indptr.astype(np.int64),
+                shape=np.array(rows.shape, dtype=np.int64)
+            )
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(temp_path, path)
+    
+    @staticmethod
+    def _new_segment_path(user_dir: str) -> str:
+        return os.path.join(user_dir, f"seg_{time.time_ns():020d}_{os.getpid()}.npz")
+    
+    @staticmethod
+    def _read_segments(paths: list, base: Optional[UserIndex] = None) -> Optional[UserIndex]:
+        """
+        Fusionne des segments: dernier vecteur de chaque document, suppressions retirées
+        
+        Args:
+            paths: Segments triés du plus ancien au plus récent
+            base: Index déjà chargé, plus ancien que tous les segments
+        """
+        ids, sources, matrices = [], [], []
+        offset = 0
+        if base is not None and base.ids.size:
+            ids.append(base.ids)
+            matrices.append(base.rows)
+            sources.append(np.arange(base.ids.size))
+            offset = base.ids.size
+        for path in paths:
+            try:
+                with np.load(path) as segment:
+                    segment_ids = segment["ids"]
+                    if "data" in segment:
+                        matrix = sparse.csr_matrix(
+                            (segment["data"], segment["indices"], segment["indptr"]),
+                            shape=tuple(segment["shape"])
+                        )
+                        matrices.append(matrix)
+                        sources.append(np.arange(offset, offset + len(segment_ids)))
+                        offset += len(segment_ids)
+                    else:
+                        sources.append(np.full(len(segment_ids), -1))
+                    ids.append(segment_ids)
+            except FileNotFoundError:
+                # Segment fusionné par un autre processus entre la liste et la lecture
+                continue
+        
+        if not matrices:
+            return None
+        
+        ids = np.concatenate(ids)
+        sources = np.concatenate(sources)
+        
+        # Dernière occurrence de chaque document
+        unique_ids, reversed_positions = np.unique(ids[::-1], return_index=True)
+        last_positions = len(ids) - 1 - reversed_positions
+        keep = sources[last_positions] >= 0
+        
+        stacked = sparse.vstack(matrices, format="csr")
+        return UserIndex(unique_ids[keep], stacked[sources[last_positions][keep]])
+    
+    def load(self, user_id: int, model_version: Optional[str]) -> Optional[UserIndex]:
+        """
+        Index d'un utilisateur, mis en cache: seuls les segments ajoutés depuis le
+        dernier chargement sont lus
+        
+        Returns:
+            Index, ou None si aucun vecteur n'est enregistré
+        """
+        user_dir = self._user_dir(user_id, model_version)
+        paths = self._segments(user_dir)
+        
+        with self._locks_guard:
+            cached = self._cache.get(user_dir)
+        
+        index = None
+        if cached is not None:
+            cached_paths, cached_index = cached
+            newest_cached = cached_paths[-1] if cached_paths else ""
+            older = [path for path in paths if path <= newest_cached]
+            newer = [path for path in paths if path > newest_cached]
+            # Les segments déjà vus ont pu être fusionnés (compaction), pas modifiés
+            if set(older) <= set(cached_paths):
+                index = self._read_segments(newer, cached_index) if newer else cached_index
+        if index is None:
+            index = self._read_segments(paths)
+        
+        with self._locks_guard:
+            self._cache[user_dir] = (paths, index)
+            self._cache.move_to_end(user_dir)
+            while len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return index
+    
+    def add(self, user_id: int, document_ids: list, vectors, model_version: Optional[str]) -> bool:
+        """
+        Ajoute ou remplace les vecteurs de documents d'un utilisateur
+        L'index est une donnée dérivée: une erreur d'écriture est signalée sans
+        interrompre la classification (reconstruction avec python -m services.vector_store)
+        
+        Args:
+            user_id: Propriétaire des documents
+            document_ids: IDs des documents (dans l'ordre des lignes de vectors)
+            vectors: Matrice TF-IDF calculée par MLService.vectorize
+            model_version: Version du modèle qui a produit les vecteurs
+        
+        Returns:
+            True si les vecteurs ont été enregistrés
+        """
+        if not document_ids:
+            return True
+        user_dir = self._user_dir(user_id, model_version)
+        try:
+            with self._lock(user_dir):
+                os.makedirs(user_dir, exist_ok=True)
+                rows = normalize(sparse.csr_matrix(vectors, dtype=np.float32))
+                self._write_segment(self._new_segment_path(user_dir), np.asarray(document_ids), rows)
+                self._compact_if_needed(user_dir)
+            return True
+        except OSError as e:
+            print(f"⚠️ Index de similarité non mis à jour (utilisateur #{user_id}): {e}")
+            return False
+    
+    def remove(self, user_id: int, document_ids: list):
+        """Retire des documents supprimés de l'index (toutes versions du modèle)"""
+        if not document_ids:
+            return
+        for version_dir in glob.glob(os.path.join(self.root, "*")):
+            user_dir = os.path.join(version_dir, str(user_id))
+            if not os.path.isdir(user_dir):
+                continue
+            try:
+                with self._lock(user_dir):
+                    self._write_segment(self._new_segment_path(user_dir), np.asarray(document_ids))
+                    self._compact_if_needed(user_dir)
+            except OSError as e:
+                print(f"⚠️ Index de similarité non mis à jour (utilisateur #{user_id}): {e}")
+    
+    def _compact_if_needed(self, user_dir: str, force: bool = False):
+        """
+        Fusionne les segments d'un utilisateur en un seul (appelé sous le verrou)
+        Le segment fusionné prend le nom du plus récent: un segment ajouté entretemps
+        par un autre processus reste plus récent et l'emporte toujours
+        """
+        paths = self._segments(user_dir)
+        if len(paths) <= 1 or (not force and len(paths) <= VECTOR_STORE_MAX_SEGMENTS):
+            return
+        
+        index = self._read_segments(paths)
+        if index is None:
+            self._write_segment(paths[-1], np.array([], dtype=np.int64))
+        else:
+            self._write_segment(paths[-1], index.ids, index.rows)
+        for path in paths[:-1]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    
+    def get_vector(self, user_id: int, document_id: int, model_version: Optional[str]):
+        """Vecteur normalisé d'un document indexé (None s'il n'est pas indexé)"""
+        index = self.load(user_id, model_version)
+        if index is None or document_id not in index.positions:
+            return None
+        return index.rows[index.positions[document_id]]
+    
+    def query(self, user_id: int, vector, model_version: Optional[str],
+              limit: int = 10, exclude_id: Optional[int] = None) -> list:
+        """
+        Documents de l'utilisateur les plus similaires à un vecteur
+        
+        Args:
+            user_id: ID de l'utilisateur
+            vector: Vecteur normalisé (1 ligne)
+            model_version: Version du modèle
+            limit: Nombre de résultats
+            exclude_id: Document à exclure (le document recherché lui-même)
+        
+        Returns:
+            Liste de tuples (document_id, similarité cosinus) par similarité décroissante
+        """
+        index = self.load(user_id, model_version)
+        if index is None or index.ids.size == 0:
+            return []
+        
+        vector = sparse.csr_matrix(vector, dtype=np.float32)
+        if vector.nnz == 0:
+            return []
+        
+        # Présélection: seuls les termes les plus forts du document sont parcourus
+        strongest = np.argsort(vector.data)[::-1][:QUERY_TERMS]
+        terms = vector.indices[strongest]
+        approximate = index.columns[:, terms] @ vector.data[strongest]
+        
+        candidates = np.flatnonzero(approximate > 0)
+        if exclude_id is not None and exclude_id in index.positions:
+            candidates = candidates[candidates != index.positions[exclude_id]]
+        if candidates.size == 0:
+            return []
+        
+        shortlist_size = limit * CANDIDATES_PER_RESULT
+        if candidates.size > shortlist_size:
+            best = np.argpartition(approximate[candidates], -shortlist_size)[-shortlist_size:]
+            candidates = candidates[best]
+        
+        # Score exact (tous les termes) sur les candidats retenus
+        exact = (index.rows[candidates] @ vector.T).toarray().ravel()
+        order = np.lexsort((index.ids[candidates], -exact))[:limit]
+        return [(int(index.ids[candidates[i]]), round(float(exact[i]), 4)) for i in order if exact[i] > 0]
+    
+    def drop_other_versions(self, model_version: Optional[str]):
+        """Supprime les index produits par d'autres versions du modèle"""
+        current = self.version_key(model_version)
+        for version_dir in glob.glob(os.path.join(self.root, "*")):
+            if os.path.basename(version_dir) != current and os.path.isdir(version_dir):
+                shutil.rmtree(version_dir, ignore_errors=True)
+    
+    def compact(self, user_id: int, model_version: Optional[str]):
+        """Fusionne tous les segments d'un utilisateur"""
+        user_dir = self._user_dir(user_id, model_version)
+        with self._lock(user_dir):
+            self._compact_if_needed(user_dir, force=True)
+
+
+# Instance partagée par l'API
+vector_store = VectorStore()
+
+
+def rebuild(db, ml_service, user_id: Optional[int] = None, batch_size: int = 1000) -> int:
+    """
+    Recalcule les vecteurs des documents avec le modèle courant (session synchrone)
+    
+    Args:
+        db: Session de base de données
+        ml_service: Service ML (modèle chargé)
+        user_id: Limiter la reconstruction à un utilisateur
+        batch_size: Documents vectorisés par lot
+    
+    Returns:
+        Nombre de documents indexés
+    """
+    from sqlalchemy import select
+    import models
+    
+    indexed = 0
+    last_id = 0
+    touched_users = set()
+    while True:
+        query = select(models.Document.id, models.Document.user_id, models.Document.extracted_text).where(
+            models.Document.id > last_id,
+            models.Document.extracted_text.isnot(None)
+        ).order_by(models.Document.id).limit(batch_size)
+        if user_id is not None:
+            query = query.where(models.Document.user_id == user_id)
+        rows = db.execute(query).all()
+        if not rows:
+            break
+        
+        last_id = rows[-1].id
+        rows = [row for row in rows if row.extracted_text.strip()]
+        if rows:
+            vectors = ml_service.vectorize([row.extracted_text for row in rows])
+            by_user = {}
+            for position, row in enumerate(rows):
+                by_user.setdefault(row.user_id, []).append(position)
+            for owner_id, positions in by_user.items():
+                vector_store.add(owner_id, [rows[p].id for p in positions], vectors[positions], ml_service.model_version)
+                touched_users.add(owner_id)
+            indexed += len(rows)
+    
+    for owner_id in touched_users:
+        vector_store.compact(owner_id, ml_service.model_version)
+    if user_id is None:
+        vector_store.drop_other_versions(ml_service.model_version)
+    return indexed
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+    from services.ml_service import MLService
+    
+    parser = argparse.ArgumentParser(description="Reconstruit l'index des documents similaires")
+    parser.add_argument("--user-id", type=int, default=None,
+                        help="Limiter la reconstruction à un utilisateur")
+    args = parser.parse_args()
+    
+    ml_service = MLService()
+    if ml_service.model is None:
+        raise SystemExit(1)
+    
+    db = SessionLocal()
+    try:
+        count = rebuild(db, ml_service, args.user_id)
+        print(f"✅ {count} document(s) indexé(s) pour la recherche de documents similaires")
+    finally:
+        db.close()
@@ -0,0 +1,8 @@
+"""
+Configuration des tests: le dossier backend est importable (import models, services...)
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
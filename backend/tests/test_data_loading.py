@@ -0,0 +1,32 @@
+"""
+Tests du chargement par lots des données d'entraînement (ml/data_loading.py)
+"""
+
+import pandas as pd
+from ml.data_loading import iter_training_data
+
+
+def write_shards(tmp_path, categories, shards, rows):
+    """Fragments <catégorie>_<numéro>.csv comme ceux de generate_data.py"""
+    for category in categories:
+        for shard_index in range(shards):
+            pd.DataFrame({'category': category, 'text': [f"{category} texte"] * rows}).to_csv(
+                tmp_path / f"{category.lower()}_{shard_index:05d}.csv", index=False
+            )
+
+
+def test_first_chunks_cover_every_category(tmp_path):
+    write_shards(tmp_path, ['Autre', 'CV', 'Facture'], shards=2, rows=10)
+    
+    chunks = iter_training_data(tmp_path, chunk_size=5)
+    first = [next(chunks)['category'].iloc[0] for _ in range(3)]
+    
+    assert sorted(first) == ['Autre', 'CV', 'Facture']
+
+
+def test_every_row_is_read_once(tmp_path):
+    write_shards(tmp_path, ['Autre', 'CV'], shards=3, rows=7)
+    
+    counts = pd.concat(iter_training_data(tmp_path, chunk_size=4))['category'].value_counts()
+    
+    assert counts.to_dict() == {'Autre': 21, 'CV': 21}
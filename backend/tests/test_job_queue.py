@@ -0,0 +1,66 @@
+"""
+Tests de la file de traitement (services/job_queue.py) sur une base SQLite temporaire
+"""
+
+import asyncio
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+import models
+from services import job_queue
+
+
+def run_with_session(tmp_path, scenario):
+    """Exécute scenario(db) avec une session sur une table processing_jobs vide"""
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}")
+        async with engine.begin() as connection:
+            await connection.run_sync(models.ProcessingJob.__table__.create)
+        try:
+            async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+                return await scenario(db)
+        finally:
+            await engine.dispose()
+    
+    return asyncio.run(main())
+
+
+async def claim_all(db):
+    """Documents des tâches dans l'ordre de réservation"""
+    claimed = []
+    while jobs := await job_queue.claim_jobs(db, "worker-test"):
+        claimed.extend(job.document_id for job in jobs)
+    return claimed
+
+
+def test_user_jobs_stay_in_order_behind_other_users_first_job(tmp_path):
+    async def scenario(db):
+        await job_queue.enqueue_documents(db, 1, list(range(1, 11)))
+        await db.commit()
+        
+        # Les 8 premiers documents de l'utilisateur 1 sont traités
+        for job in await job_queue.claim_jobs(db, "worker-test", limit=8):
+            await job_queue.complete_job(db, job.id, "worker-test")
+        await db.commit()
+        
+        await job_queue.enqueue_documents(db, 1, [11])
+        await job_queue.enqueue_documents(db, 2, [101])
+        await db.commit()
+        return await claim_all(db)
+    
+    assert run_with_session(tmp_path, scenario) == [101, 9, 10, 11]
+
+
+def test_ranks_restart_when_user_queue_is_empty(tmp_path):
+    async def scenario(db):
+        await job_queue.enqueue_documents(db, 1, [1, 2])
+        await db.commit()
+        await db.execute(update(models.ProcessingJob).values(status=job_queue.DONE))
+        await db.commit()
+        
+        await job_queue.enqueue_documents(db, 1, [3])
+        await job_queue.enqueue_documents(db, 2, [4, 5])
+        await db.commit()
+        return await claim_all(db)
+    
+    # Le document 3 reprend au rang 0, avant le deuxième document de l'utilisateur 2
+    assert run_with_session(tmp_path, scenario) == [3, 4, 5]
@@ -0,0 +1,89 @@
+"""
+Tests des sessions de téléversement reprenables (services/upload_sessions.py) sur une
+base SQLite temporaire
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+import models
+from services import upload_sessions
+
+
+def run_with_session(tmp_path, scenario):
+    """Exécute scenario(db) avec une session ouverte (sans utilisateur ni fichier)"""
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'uploads.db'}")
+        async with engine.begin() as connection:
+            await connection.run_sync(models.UploadSession.__table__.create)
+            await connection.run_sync(models.UploadChunk.__table__.create)
+            await connection.run_sync(models.UploadChunkWrite.__table__.create)
+        try:
+            async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+                db.add(models.UploadSession(
+                    id="s1", user_id=1, filename="a.pdf", file_type="PDF", total_size=10,
+                    chunk_size=10, path=str(tmp_path / "s1.part"), status="open",
+                    expires_at=datetime.now(timezone.utc)
+                ))
+                await db.commit()
+                return await scenario(db)
+        finally:
+            await engine.dispose()
+    
+    return asyncio.run(main())
+
+
+def test_session_is_not_finalized_while_a_chunk_is_written(tmp_path):
+    async def scenario(db):
+        write = await upload_sessions.begin_chunk(db, "s1", 0)
+        claimed_during_write = await upload_sessions.claim_session(db, "s1")
+        assert await upload_sessions.record_chunk(db, write, 10)
+        claimed_after_write = await upload_sessions.claim_session(db, "s1")
+        chunk_accepted = await upload_sessions.begin_chunk(db, "s1", 0) is not None
+        return claimed_during_write, claimed_after_write, chunk_accepted
+    
+    assert run_with_session(tmp_path, scenario) == (False, True, False)
+
+
+def test_chunk_of_a_deleted_session_is_not_recorded(tmp_path):
+    async def scenario(db):
+        write = await upload_sessions.begin_chunk(db, "s1", 0)
+        await upload_sessions.delete_sessions(db, ["s1"])
+        recorded = await upload_sessions.record_chunk(db, write, 10)
+        chunks = list(await db.scalars(select(models.UploadChunk.session_id)))
+        return recorded, chunks
+    
+    assert run_with_session(tmp_path, scenario) == (False, [])
+
+
+def test_abandoned_write_is_released_at_restart(tmp_path):
+    async def scenario(db):
+        # PUT interrompu par l'arrêt du processus: record_chunk n'est jamais appelé
+        await upload_sessions.begin_chunk(db, "s1", 0)
+        claimed_before_restart = await upload_sessions.claim_session(db, "s1")
+        # Au redémarrage, les écritures de ce processus sont forcément abandonnées
+        released = await upload_sessions.release_abandoned_writes(db)
+        return claimed_before_restart, released, await upload_sessions.claim_session(db, "s1")
+    
+    assert run_with_session(tmp_path, scenario) == (False, 1, True)
+
+
+def test_abandoned_write_of_another_server_stops_blocking_when_its_lease_expires(tmp_path):
+    async def scenario(db):
+        write = await upload_sessions.begin_chunk(db, "s1", 0)
+        await db.execute(
+            update(models.UploadChunkWrite).values(
+                writer="autre-serveur-1234",
+                lease_until=datetime.now(timezone.utc) - upload_sessions.WRITE_LEASE_GRACE - timedelta(seconds=1)
+            )
+        )
+        await db.commit()
+        # Ni ce processus ni cette machine: seul le bail expiré la libère
+        released = await upload_sessions.release_abandoned_writes(db)
+        claimed = await upload_sessions.claim_session(db, "s1")
+        # L'écriture retardataire n'est plus enregistrée
+        recorded = await upload_sessions.record_chunk(db, write, 10)
+        return released, claimed, recorded
+    
+    assert run_with_session(tmp_path, scenario) == (0, True, False)
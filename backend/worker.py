@@ -0,0 +1,70 @@
+"""
+Worker de traitement des documents (OCR puis classification), hors de l'API
+Réserve les tâches de la table processing_jobs: plusieurs workers, sur un ou plusieurs
+serveurs, peuvent traiter la même base (PostgreSQL: SELECT ... FOR UPDATE SKIP LOCKED)
+
+Usage:
+    python worker.py --concurrency 4
+    python worker.py --concurrency 4 --worker-id ocr-1
+
+Avec des workers dédiés, démarrer l'API avec PROCESSING_WORKERS=0
+"""
+
+import argparse
+import asyncio
+import signal
+from database import AUTO_MIGRATE, run_migrations
+from services.document_processing import DocumentProcessingPool, PROCESSING_WORKERS
+from services.job_queue import default_worker_id
+from services.ocr_scheduler import ocr_scheduler, BULK
+
+
+async def run_worker(concurrency: int, worker_id: str):
+    """
+    Traite les tâches jusqu'à SIGINT ou SIGTERM; les tâches en cours sont alors
+    rendues aux autres workers
+    
+    Args:
+        concurrency: Documents traités en parallèle
+        worker_id: Identifiant du worker (détenteur des baux)
+    """
+    # Pas d'OCR interactif dans un worker dédié: tous les threads pour la classe bulk
+    ocr_scheduler.configure(concurrency, {BULK: concurrency})
+    pool = DocumentProcessingPool(concurrency, worker_id)
+    stopping = asyncio.Event()
+    
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stopping.set)
+        except NotImplementedError:
+            # Windows: Ctrl+C interrompt asyncio.run
+            pass
+    
+    await pool.start()
+    print(f"✅ Worker {worker_id} démarré ({concurrency} document(s) en parallèle)")
+    try:
+        await stopping.wait()
+    finally:
+        print(f"🔄 Arrêt du worker {worker_id}")
+        await pool.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Worker de traitement des documents (OCR puis classification)")
+    parser.add_argument("--concurrency", type=int, default=max(PROCESSING_WORKERS, 1),
+                        help="Documents traités en parallèle (défaut: PROCESSING_WORKERS)")
+    parser.add_argument("--worker-id", default=default_worker_id(),
+                        help="Identifiant du worker (défaut: machine et PID)")
+    args = parser.parse_args()
+    
+    if args.concurrency < 1:
+        parser.error("--concurrency doit être au moins 1")
+    
+    if AUTO_MIGRATE:
+        run_migrations()
+    
+    try:
+        asyncio.run(run_worker(args.concurrency, args.worker_id))
+    except KeyboardInterrupt:
+        pass
@@ -26,6 +26,16 @@ const DocumentCard = ({ document, onDelete, onViewDetails }) => {
     }
   };
   
+  // Extrait de recherche: les termes entre <mark></mark> sont surlignés (texte jamais interprété comme HTML)
+  const renderSnippet = (snippet) => {
+    return snippet.split(/(<mark>.*?<\/mark>)/g).map((part, index) => {
+      const match = part.match(/^<mark>(.*)<\/mark>$/);
+      return match
+        ? <mark key={index} className="bg-yellow-200 rounded px-0.5">{match[1]}</mark>
+        : <React.Fragment key={index}>{part}</React.Fragment>;
+    });
+  };
+  
   // Fonction pour obtenir la couleur selon la catégorie
   const getCategoryColor = (category) => {
     const colors = {
@@ -114,11 +124,11 @@ const DocumentCard = ({ document, onDelete, onViewDetails }) => {
         )}
         
         {/* Métadonnées */}
-        {document.metadata && document.metadata.length > 0 && (
+        {document.doc_metadata && document.doc_metadata.length > 0 && (
           <div className="flex justify-between items-center text-sm">
             <span className="text-gray-600">Mots extraits:</span>
             <span className="font-medium text-gray-800">
-              {document.metadata[0].word_count || 0}
+              {document.doc_metadata[0].word_count || 0}
             </span>
           </div>
         )}
@@ -132,15 +142,27 @@ const DocumentCard = ({ document, onDelete, onViewDetails }) => {
         </div>
       </div>
       
-      {/* Texte extrait (aperçu) */}
-      {document.extracted_text && (
+      {/* Extrait trouvé par la recherche plein texte */}
+      {document.snippet && (
+        <div className="bg-gradient-to-br from-yellow-50 to-amber-50 rounded-xl p-4 mb-4 border border-yellow-100">
+          <p className="text-xs text-amber-600 mb-2 font-bold flex items-center">
+            <FiEdit3 className="mr-2" /> Extrait:
+          </p>
+          <p className="text-sm text-gray-700 line-clamp-3 leading-relaxed">
+            {renderSnippet(document.snippet)}
+          </p>
+        </div>
+      )}
+      
+      {/* Texte extrait (aperçu calculé par l'API) */}
+      {!document.snippet && document.text_preview && (
         <div className="bg-gradient-to-br from-blue-50 to-indigo-50 rounded-xl p-4 mb-4 border border-blue-100">
           <p className="text-xs text-blue-600 mb-2 font-bold flex items-center">
             <FiEdit3 className="mr-2" /> Aperçu du texte:
           </p>
           <p className="text-sm text-gray-700 line-clamp-3 leading-relaxed">
-            {document.extracted_text.substring(0, 150)}
-            {document.extracted_text.length > 150 ? '...' : ''}
+            {document.text_preview}
+            {document.text_preview.length >= 150 ? '...' : ''}
           </p>
         </div>
       )}
@@ -6,7 +6,7 @@
 import React, { useState, useEffect } from 'react';
 import DocumentCard from '../components/DocumentCard';
 import AuthImage from '../components/AuthImage';
-import { getDocuments, deleteDocument } from '../services/api';
+import { getDocuments, getDocument, deleteDocument, searchDocuments, searchDocumentNames } from '../services/api';
 
 const Documents = () => {
   const [documents, setDocuments] = useState([]);
@@ -17,24 +17,53 @@ const Documents = () => {
   const [filterType, setFilterType] = useState('all');
   const [searchTerm, setSearchTerm] = useState('');
   const [selectedDocument, setSelectedDocument] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
+  const [searchInContent, setSearchInContent] = useState(false);
+  const [filterLanguage, setFilterLanguage] = useState('all');
+  const [minConfidence, setMinConfidence] = useState('');
+  const [facets, setFacets] = useState(null);
   
-  // Charger les documents au montage du composant
+  // Texte recherché côté serveur (null: liste des documents)
+  const query = searchTerm.trim() || null;
+  
+  // Filtres appliqués par l'API à la liste des documents
+  const listFilters = {
+    category: filterCategory !== 'all' ? filterCategory : undefined,
+    fileType: filterType !== 'all' ? filterType : undefined,
+    language: filterLanguage !== 'all' ? filterLanguage : undefined,
+    minConfidence: minConfidence !== '' ? Number(minConfidence) / 100 : undefined,
+  };
+  
+  // Charger les documents au montage puis à chaque changement de recherche ou de filtre
   useEffect(() => {
-    loadDocuments();
-  }, []);
+    // Attendre la fin de la saisie avant d'interroger l'API
+    const timer = setTimeout(loadDocuments, query || minConfidence !== '' ? 300 : 0);
+    return () => clearTimeout(timer);
+  }, [query, searchInContent, filterCategory, filterType, filterLanguage, minConfidence]);
   
-  // Appliquer les filtres quand ils changent
+  // Appliquer les filtres aux résultats de recherche quand ils changent
   useEffect(() => {
     applyFilters();
-  }, [documents, filterCategory, filterType, searchTerm]);
+  }, [documents, filterCategory, filterType]);
   
   const loadDocuments = async () => {
     setIsLoading(true);
     setError(null);
     
     try {
-      const data = await getDocuments();
-      setDocuments(data);
+      if (query && !searchInContent) {
+        // Recherche approximative sur le nom: meilleures correspondances, sans pagination
+        const matches = await searchDocumentNames(query);
+        setDocuments(matches.items);
+        setNextCursor(null);
+        setFacets(null);
+      } else {
+        const page = query ? await searchDocuments(query) : await getDocuments(listFilters);
+        setDocuments(page.items);
+        setNextCursor(page.next_cursor);
+        setFacets(page.facets || null);
+      }
     } catch (err) {
       setError('Erreur lors du chargement des documents');
       console.error(err);
@@ -43,8 +72,32 @@ const Documents = () => {
     }
   };
   
+  // Charger la page suivante (pagination par curseur)
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setIsLoadingMore(true);
+    
+    try {
+      const page = query
+        ? await searchDocuments(query, { cursor: nextCursor })
+        : await getDocuments({ ...listFilters, cursor: nextCursor });
+      setDocuments(current => [...current, ...page.items]);
+      setNextCursor(page.next_cursor);
+    } catch (err) {
+      setError('Erreur lors du chargement des documents');
+      console.error(err);
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+  
+  // La liste est filtrée par l'API; seuls les résultats de recherche sont filtrés ici
   const applyFilters = () => {
     let filtered = [...documents];
+    if (!query) {
+      setFilteredDocuments(filtered);
+      return;
+    }
     
     // Filtrer par catégorie
     if (filterCategory !== 'all') {
@@ -56,13 +109,6 @@ const Documents = () => {
       filtered = filtered.filter(doc => doc.file_type === filterType);
     }
     
-    // Recherche par nom de fichier
-    if (searchTerm) {
-      filtered = filtered.filter(doc =>
-        doc.filename.toLowerCase().includes(searchTerm.toLowerCase())
-      );
-    }
-    
     setFilteredDocuments(filtered);
   };
   
@@ -81,17 +127,33 @@ const Documents = () => {
     }
   };
   
-  const handleViewDetails = (document) => {
+  const handleViewDetails = async (document) => {
+    // La liste ne contient qu'un aperçu: charger le texte complet à l'ouverture
     setSelectedDocument(document);
+    
+    try {
+      const details = await getDocument(document.id);
+      setSelectedDocument(current => (current && current.id === document.id ? details : current));
+    } catch (err) {
+      console.error(err);
+    }
   };
   
   const closeModal = () => {
     setSelectedDocument(null);
   };
   
-  // Obtenir les catégories uniques
-  const categories = ['all', ...new Set(documents.map(doc => doc.category).filter(Boolean))];
-  const fileTypes = ['all', ...new Set(documents.map(doc => doc.file_type))];
+  // Valeurs proposées par filtre: facettes de l'API (avec comptes) ou valeurs des résultats de recherche
+  const facetOptions = (facet, values) => {
+    if (facets) {
+      return facets[facet].filter(item => item.value).map(item => ({ value: item.value, count: item.count }));
+    }
+    return [...new Set(values.filter(Boolean))].map(value => ({ value, count: null }));
+  };
+  const categories = facetOptions('category', documents.map(doc => doc.category));
+  const fileTypes = facetOptions('file_type', documents.map(doc => doc.file_type));
+  const languages = facets ? facetOptions('language', []) : [];
+  const optionLabel = (option) => (option.count === null ? option.value : `${option.value} (${option.count})`);
   
   return (
     <div className="min-h-screen bg-gradient-to-br from-slate-50 via-blue-50 to-indigo-50">
@@ -103,7 +165,7 @@ const Documents = () => {
               📁 Mes Documents
             </h1>
             <p className="text-gray-600 text-lg">
-              {filteredDocuments.length} document(s) trouvé(s)
+              {facets ? facets.total : filteredDocuments.length} document(s) trouvé(s)
             </p>
           </div>
           <button
@@ -117,7 +179,7 @@ const Documents = () => {
         {/* Filtres */}
         <div className="bg-white/70 backdrop-blur-xl rounded-2xl shadow-xl border border-white/20 p-6 mb-8">
           <h2 className="text-xl font-bold bg-gradient-to-r from-blue-600 to-indigo-600 bg-clip-text text-transparent mb-6"> Filtres</h2>
-          <div className="grid grid-cols-1 md:grid-cols-3 gap-4">
+          <div className="grid grid-cols-1 md:grid-cols-3 lg:grid-cols-5 gap-4">
             {/* Recherche */}
             <div>
               <label className="block text-sm font-semibold text-gray-700 mb-2">
@@ -125,11 +187,20 @@ const Documents = () => {
               </label>
               <input
                 type="text"
-                placeholder="Nom du fichier..."
+                placeholder={searchInContent ? "Texte du document..." : "Nom du fichier..."}
                 value={searchTerm}
                 onChange={(e) => setSearchTerm(e.target.value)}
                 className="w-full px-4 py-3 border border-gray-200 rounded-xl bg-white/50 backdrop-blur-sm focus:ring-2 focus:ring-blue-500 focus:border-transparent transition-all duration-300 shadow-sm hover:shadow-md"
               />
+              <label className="flex items-center mt-2 text-sm text-gray-600">
+                <input
+                  type="checkbox"
+                  checked={searchInContent}
+                  onChange={(e) => setSearchInContent(e.target.checked)}
+                  className="mr-2"
+                />
+                Rechercher dans le contenu
+              </label>
             </div>
             
             {/* Catégorie */}
@@ -142,9 +213,10 @@ const Documents = () => {
                 onChange={(e) => setFilterCategory(e.target.value)}
                 className="w-full px-4 py-3 border border-gray-200 rounded-xl bg-white/50 backdrop-blur-sm focus:ring-2 focus:ring-blue-500 focus:border-transparent transition-all duration-300 shadow-sm hover:shadow-md"
               >
-                {categories.map(cat => (
-                  <option key={cat} value={cat}>
-                    {cat === 'all' ? 'Toutes' : cat}
+                <option value="all">Toutes</option>
+                {categories.map(option => (
+                  <option key={option.value} value={option.value}>
+                    {optionLabel(option)}
                   </option>
                 ))}
               </select>
@@ -160,13 +232,51 @@ const Documents = () => {
                 onChange={(e) => setFilterType(e.target.value)}
                 className="w-full px-4 py-3 border border-gray-200 rounded-xl bg-white/50 backdrop-blur-sm focus:ring-2 focus:ring-blue-500 focus:border-transparent transition-all duration-300 shadow-sm hover:shadow-md"
               >
-                {fileTypes.map(type => (
-                  <option key={type} value={type}>
-                    {type === 'all' ? 'Tous' : type}
+                <option value="all">Tous</option>
+                {fileTypes.map(option => (
+                  <option key={option.value} value={option.value}>
+                    {optionLabel(option)}
+                  </option>
+                ))}
+              </select>
+            </div>
+            
+            {/* Langue (liste des documents uniquement) */}
+            <div>
+              <label className="block text-sm font-semibold text-gray-700 mb-2">
+                 Langue
+              </label>
+              <select
+                value={filterLanguage}
+                onChange={(e) => setFilterLanguage(e.target.value)}
+                disabled={Boolean(query)}
+                className="w-full px-4 py-3 border border-gray-200 rounded-xl bg-white/50 backdrop-blur-sm focus:ring-2 focus:ring-blue-500 focus:border-transparent transition-all duration-300 shadow-sm hover:shadow-md disabled:opacity-50"
+              >
+                <option value="all">Toutes</option>
+                {languages.map(option => (
+                  <option key={option.value} value={option.value}>
+                    {optionLabel(option)}
                   </option>
                 ))}
               </select>
             </div>
+            
+            {/* Confiance minimale (liste des documents uniquement) */}
+            <div>
+              <label className="block text-sm font-semibold text-gray-700 mb-2">
+                 Confiance min. (%)
+              </label>
+              <input
+                type="number"
+                min="0"
+                max="100"
+                placeholder="0"
+                value={minConfidence}
+                onChange={(e) => setMinConfidence(e.target.value)}
+                disabled={Boolean(query)}
+                className="w-full px-4 py-3 border border-gray-200 rounded-xl bg-white/50 backdrop-blur-sm focus:ring-2 focus:ring-blue-500 focus:border-transparent transition-all duration-300 shadow-sm hover:shadow-md disabled:opacity-50"
+              />
+            </div>
         </div>
       </div>
       
@@ -210,6 +320,19 @@ const Documents = () => {
               ))}
             </div>
           )}
+          
+          {/* Page suivante */}
+          {nextCursor && (
+            <div className="text-center mt-8">
+              <button
+                onClick={loadMore}
+                disabled={isLoadingMore}
+                className="px-8 py-3 bg-gradient-to-r from-blue-600 to-indigo-600 text-white rounded-xl font-medium shadow-lg hover:shadow-xl transition-all duration-300 disabled:opacity-50"
+              >
+                {isLoadingMore ? 'Chargement...' : 'Charger plus de documents'}
+              </button>
+            </div>
+          )}
         </>
       )}
       
@@ -270,18 +393,18 @@ const Documents = () => {
                   </div>
                 )}
                 
-                {selectedDocument.metadata && selectedDocument.metadata.length > 0 && (
+                {selectedDocument.doc_metadata && selectedDocument.doc_metadata.length > 0 && (
                   <div className="grid grid-cols-2 gap-4">
                     <div className="bg-gradient-to-br from-yellow-50 to-orange-50 rounded-xl p-4 border border-yellow-100">
                       <p className="text-sm font-semibold text-orange-600 mb-1">📊 Nombre de mots</p>
                       <p className="font-bold text-gray-800 text-lg">
-                        {selectedDocument.metadata[0].word_count}
+                        {selectedDocument.doc_metadata[0].word_count}
                       </p>
                     </div>
                     <div className="bg-gradient-to-br from-cyan-50 to-blue-50 rounded-xl p-4 border border-cyan-100">
                       <p className="text-sm font-semibold text-cyan-600 mb-1">🌐 Langue</p>
                       <p className="font-bold text-gray-800 text-lg">
-                        {selectedDocument.metadata[0].language}
+                        {selectedDocument.doc_metadata[0].language}
                       </p>
                     </div>
                   </div>
@@ -44,12 +44,86 @@ api.interceptors.response.use(
 
 // ========== Upload de documents ==========
 
+// Au-delà de cette taille, téléversement reprenable par morceaux
+const RESUMABLE_UPLOAD_THRESHOLD = 20 * 1024 * 1024;
+
+// Nombre de tentatives par morceau (coupures réseau)
+const CHUNK_RETRIES = 5;
+
 /**
- * Téléverse un document vers le backend
+ * Empreinte SHA-256 (hexadécimal) d'un morceau, null si crypto.subtle est indisponible (HTTP)
+ * @param {Blob} blob - Morceau du fichier
+ */
+const sha256Hex = async (blob) => {
+  if (!window.crypto?.subtle) return null;
+  const digest = await window.crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+  return Array.from(new Uint8Array(digest)).map((byte) => byte.toString(16).padStart(2, '0')).join('');
+};
+
+/**
+ * Téléverse un gros fichier par morceaux; après une coupure (ou un rechargement de la
+ * page), seuls les morceaux manquants sont renvoyés
  * @param {File} file - Fichier à téléverser
+ * @param {Function} onProgress - Appelée avec la proportion reçue (0-1)
+ * @returns {Promise} Réponse de l'API (comme uploadDocument)
+ */
+export const uploadDocumentResumable = async (file, onProgress) => {
+  const key = `upload:${file.name}:${file.size}:${file.lastModified}`;
+  let session = null;
+  
+  // Reprendre la session précédente du même fichier
+  const previousId = localStorage.getItem(key);
+  if (previousId) {
+    try {
+      session = (await api.get(`/upload/sessions/${previousId}`)).data;
+    } catch (error) {
+      localStorage.removeItem(key);
+    }
+  }
+  if (!session || session.status !== 'open') {
+    session = (await api.post('/upload/sessions', { filename: file.name, total_size: file.size })).data;
+    localStorage.setItem(key, session.upload_id);
+  }
+  
+  let receivedBytes = session.received_bytes;
+  for (const index of session.missing_chunks) {
+    const chunk = file.slice(index * session.chunk_size, (index + 1) * session.chunk_size);
+    const checksum = await sha256Hex(chunk);
+    for (let attempt = 1; ; attempt++) {
+      try {
+        await api.put(`/upload/sessions/${session.upload_id}/chunks/${index}`, chunk, {
+          headers: {
+            'Content-Type': 'application/octet-stream',
+            ...(checksum && { 'X-Chunk-SHA256': checksum }),
+          },
+        });
+        break;
+      } catch (error) {
+        // Erreur du serveur (4xx) ou dernière tentative: abandon, reprise possible plus tard
+        if (attempt >= CHUNK_RETRIES || (error.response && error.response.status < 500)) throw error;
+        await new Promise((resolve) => setTimeout(resolve, 1000 * 2 ** attempt));
+      }
+    }
+    receivedBytes += chunk.size;
+    onProgress?.(receivedBytes / file.size);
+  }
+  
+  const response = await api.post(`/upload/sessions/${session.upload_id}/complete`);
+  localStorage.removeItem(key);
+  return response.data;
+};
+
+/**
+ * Téléverse un document vers le backend (par morceaux au-delà de 20 Mo)
+ * @param {File} file - Fichier à téléverser
+ * @param {Function} onProgress - Appelée avec la proportion reçue (0-1), gros fichiers uniquement
  * @returns {Promise} Réponse de l'API
  */
-export const uploadDocument = async (file) => {
+export const uploadDocument = async (file, onProgress) => {
+  if (file.size > RESUMABLE_UPLOAD_THRESHOLD) {
+    return uploadDocumentResumable(file, onProgress);
+  }
+  
   const formData = new FormData();
   formData.append('file', file);
   
@@ -65,13 +139,89 @@ export const uploadDocument = async (file) => {
 };
 
 /**
- * Récupère tous les documents
- * @param {number} skip - Nombre de documents à ignorer
- * @param {number} limit - Nombre maximum de documents
- * @returns {Promise} Liste de documents
+ * Téléverse plusieurs documents en une requête (dossier entier, 500 fichiers au plus)
+ * @param {File[]} files - Fichiers à téléverser
+ * @param {Object} options
+ * @param {boolean} options.autoProcess - OCR puis classification en arrière-plan (voir getProcessingStatus)
+ * @returns {Promise} { uploaded, failed, items } (résultat de chaque fichier, dans l'ordre)
+ */
+export const uploadDocuments = async (files, { autoProcess = false } = {}) => {
+  const formData = new FormData();
+  files.forEach((file) => formData.append('files', file));
+  
+  const response = await api.post('/upload/batch', formData, {
+    headers: { 'Content-Type': 'multipart/form-data' },
+    params: autoProcess ? { auto_process: true } : {},
+  });
+  return response.data;
+};
+
+/**
+ * Avancement du traitement en arrière-plan d'un document téléversé avec autoProcess
+ * @param {number} documentId - ID du document
+ * @returns {Promise} { processing_status: queued|ocr|classifying|done|failed, processing_error, category, confidence }
  */
-export const getDocuments = async (skip = 0, limit = 100) => {
-  const response = await api.get(`/documents?skip=${skip}&limit=${limit}`);
+export const getProcessingStatus = async (documentId) => {
+  const response = await api.get(`/documents/${documentId}/status`);
+  return response.data;
+};
+
+/**
+ * Récupère une page de documents (du plus récent au plus ancien)
+ * @param {Object} options - Pagination et filtres
+ * @param {string} options.cursor - Curseur next_cursor de la page précédente
+ * @param {number} options.limit - Nombre maximum de documents (100 max)
+ * @param {string} options.category - Filtrer par catégorie
+ * @param {string} options.fileType - Filtrer par type de fichier
+ * @param {string} options.language - Filtrer par langue détectée
+ * @param {number} options.minConfidence - Confiance minimale (0-1)
+ * @param {number} options.maxConfidence - Confiance maximale (0-1)
+ * @param {string} options.dateFrom - Date de début (ISO)
+ * @param {string} options.dateTo - Date de fin (ISO)
+ * @returns {Promise} Page { items, next_cursor, has_more, facets } (facets: première page uniquement)
+ */
+export const getDocuments = async ({
+  cursor, limit = 50, category, fileType, language, minConfidence, maxConfidence, dateFrom, dateTo,
+} = {}) => {
+  const response = await api.get('/documents', {
+    params: {
+      cursor,
+      limit,
+      category,
+      file_type: fileType,
+      language,
+      min_confidence: minConfidence,
+      max_confidence: maxConfidence,
+      date_from: dateFrom,
+      date_to: dateTo,
+    },
+  });
+  return response.data;
+};
+
+/**
+ * Recherche plein texte dans le texte extrait des documents
+ * @param {string} q - Texte recherché
+ * @param {Object} options - Pagination: cursor (next_cursor de la page précédente), limit
+ * @returns {Promise} Page de résultats {items, next_cursor, has_more}, extraits surlignés avec <mark>
+ */
+export const searchDocuments = async (q, { cursor, limit = 20 } = {}) => {
+  const response = await api.get('/documents/search', {
+    params: { q, cursor, limit },
+  });
+  return response.data;
+};
+
+/**
+ * Recherche approximative sur le nom de fichier et la catégorie (noms partiels, fautes de frappe)
+ * @param {string} q - Texte recherché
+ * @param {number} limit - Nombre maximum de résultats
+ * @returns {Promise} Meilleures correspondances {query, items} triées par score décroissant
+ */
+export const searchDocumentNames = async (q, limit = 50) => {
+  const response = await api.get('/documents/search/names', {
+    params: { q, limit },
+  });
   return response.data;
 };
 
@@ -85,6 +235,32 @@ export const getDocument = async (documentId) => {
   return response.data;
 };
 
+/**
+ * Documents les plus proches d'un document ("plus comme celui-ci")
+ * @param {number} documentId - ID du document
+ * @param {number} limit - Nombre de documents
+ * @returns {Promise} Documents similaires triés par similarité décroissante
+ */
+export const getSimilarDocuments = async (documentId, limit = 10) => {
+  const response = await api.get(`/documents/${documentId}/similar`, {
+    params: { limit },
+  });
+  return response.data;
+};
+
+/**
+ * Recherche les quasi-doublons d'un document (même contenu téléversé plusieurs fois)
+ * @param {number} documentId - ID du document
+ * @param {number} threshold - Similarité minimale (0-1)
+ * @returns {Promise} Doublons triés par similarité décroissante
+ */
+export const getDuplicates = async (documentId, threshold) => {
+  const response = await api.get(`/documents/${documentId}/duplicates`, {
+    params: { threshold },
+  });
+  return response.data;
+};
+
 /**
  * Supprime un document
  * @param {number} documentId - ID du document à supprimer
@@ -121,10 +297,14 @@ export const getSupportedLanguages = async () => {
 /**
  * Classifie un document
  * @param {number} documentId - ID du document
+ * @param {Object} options - reuseDuplicate: reprendre la catégorie d'un quasi-doublon déjà classé
  * @returns {Promise} Catégorie et confiance
  */
-export const classifyDocument = async (documentId) => {
-  const response = await api.post('/classify', { document_id: documentId });
+export const classifyDocument = async (documentId, { reuseDuplicate = false } = {}) => {
+  const response = await api.post('/classify', {
+    document_id: documentId,
+    reuse_duplicate: reuseDuplicate,
+  });
   return response.data;
 };
 